@@ -9,8 +9,10 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app404.settings')
 
+# Same path-scoped middleware routing as wsgi.py; see core.handlers.
+# Serve with:  gunicorn app404.asgi:application -k uvicorn_worker.UvicornWorker
+from core.handlers import get_asgi_application  # noqa: E402
+
 application = get_asgi_application()
@@ -7,6 +7,9 @@ env = environ.Env(
     DEBUG=(bool, True),
     JWT_ACCESS_TTL_SECONDS=(int, 15 * 60),
     JWT_REFRESH_TTL_SECONDS=(int, 7 * 24 * 60 * 60),
+    JWT_USER_CACHE_SIZE=(int, 2048),
+    JWT_USER_CACHE_TTL_SECONDS=(int, 60),
+    JWT_DECODE_CACHE_SIZE=(int, 4096),
 )
 environ.Env.read_env(BASE_DIR / ".env")
 
@@ -37,6 +40,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "core.middleware.TeamBulkheadMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -51,6 +55,33 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Cookie-JWT JSON routes are served through this reduced chain instead of
+# MIDDLEWARE (see core.handlers); sessions, messages, CSRF and clickjacking
+# protection only matter for HTML pages and the admin.
+API_MIDDLEWARE = [
+    "corsheaders.middleware.CorsMiddleware",
+    "core.middleware.TeamBulkheadMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+
+    "core.middleware.JWTAuthenticationMiddleware",
+]
+
+API_PATH_PREFIXES = env.list("API_PATH_PREFIXES", default=[
+    "/api/",
+    "/team11/api/",
+    "/team12/listening/practice/start/",
+    "/team12/listening/practice/answer/",
+    "/team12/listening/practice/event/",
+])
+
+# Per-team in-flight request caps inside the shared process (core.bulkhead).
+# e.g. TEAM_BULKHEAD_LIMITS=team11=8,team12=16
+TEAM_BULKHEAD_LIMITS = env.dict("TEAM_BULKHEAD_LIMITS", default={})
+TEAM_BULKHEAD_DEFAULT_LIMIT = env.int("TEAM_BULKHEAD_DEFAULT_LIMIT", default=16)
+TEAM_BULKHEAD_QUEUE_TIMEOUT_SECONDS = env.float("TEAM_BULKHEAD_QUEUE_TIMEOUT_SECONDS", default=0.5)
+TEAM_BULKHEAD_RETRY_AFTER_SECONDS = env.int("TEAM_BULKHEAD_RETRY_AFTER_SECONDS", default=2)
+
 ROOT_URLCONF = "app404.urls"
 
 TEMPLATES = [
@@ -83,6 +114,20 @@ for t in TEAM_APPS:
 
 DATABASE_ROUTERS = ["core.db_router.TeamPerAppRouter"]
 
+# Point CACHE_URL at a shared backend (e.g. rediscache://redis:6379/1) when
+# running several workers: JWT revocation (core.auth_cache) is checked through
+# it, so a logout takes effect in every worker at once.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+
+# Login/signup password hashing runs on a bounded pool (core.hashing); when
+# all workers and queue slots are busy the views answer 503 + Retry-After.
+PASSWORD_HASH_WORKERS = env.int("PASSWORD_HASH_WORKERS", default=4)
+PASSWORD_HASH_QUEUE_SIZE = env.int("PASSWORD_HASH_QUEUE_SIZE", default=32)
+PASSWORD_HASH_TIMEOUT_SECONDS = env.float("PASSWORD_HASH_TIMEOUT_SECONDS", default=10.0)
+PASSWORD_HASH_RETRY_AFTER_SECONDS = env.int("PASSWORD_HASH_RETRY_AFTER_SECONDS", default=2)
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -109,13 +154,38 @@ SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "http")
 AUTH_USER_MODEL = "core.User"
 
 JWT_SECRET = env("JWT_SECRET", default=SECRET_KEY)
-JWT_ALGORITHM = "HS256"
+# HS256 (shared JWT_SECRET), or RS256 / EdDSA signed with <kid>.pem keys from
+# JWT_SIGNING_KEYS_DIR and published on /api/auth/jwks/.
+JWT_ALGORITHM = env("JWT_ALGORITHM", default="HS256")
+JWT_SIGNING_KEYS_DIR = env("JWT_SIGNING_KEYS_DIR", default="")
+JWT_SIGNING_KID = env("JWT_SIGNING_KID", default="")
+# Team services without signing keys verify tokens against core's JWKS instead.
+JWT_JWKS_URL = env("JWT_JWKS_URL", default="")
+JWT_JWKS_CACHE_SECONDS = env.int("JWT_JWKS_CACHE_SECONDS", default=300)
 JWT_ACCESS_TTL_SECONDS = env("JWT_ACCESS_TTL_SECONDS")
 JWT_REFRESH_TTL_SECONDS = env("JWT_REFRESH_TTL_SECONDS")
 
+# Per-process cache of authenticated users, keyed by (sub, token_version).
+# Revocation is checked through the shared token_version in CACHES first, so
+# a logout/deactivation in one worker applies to all of them immediately.
+JWT_USER_CACHE_SIZE = env("JWT_USER_CACHE_SIZE")
+JWT_USER_CACHE_TTL_SECONDS = env("JWT_USER_CACHE_TTL_SECONDS")
+# Verified token payloads memoized by token digest until their exp.
+JWT_DECODE_CACHE_SIZE = env("JWT_DECODE_CACHE_SIZE")
+# max-age on /api/auth/verify/ responses so gateways can microcache them.
+JWT_VERIFY_CACHE_SECONDS = env.int("JWT_VERIFY_CACHE_SECONDS", default=5)
+
 JWT_COOKIE_SECURE = env.bool("JWT_COOKIE_SECURE", default=False)
 JWT_COOKIE_SAMESITE = env("JWT_COOKIE_SAMESITE", default="Lax")
 
+# /api/users/batch/ and the core.user_client helper used by team apps.
+USERS_BATCH_MAX_IDS = env.int("USERS_BATCH_MAX_IDS", default=500)
+# When empty, core.user_client resolves users in-process instead of over HTTP.
+CORE_BASE_URL = env("CORE_BASE_URL", default="")
+# Sent by core.user_client as X-Service-Token; /api/users/batch/ accepts it
+# in place of a staff login. Empty disables service access.
+CORE_SERVICE_TOKEN = env("CORE_SERVICE_TOKEN", default="")
+
 CORS_ALLOW_CREDENTIALS = True
 
 if DEBUG:
@@ -9,8 +9,9 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app404.settings')
 
+# JSON API paths skip session/CSRF/messages middleware; see core.handlers.
+from core.handlers import get_wsgi_application  # noqa: E402
+
 application = get_wsgi_application()
@@ -0,0 +1,105 @@
+"""
+Per-team concurrency limits for the shared core process.
+
+Every TEAM_APPS entry is mounted under /<team>/ in one Django process, so one
+slow team can occupy every worker thread (gthread) or pile unbounded work onto
+the event loop (ASGI). Each team gets its own Bulkhead: a fixed number of
+in-flight requests, a short wait for a free slot and then a fast 503. Core
+routes (/api/, /auth/, admin) are never limited.
+
+Slots are held until the view returns a response; streaming bodies are not
+counted.
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+
+
+class Bulkhead:
+    def __init__(self, name: str, limit: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.accepted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def acquire(self) -> bool:
+        if self._slots.acquire(blocking=False):
+            return self._acquired()
+        if self.queue_timeout > 0 and self._slots.acquire(timeout=self.queue_timeout):
+            return self._acquired(queued=True)
+        return self._rejected()
+
+    async def aacquire(self) -> bool:
+        # Blocking on the semaphore would stall the event loop, so poll it.
+        if self._slots.acquire(blocking=False):
+            return self._acquired()
+        deadline = time.monotonic() + self.queue_timeout
+        delay = 0.005
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            if self._slots.acquire(blocking=False):
+                return self._acquired(queued=True)
+            delay = min(delay * 2, 0.05)
+        return self._rejected()
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _acquired(self, queued=False) -> bool:
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.accepted += 1
+            if queued:
+                self.queued += 1
+        return True
+
+    def _rejected(self) -> bool:
+        with self._lock:
+            self.rejected += 1
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "accepted": self.accepted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+            }
+
+
+def _build_bulkheads() -> dict:
+    limits = settings.TEAM_BULKHEAD_LIMITS
+    return {
+        team: Bulkhead(
+            team,
+            limit=int(limits.get(team, settings.TEAM_BULKHEAD_DEFAULT_LIMIT)),
+            queue_timeout=settings.TEAM_BULKHEAD_QUEUE_TIMEOUT_SECONDS,
+        )
+        for team in settings.TEAM_APPS
+    }
+
+
+bulkheads = _build_bulkheads()
+
+
+def bulkhead_for_path(path: str):
+    team = path.lstrip("/").split("/", 1)[0]
+    return bulkheads.get(team)
+
+
+def stats() -> dict:
+    return {team: bulkhead.stats() for team, bulkhead in bulkheads.items()}
@@ -0,0 +1,70 @@
+"""
+Request handlers that route JSON API paths through a reduced middleware chain.
+
+Everything under settings.API_PATH_PREFIXES is served by a second handler
+built from settings.API_MIDDLEWARE (no sessions, messages, CSRF or
+clickjacking middleware); HTML pages and the admin keep the full
+settings.MIDDLEWARE chain.
+"""
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+
+def is_api_path(path: str) -> bool:
+    return any(path.startswith(prefix) for prefix in settings.API_PATH_PREFIXES)
+
+
+@contextmanager
+def _middleware_setting(middleware):
+    # BaseHandler.load_middleware() always reads settings.MIDDLEWARE, so swap it
+    # while the lean chain is built (once, at startup).
+    full = settings.MIDDLEWARE
+    settings.MIDDLEWARE = middleware
+    try:
+        yield
+    finally:
+        settings.MIDDLEWARE = full
+
+
+def build_api_handler(is_async=False) -> BaseHandler:
+    handler = BaseHandler()
+    with _middleware_setting(settings.API_MIDDLEWARE):
+        handler.load_middleware(is_async=is_async)
+    return handler
+
+
+class PathScopedWSGIHandler(WSGIHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.api_handler = build_api_handler()
+
+    def get_response(self, request):
+        if is_api_path(request.path_info):
+            return self.api_handler.get_response(request)
+        return super().get_response(request)
+
+
+def get_wsgi_application():
+    django.setup(set_prefix=False)
+    return PathScopedWSGIHandler()
+
+
+class PathScopedASGIHandler(ASGIHandler):
+    def __init__(self):
+        super().__init__()
+        self.api_handler = build_api_handler(is_async=True)
+
+    async def get_response_async(self, request):
+        if is_api_path(request.path_info):
+            return await self.api_handler.get_response_async(request)
+        return await super().get_response_async(request)
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return PathScopedASGIHandler()
@@ -0,0 +1,181 @@
+"""
+Bounded executor for password hashing.
+
+PBKDF2 costs tens of milliseconds of CPU per call. Running it on a small
+shared pool (hashlib releases the GIL, so threads do run in parallel) with a
+fixed number of queue slots means a login spike gets fast 503s instead of
+tying up every request worker of the shared core process.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+User = get_user_model()
+
+
+class PoolSaturated(Exception):
+    """Raised when no queue slot is free (or the result took too long)."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+class HashingPool:
+    def __init__(self, workers: int, queue_size: int, timeout: float, retry_after: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(self._timed, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def run(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+
+    async def arun(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.completed += 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_hash_ms": round(self.total_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+                "max_hash_ms": round(self.max_seconds * 1000, 2),
+            }
+
+
+hash_pool = HashingPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+    timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+
+
+def _users_by_email(email):
+    return User._default_manager.filter(**{User.USERNAME_FIELD: email})
+
+
+def _verify(user, password):
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        # (same mitigation as ModelBackend).
+        hash_pool.run(make_password, password)
+        return None
+
+    if not hash_pool.run(check_password, password, user.password):
+        return None
+    return user
+
+
+async def _averify(user, password):
+    if user is None:
+        await hash_pool.arun(make_password, password)
+        return None
+
+    if not await hash_pool.arun(check_password, password, user.password):
+        return None
+    return user
+
+
+def _needs_rehash(user):
+    # Mirrors the hash upgrade AbstractBaseUser.check_password() would do.
+    try:
+        hasher = identify_hasher(user.password)
+    except ValueError:
+        return False
+    preferred = get_hasher()
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(user.password)
+
+
+def authenticate_credentials(email, password):
+    """
+    ModelBackend-equivalent email/password check with the hashing done on
+    hash_pool. Returns the active user or None; raises PoolSaturated.
+    """
+    user = _verify(_users_by_email(email).first(), password)
+    if user is None or not user.is_active:
+        return None
+    if _needs_rehash(user):
+        user.password = hash_pool.run(make_password, password)
+        user.save(update_fields=["password"])
+    return user
+
+
+async def aauthenticate_credentials(email, password):
+    user = await _averify(await _users_by_email(email).afirst(), password)
+    if user is None or not user.is_active:
+        return None
+    if _needs_rehash(user):
+        user.password = await hash_pool.arun(make_password, password)
+        await user.asave(update_fields=["password"])
+    return user
+
+
+def hash_password(password):
+    return hash_pool.run(make_password, password)
+
+
+async def ahash_password(password):
+    return await hash_pool.arun(make_password, password)
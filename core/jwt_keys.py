@@ -0,0 +1,80 @@
+"""
+Key material for asymmetric JWT signing (RS256 / EdDSA).
+
+Private keys live as PEM files named <kid>.pem in settings.JWT_SIGNING_KEYS_DIR.
+settings.JWT_SIGNING_KID picks the key new tokens are signed with; every other
+key in the directory stays published in the JWKS so tokens signed before a
+rotation keep verifying until they expire.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+SYMMETRIC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+ASYMMETRIC_ALGORITHMS = {"RS256": rsa.RSAPrivateKey, "EdDSA": ed25519.Ed25519PrivateKey}
+
+
+def is_asymmetric() -> bool:
+    return settings.JWT_ALGORITHM not in SYMMETRIC_ALGORITHMS
+
+
+@lru_cache(maxsize=1)
+def private_keys() -> dict:
+    algorithm = settings.JWT_ALGORITHM
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        raise ImproperlyConfigured(f"Unsupported JWT_ALGORITHM: {algorithm}")
+
+    keys_dir = settings.JWT_SIGNING_KEYS_DIR
+    keys = {}
+    for pem in sorted(Path(keys_dir).glob("*.pem")) if keys_dir else []:
+        key = serialization.load_pem_private_key(pem.read_bytes(), password=None)
+        if not isinstance(key, ASYMMETRIC_ALGORITHMS[algorithm]):
+            raise ImproperlyConfigured(f"{pem.name} is not a valid {algorithm} key")
+        keys[pem.stem] = key
+    return keys
+
+
+def signing_key():
+    """Return (kid, private_key) used to sign new tokens."""
+    keys = private_keys()
+    kid = settings.JWT_SIGNING_KID or (max(keys) if keys else None)
+    if kid not in keys:
+        raise ImproperlyConfigured(f"No JWT signing key {kid!r} in JWT_SIGNING_KEYS_DIR")
+    return kid, keys[kid]
+
+
+def public_key(kid):
+    key = private_keys().get(kid)
+    return key.public_key() if key is not None else None
+
+
+def jwks() -> dict:
+    if not is_asymmetric():
+        return {"keys": []}
+
+    to_jwk = RSAAlgorithm.to_jwk if settings.JWT_ALGORITHM == "RS256" else OKPAlgorithm.to_jwk
+    keys = []
+    for kid, key in private_keys().items():
+        jwk = to_jwk(key.public_key(), as_dict=True)
+        jwk.update({"kid": kid, "alg": settings.JWT_ALGORITHM, "use": "sig"})
+        keys.append(jwk)
+    return {"keys": keys}
+
+
+def generate_private_key_pem(algorithm: str) -> bytes:
+    if algorithm == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
@@ -1,22 +1,46 @@
+import hashlib
 import time
+from typing import Optional
+
 import jwt
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
+from core.jwt_keys import is_asymmetric, public_key, signing_key
+from core.lru_cache import LRUCache
+
+# Verified payloads keyed by sha256(token); entries live until the token's exp.
+# Tokens that failed verification are remembered briefly as _INVALID so a bad
+# cookie replayed on every request doesn't pay for a decode + exception each time.
+_INVALID = object()
+token_cache = LRUCache(settings.JWT_DECODE_CACHE_SIZE, settings.JWT_ACCESS_TTL_SECONDS)
+INVALID_TOKEN_CACHE_SECONDS = 60
+
 
 def _now() -> int:
     return int(time.time())
 
 
+def _encode(payload: dict) -> str:
+    if not is_asymmetric():
+        return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    kid, key = signing_key()
+    return jwt.encode(payload, key, algorithm=settings.JWT_ALGORITHM, headers={"kid": kid})
+
+
 def create_access_token(user) -> str:
     payload = {
         "type": "access",
         "sub": str(user.id),
         "email": user.email,
+        "first_name": user.first_name or "",
+        "last_name": user.last_name or "",
+        "age": user.age,
         "tv": user.token_version,
         "iat": _now(),
         "exp": _now() + settings.JWT_ACCESS_TTL_SECONDS,
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    return _encode(payload)
 
 
 def create_refresh_token(user) -> str:
@@ -27,8 +51,75 @@ def create_refresh_token(user) -> str:
         "iat": _now(),
         "exp": _now() + settings.JWT_REFRESH_TTL_SECONDS,
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    return _encode(payload)
+
+
+def token_from_request(request) -> Optional[str]:
+    token = request.COOKIES.get("access_token")
+    if not token:
+        auth = request.headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            token = auth.split(" ", 1)[1].strip()
+    return token or None
 
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    if settings.JWT_JWKS_URL:
+        from core.jwt_verifier import default_verifier
+        return default_verifier().verify(token)
+
+    if not is_asymmetric():
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = public_key(kid)
+    if key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key: {kid!r}")
+    return jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
+
+
+def try_decode_token(token: str) -> Optional[dict]:
+    """
+    Like decode_token, but memoized and returns None instead of raising
+    for invalid or expired tokens.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = token_cache.get(key)
+    if cached is _INVALID:
+        return None
+    if cached is not None:
+        if cached.get("exp", 0) <= time.time():
+            token_cache.discard(key)
+            return None
+        return dict(cached)
+
+    try:
+        payload = decode_token(token)
+    except jwt.PyJWKClientConnectionError:
+        # JWKS endpoint unreachable: reject, but don't remember the token as bad.
+        return None
+    except jwt.PyJWTError:
+        token_cache.set(key, _INVALID, ttl_seconds=INVALID_TOKEN_CACHE_SECONDS)
+        return None
+
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        token_cache.set(key, payload, ttl_seconds=ttl)
+    return dict(payload)
+
+
+# With JWT_JWKS_URL set, decoding may fetch signing keys over HTTP; async
+# callers run that in a worker thread so it never blocks the event loop.
+# Local keys and cache hits stay on the loop.
+
+async def adecode_token(token: str) -> dict:
+    if settings.JWT_JWKS_URL:
+        return await sync_to_async(decode_token, thread_sensitive=False)(token)
+    return decode_token(token)
+
+
+async def atry_decode_token(token: str) -> Optional[dict]:
+    # peek(): try_decode_token does the counted lookup.
+    if settings.JWT_JWKS_URL and token_cache.peek(hashlib.sha256(token.encode("utf-8")).digest()) is None:
+        return await sync_to_async(try_decode_token, thread_sensitive=False)(token)
+    return try_decode_token(token)
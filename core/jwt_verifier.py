@@ -0,0 +1,52 @@
+"""
+Stand-alone verification of core-issued access tokens.
+
+Team services that run without core's signing keys point JWT_JWKS_URL at
+core's /api/auth/jwks/ endpoint and verify tokens locally; public keys are
+fetched once and cached, so no per-request call back into core is needed::
+
+    from core.jwt_verifier import verify_token
+
+    claims = verify_token(request.COOKIES.get("access_token", ""))
+    if claims is None:
+        ...  # missing, invalid or expired
+"""
+from functools import lru_cache
+from typing import Optional
+
+import jwt
+from django.conf import settings
+
+
+class JWKSVerifier:
+    def __init__(self, jwks_url: str, algorithms=("RS256", "EdDSA"), cache_seconds: int = 300, timeout: float = 5):
+        self.algorithms = list(algorithms)
+        self._client = jwt.PyJWKClient(
+            jwks_url,
+            cache_keys=True,
+            lifespan=cache_seconds,
+            timeout=timeout,
+        )
+
+    def verify(self, token: str) -> dict:
+        """Return the verified payload; raises jwt.PyJWTError on failure."""
+        signing_key = self._client.get_signing_key_from_jwt(token)
+        return jwt.decode(token, signing_key.key, algorithms=self.algorithms)
+
+
+@lru_cache(maxsize=1)
+def default_verifier() -> JWKSVerifier:
+    return JWKSVerifier(
+        settings.JWT_JWKS_URL,
+        algorithms=[settings.JWT_ALGORITHM],
+        cache_seconds=settings.JWT_JWKS_CACHE_SECONDS,
+    )
+
+
+def verify_token(token: str) -> Optional[dict]:
+    if not token:
+        return None
+    try:
+        return default_verifier().verify(token)
+    except jwt.PyJWTError:
+        return None
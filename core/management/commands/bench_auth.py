@@ -0,0 +1,64 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from core.auth_cache import token_version_cache, user_cache
+from core.jwt_utils import create_access_token, token_cache
+from core.middleware import JWTAuthenticationMiddleware
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark cookie-JWT request authentication, cold vs warm caches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        try:
+            # The benchmark user only exists for the duration of the run.
+            with transaction.atomic():
+                user = User.objects.create_user(email="bench-auth@example.invalid", password=None)
+                self._run(user, iterations)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, user, iterations):
+        middleware = JWTAuthenticationMiddleware(lambda request: None)
+        factory = RequestFactory()
+        factory.cookies["access_token"] = create_access_token(user)
+
+        def authenticate_once():
+            request = factory.get("/api/auth/me/")
+            middleware.process_request(request)
+            assert request.user.pk == user.pk
+
+        def cold():
+            token_cache.clear()
+            user_cache.clear()
+            token_version_cache.clear()
+            authenticate_once()
+
+        for label, fn in (("cold", cold), ("warm", authenticate_once)):
+            authenticate_once()  # prime imports / connection
+            started = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:>5}: {iterations} requests in {elapsed:.3f}s "
+                f"({elapsed / iterations * 1e6:.1f} us/request, {iterations / elapsed:.0f} req/s)"
+            )
+
+        token_cache.clear()
+        user_cache.clear()
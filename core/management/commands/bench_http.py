@@ -0,0 +1,95 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Small keep-alive HTTP load generator for comparing serving modes on the same box, e.g. "
+        "run the server with SERVER_MODE=wsgi, then SERVER_MODE=asgi, and point this at both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url")
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--cookie", default="", help='e.g. "access_token=..."')
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        result = asyncio.run(self._run(options))
+        latencies = sorted(result["latencies"])
+        done = len(latencies)
+        if not done:
+            self.stdout.write(self.style.ERROR(f"no successful requests ({result['errors']} errors)"))
+            return
+
+        def pct(p):
+            return latencies[min(done - 1, int(done * p))] * 1000
+
+        self.stdout.write(
+            f"{done} ok, {result['errors']} errors in {result['elapsed']:.2f}s "
+            f"-> {done / result['elapsed']:.0f} req/s at concurrency {options['concurrency']}"
+        )
+        self.stdout.write(
+            f"latency ms: p50 {pct(0.50):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}  "
+            f"mean {statistics.mean(latencies) * 1000:.1f}"
+        )
+
+    async def _run(self, options):
+        url = urlsplit(options["url"])
+        path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        host, port = url.hostname, url.port or 80
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: keep-alive\r\n"
+            + (f"Cookie: {options['cookie']}\r\n" if options["cookie"] else "")
+            + "\r\n"
+        ).encode("latin-1")
+
+        remaining = options["requests"]
+        latencies, errors = [], 0
+
+        async def client():
+            nonlocal remaining, errors
+            reader = writer = None
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(host, port)
+                    writer.write(request)
+                    await asyncio.wait_for(_read_response(reader), options["timeout"])
+                    latencies.append(time.perf_counter() - started)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    errors += 1
+                    if writer is not None:
+                        writer.close()
+                    reader = writer = None
+            if writer is not None:
+                writer.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options["concurrency"])))
+        return {"latencies": latencies, "errors": errors, "elapsed": time.perf_counter() - started}
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value.strip())
+    await reader.readexactly(length)
+    if status >= 500:
+        raise ValueError(f"HTTP {status}")
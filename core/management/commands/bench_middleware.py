@@ -0,0 +1,36 @@
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core.handlers import PathScopedWSGIHandler
+
+
+class Command(BaseCommand):
+    help = "Compare per-request overhead of the full and the lean (API) middleware chains."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/health/")
+        parser.add_argument("--iterations", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path, iterations = options["path"], options["iterations"]
+        environ = RequestFactory().get(path, HTTP_HOST="localhost").environ
+
+        def start_response(status, headers):
+            pass
+
+        results = {}
+        for label, handler in (("full", WSGIHandler()), ("lean", PathScopedWSGIHandler())):
+            handler(dict(environ), start_response).close()  # warm up
+            started = time.perf_counter()
+            for _ in range(iterations):
+                handler(dict(environ), start_response).close()
+            results[label] = (time.perf_counter() - started) / iterations
+            self.stdout.write(
+                f"{label}: {results[label] * 1e6:.1f} us/request ({1 / results[label]:.0f} req/s)"
+            )
+
+        saved = results["full"] - results["lean"]
+        self.stdout.write(f"saved: {saved * 1e6:.1f} us/request ({saved / results['full'] * 100:.0f}%) on {path}")
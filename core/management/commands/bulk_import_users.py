@@ -0,0 +1,149 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+
+User = get_user_model()
+
+
+def _init_hash_worker():
+    # Needed when the pool uses the "spawn" start method; a no-op after fork.
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app404.settings")
+    django.setup()
+
+
+def _read_rows(path, fmt):
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _batches(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users from a CSV or JSONL file (columns: email, password, first_name, "
+        "last_name, age). Passwords are hashed in a process pool and rows are "
+        "inserted with bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        batch_size = options["batch_size"]
+        workers = max(1, options["workers"])
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
+        stats = {"read": 0, "created": 0, "duplicate": 0, "invalid": 0}
+        hash_seconds = 0.0
+        seen = set()
+        started = time.perf_counter()
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) if workers > 1 else None
+        try:
+            for batch in _batches(_read_rows(path, fmt), batch_size):
+                stats["read"] += len(batch)
+                rows = self._valid_rows(batch, stats)
+
+                # In-file duplicates, then one query for emails that already exist.
+                fresh = []
+                for row in rows:
+                    if row["email"] in seen:
+                        stats["duplicate"] += 1
+                        self.stderr.write(f"duplicate in file: {row['email']}")
+                    else:
+                        seen.add(row["email"])
+                        fresh.append(row)
+                existing = set(
+                    User.objects.filter(email__in=[r["email"] for r in fresh]).values_list("email", flat=True)
+                )
+                for email in sorted(existing):
+                    self.stderr.write(f"already registered: {email}")
+                stats["duplicate"] += len(existing)
+                fresh = [r for r in fresh if r["email"] not in existing]
+                if not fresh:
+                    continue
+
+                hash_started = time.perf_counter()
+                passwords = [r["password"] or None for r in fresh]
+                if executor:
+                    chunksize = max(1, len(passwords) // (workers * 4))
+                    hashes = list(executor.map(make_password, passwords, chunksize=chunksize))
+                else:
+                    hashes = [make_password(p) for p in passwords]
+                hash_seconds += time.perf_counter() - hash_started
+
+                users = []
+                for row, password_hash in zip(fresh, hashes):
+                    user = User.objects.build_user(
+                        row["email"],
+                        first_name=row["first_name"],
+                        last_name=row["last_name"],
+                        age=row["age"],
+                    )
+                    user.password = password_hash
+                    users.append(user)
+                User.objects.bulk_create(users, batch_size=batch_size)
+                stats["created"] += len(users)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"read {stats['read']}, created {stats['created']}, "
+            f"duplicates {stats['duplicate']}, invalid {stats['invalid']}"
+        ))
+        self.stdout.write(
+            f"{elapsed:.2f}s total ({stats['created'] / elapsed if elapsed else 0:.0f} users/s), "
+            f"{hash_seconds:.2f}s hashing with {workers} worker(s)"
+        )
+
+    def _valid_rows(self, batch, stats):
+        rows = []
+        for raw in batch:
+            email = (raw.get("email") or "").strip().lower()
+            try:
+                validate_email(email)
+                age_raw = raw.get("age")
+                age = int(age_raw) if age_raw not in (None, "") else None
+            except (ValidationError, TypeError, ValueError):
+                stats["invalid"] += 1
+                self.stderr.write(f"invalid row: email={email!r} age={raw.get('age')!r}")
+                continue
+            rows.append({
+                "email": email,
+                "password": raw.get("password") or "",
+                "first_name": str(raw.get("first_name") or ""),
+                "last_name": str(raw.get("last_name") or ""),
+                "age": age,
+            })
+        return rows
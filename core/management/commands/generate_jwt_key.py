@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jwt_keys import ASYMMETRIC_ALGORITHMS, generate_private_key_pem
+
+
+class Command(BaseCommand):
+    help = "Generate a new JWT signing key (<kid>.pem) in JWT_SIGNING_KEYS_DIR for key rotation."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kid", help="Key id, e.g. 2026-10")
+        default_algorithm = settings.JWT_ALGORITHM if settings.JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS else "RS256"
+        parser.add_argument("--algorithm", default=default_algorithm, choices=sorted(ASYMMETRIC_ALGORITHMS))
+        parser.add_argument("--dir", default=settings.JWT_SIGNING_KEYS_DIR)
+
+    def handle(self, *args, **options):
+        if not options["dir"]:
+            raise CommandError("Set JWT_SIGNING_KEYS_DIR or pass --dir")
+
+        keys_dir = Path(options["dir"])
+        keys_dir.mkdir(parents=True, exist_ok=True)
+        path = keys_dir / f"{options['kid']}.pem"
+        if path.exists():
+            raise CommandError(f"{path} already exists")
+
+        path.write_bytes(generate_private_key_pem(options["algorithm"]))
+        path.chmod(0o600)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['algorithm']} key {path}"))
+        self.stdout.write("Set JWT_SIGNING_KID to start signing with it; keep old keys until their tokens expire.")
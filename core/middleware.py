@@ -1,45 +1,111 @@
-from django.contrib.auth import get_user_model
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from jwt import ExpiredSignatureError, InvalidTokenError
 
-from core.jwt_utils import decode_token
+from core.auth import ais_authenticated
+from core.auth_cache import aget_active_user, get_active_user
+from core.bulkhead import bulkhead_for_path
+from core.jwt_utils import atry_decode_token, token_from_request, try_decode_token
 
-User = get_user_model()
+# Answered from the token claims by core.views.verify, which only checks the
+# token version; loading the user row there would be a second query.
+CLAIMS_ONLY_PATHS = ("/api/auth/verify/",)
 
 
 class JWTAuthenticationMiddleware(MiddlewareMixin):
     """
     If a valid access_token cookie (or Authorization header) exists, set request.user accordingly.
+    Runs natively under ASGI: cache hits never leave the event loop and misses use the async ORM.
     """
 
     def process_request(self, request):
+        if request.path_info in CLAIMS_ONLY_PATHS:
+            return
         if hasattr(request, "user") and getattr(request.user, "is_authenticated", False):
             return
 
-        token = request.COOKIES.get("access_token")
-        if not token:
-            auth = request.headers.get("Authorization", "")
-            if auth.startswith("Bearer "):
-                token = auth.split(" ", 1)[1].strip()
+        payload = self._access_payload(request)
+        if payload is None:
+            return
 
-        if not token:
+        user = get_active_user(payload.get("sub"), payload.get("tv"))
+        if not user:
             return
 
+        request.user = user
+        request.jwt_payload = payload
+
+    async def __acall__(self, request):
+        if request.path_info not in CLAIMS_ONLY_PATHS and not await ais_authenticated(request):
+            token = self._token(request)
+            payload = _access_only(await atry_decode_token(token)) if token else None
+            if payload is not None:
+                user = await aget_active_user(payload.get("sub"), payload.get("tv"))
+                if user:
+                    request.user = user
+                    request.jwt_payload = payload
+        return await self.get_response(request)
+
+    def _token(self, request):
+        if not hasattr(request, "user"):
+            # API routes run without AuthenticationMiddleware (core.handlers).
+            request.user = AnonymousUser()
+        return token_from_request(request)
+
+    def _access_payload(self, request):
+        token = self._token(request)
+        return _access_only(try_decode_token(token)) if token else None
+
+
+def _access_only(payload):
+    if not payload or payload.get("type") != "access":
+        return None
+    return payload
+
+
+class TeamBulkheadMiddleware:
+    """
+    Caps concurrent requests per team URL prefix (core.bulkhead). Requests
+    that can't get a slot within TEAM_BULKHEAD_QUEUE_TIMEOUT_SECONDS get a 503.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        bulkhead = bulkhead_for_path(request.path_info)
+        if bulkhead is None:
+            return self.get_response(request)
+        if not bulkhead.acquire():
+            return _saturated_response(bulkhead)
         try:
-            payload = decode_token(token)
-            if payload.get("type") != "access":
-                return
-
-            user_id = payload.get("sub")
-            tv = payload.get("tv")
-            user = User.objects.filter(id=user_id, is_active=True).first()
-            if not user:
-                return
-
-            if user.token_version != tv:
-                return
-
-            request.user = user
-            request.jwt_payload = payload
-        except (ExpiredSignatureError, InvalidTokenError):
-            return
+            return self.get_response(request)
+        finally:
+            bulkhead.release()
+
+    async def __acall__(self, request):
+        bulkhead = bulkhead_for_path(request.path_info)
+        if bulkhead is None:
+            return await self.get_response(request)
+        if not await bulkhead.aacquire():
+            return _saturated_response(bulkhead)
+        try:
+            return await self.get_response(request)
+        finally:
+            bulkhead.release()
+
+
+def _saturated_response(bulkhead):
+    resp = JsonResponse({"error": f"{bulkhead.name} is busy, please retry"}, status=503)
+    resp["Retry-After"] = str(settings.TEAM_BULKHEAD_RETRY_AFTER_SECONDS)
+    return resp
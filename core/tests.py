@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import LiveServerTestCase, TestCase, override_settings
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -22,3 +22,469 @@ class AuthFlowTests(TestCase):
         # logout
         res3 = self.client.post("/api/auth/logout/", data="{}", content_type="application/json")
         self.assertEqual(res3.status_code, 200)
+
+
+class AuthUserCacheTests(TestCase):
+    def setUp(self):
+        from core.auth_cache import user_cache
+        self.cache = user_cache
+        self.cache.clear()
+        self.user = User.objects.create_user(email="cache@test.com", password="pass1234")
+        res = self.client.post(
+            "/api/auth/login/",
+            data='{"email":"cache@test.com","password":"pass1234"}',
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+
+    def test_repeated_requests_skip_user_query(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_logout_invalidates_cached_user(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        access = self.client.cookies["access_token"].value
+
+        self.client.post("/api/auth/logout/", data="{}", content_type="application/json")
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+        self.client.cookies["access_token"] = access
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+    def test_logout_in_another_worker_rejects_locally_cached_user(self):
+        from django.db.models import F
+        from core.auth_cache import token_version_cache
+
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        # Another worker's logout: the row and the shared cache change, this
+        # process's user_cache entry does not.
+        User.objects.filter(pk=self.user.pk).update(token_version=F("token_version") + 1)
+        token_version_cache.discard(str(self.user.pk))
+        self.assertEqual(self.cache.stats()["size"], 1)
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+    def test_deactivation_invalidates_cached_user(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+    def test_metrics_is_staff_only(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.cache.clear()
+        res = self.client.get("/api/metrics/")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("hits", res.json()["auth_user_cache"])
+
+
+class TokenDecodeCacheTests(TestCase):
+    def setUp(self):
+        from core.jwt_utils import token_cache
+        self.cache = token_cache
+        self.cache.clear()
+        self.user = User.objects.create_user(email="decode@test.com", password="pass1234")
+
+    def test_valid_token_is_memoized(self):
+        from unittest.mock import patch
+        from core.jwt_utils import create_access_token, try_decode_token
+
+        token = create_access_token(self.user)
+        self.assertEqual(try_decode_token(token)["sub"], str(self.user.id))
+        with patch("core.jwt_utils.decode_token") as decode_mock:
+            self.assertEqual(try_decode_token(token)["sub"], str(self.user.id))
+            decode_mock.assert_not_called()
+
+    def test_invalid_and_expired_tokens_return_none(self):
+        import jwt
+        from django.conf import settings
+        from core.jwt_utils import try_decode_token
+
+        expired = jwt.encode(
+            {"type": "access", "sub": str(self.user.id), "tv": 0, "exp": 1},
+            settings.JWT_SECRET,
+            algorithm=settings.JWT_ALGORITHM,
+        )
+        self.assertIsNone(try_decode_token(expired))
+        self.assertIsNone(try_decode_token("not-a-jwt"))
+        self.assertIsNone(try_decode_token("not-a-jwt"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    async def test_jwks_decode_runs_off_the_event_loop(self):
+        import threading
+        from unittest.mock import patch
+        from django.test import override_settings
+        from core.jwt_utils import adecode_token, atry_decode_token
+
+        loop_thread = threading.get_ident()
+        decode_threads = []
+
+        def decode(token):
+            decode_threads.append(threading.get_ident())
+            return {"type": "access", "sub": "1", "exp": 2 ** 40}
+
+        with override_settings(JWT_JWKS_URL="https://core.invalid/api/auth/jwks/"), \
+                patch("core.jwt_utils.decode_token", side_effect=decode):
+            self.assertEqual((await atry_decode_token("cold-token"))["sub"], "1")
+            await adecode_token("refresh-token")
+            # Cached now: answered on the loop without decoding again.
+            self.assertEqual((await atry_decode_token("cold-token"))["sub"], "1")
+        self.assertEqual(len(decode_threads), 2)
+        self.assertNotIn(loop_thread, decode_threads)
+        # One miss and one hit: the offload check doesn't count as a lookup.
+        self.assertEqual((self.cache.stats()["misses"], self.cache.stats()["hits"]), (1, 1))
+
+
+class AsymmetricJWTTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        from core.jwt_keys import generate_private_key_pem, private_keys
+
+        self.keys_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.keys_dir.cleanup)
+        for kid in ("2026-01", "2026-02"):
+            with open(f"{self.keys_dir.name}/{kid}.pem", "wb") as f:
+                f.write(generate_private_key_pem("RS256"))
+
+        overrides = override_settings(
+            JWT_ALGORITHM="RS256",
+            JWT_SIGNING_KEYS_DIR=self.keys_dir.name,
+            JWT_SIGNING_KID="2026-02",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        private_keys.cache_clear()
+        self.addCleanup(private_keys.cache_clear)
+        self.user = User.objects.create_user(email="rsa@test.com", password="pass1234")
+
+    def test_tokens_are_signed_with_active_kid(self):
+        import jwt
+        from core.jwt_utils import create_access_token, decode_token
+
+        token = create_access_token(self.user)
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "2026-02")
+        self.assertEqual(decode_token(token)["sub"], str(self.user.id))
+
+    def test_jwks_publishes_all_keys(self):
+        res = self.client.get("/api/auth/jwks/")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("max-age", res["Cache-Control"])
+        self.assertEqual({k["kid"] for k in res.json()["keys"]}, {"2026-01", "2026-02"})
+
+    def test_jwks_verifier_validates_locally(self):
+        from unittest.mock import patch
+        from core.jwt_keys import jwks
+        from core.jwt_utils import create_access_token
+        from core.jwt_verifier import JWKSVerifier
+
+        verifier = JWKSVerifier("http://core.invalid/api/auth/jwks/", algorithms=["RS256"])
+        token = create_access_token(self.user)
+        with patch("jwt.PyJWKClient.fetch_data", return_value=jwks()) as fetch_mock:
+            self.assertEqual(verifier.verify(token)["sub"], str(self.user.id))
+            self.assertEqual(verifier.verify(token)["sub"], str(self.user.id))
+            fetch_mock.assert_called_once()
+
+
+class VerifyFastPathTests(TestCase):
+    def setUp(self):
+        from core.auth_cache import token_version_cache
+        token_version_cache.clear()
+        self.user = User.objects.create_user(
+            email="verify@test.com", password="pass1234", first_name="Sara", last_name="K", age=30,
+        )
+        self.client.post(
+            "/api/auth/login/",
+            data='{"email":"verify@test.com","password":"pass1234"}',
+            content_type="application/json",
+        )
+
+    def test_headers_come_from_claims(self):
+        self.assertEqual(self.client.get("/api/auth/verify/").status_code, 200)
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/auth/verify/")
+        self.assertEqual(res["X-User-Id"], str(self.user.id))
+        self.assertEqual(res["X-User-First-Name"], "Sara")
+        self.assertEqual(res["X-User-Age"], "30")
+        # nginx's proxy_cache skips responses marked private.
+        from django.conf import settings
+        self.assertEqual(res["Cache-Control"], f"public, max-age={settings.JWT_VERIFY_CACHE_SECONDS}")
+        self.assertIn("Cookie", res["Vary"])
+
+    def test_cold_verify_only_checks_the_token_version(self):
+        from core.auth_cache import token_version_cache, user_cache
+        token_version_cache.clear()
+        user_cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/auth/verify/").status_code, 200)
+
+    def test_session_fallback_is_not_cacheable(self):
+        self.client.cookies.clear()
+        self.client.force_login(self.user)
+        res = self.client.get("/api/auth/verify/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Cache-Control"], "private, no-store")
+
+    def test_revoked_token_is_rejected(self):
+        access = self.client.cookies["access_token"].value
+        self.client.post("/api/auth/logout/", data="{}", content_type="application/json")
+        self.client.cookies["access_token"] = access
+        self.assertEqual(self.client.get("/api/auth/verify/").status_code, 401)
+
+    def test_missing_token_is_rejected(self):
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get("/api/auth/verify/").status_code, 401)
+
+
+class PathScopedHandlerTests(TestCase):
+    def _get(self, path):
+        from django.test import RequestFactory
+        from core.handlers import PathScopedWSGIHandler
+
+        captured = {}
+
+        def start_response(status, headers):
+            captured["status"] = status
+            captured["headers"] = dict(headers)
+
+        environ = RequestFactory().get(path, HTTP_HOST="localhost").environ
+        PathScopedWSGIHandler()(environ, start_response).close()
+        return captured
+
+    def test_api_paths_use_lean_chain(self):
+        res = self._get("/api/health/")
+        self.assertTrue(res["status"].startswith("200"))
+        self.assertNotIn("X-Frame-Options", res["headers"])
+
+    def test_api_paths_still_authenticate(self):
+        res = self._get("/api/auth/me/")
+        self.assertTrue(res["status"].startswith("401"))
+
+    def test_html_paths_keep_full_chain(self):
+        res = self._get("/auth/")
+        self.assertTrue(res["status"].startswith("200"))
+        self.assertIn("X-Frame-Options", res["headers"])
+
+    def test_asgi_handler_scopes_api_paths(self):
+        from asgiref.sync import async_to_sync
+        from asgiref.testing import ApplicationCommunicator
+        from core.handlers import PathScopedASGIHandler
+
+        async def get(path):
+            scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                     "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+                     "headers": [(b"host", b"localhost")], "server": ("localhost", 80)}
+            app = ApplicationCommunicator(PathScopedASGIHandler(), scope)
+            await app.send_input({"type": "http.request", "body": b""})
+            start = await app.receive_output(timeout=5)
+            await app.receive_output(timeout=5)
+            return start["status"], dict(start["headers"])
+
+        status, headers = async_to_sync(get)("/api/auth/me/")
+        self.assertEqual(status, 401)
+        self.assertNotIn(b"X-Frame-Options", headers)
+
+
+class UsersBatchTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(email=f"batch{i}@test.com", password="pass1234", first_name=f"U{i}")
+            for i in range(3)
+        ]
+        self.users[0].is_staff = True
+        self.users[0].save()
+        self.client.force_login(self.users[0])
+
+    def test_resolves_ids_in_one_query_with_etag(self):
+        import uuid
+        ids = [str(u.id) for u in self.users] + [str(uuid.uuid4())]
+        res = self.client.get("/api/users/batch/", {"ids": ",".join(ids), "fields": "first_name"})
+        self.assertEqual(res.status_code, 200)
+        body = res.json()
+        self.assertEqual(body["users"][ids[1]], {"id": ids[1], "first_name": "U1"})
+        self.assertEqual(body["missing"], [ids[3]])
+
+        res2 = self.client.get(
+            "/api/users/batch/",
+            {"ids": ",".join(ids), "fields": "first_name"},
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+        self.assertEqual(res2.status_code, 304)
+
+    def test_rejects_unknown_fields_and_bad_ids(self):
+        res = self.client.post(
+            "/api/users/batch/",
+            data='{"ids": ["%s"], "fields": ["password"]}' % self.users[0].id,
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get("/api/users/batch/", {"ids": "nope"})
+        self.assertEqual(res.status_code, 400)
+
+    @override_settings(CORE_SERVICE_TOKEN="svc-token")
+    def test_only_staff_and_services_may_resolve_users(self):
+        query = {"ids": str(self.users[2].id)}
+        self.client.force_login(self.users[1])
+        self.assertEqual(self.client.get("/api/users/batch/", query).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/users/batch/", query).status_code, 401)
+        self.assertEqual(self.client.get("/api/users/batch/", query, HTTP_X_SERVICE_TOKEN="wrong").status_code, 401)
+        self.assertEqual(self.client.get("/api/users/batch/", query, HTTP_X_SERVICE_TOKEN="svc-token").status_code, 200)
+
+    def test_client_caches_results(self):
+        from core.user_client import UserDirectoryClient
+
+        client = UserDirectoryClient(base_url="")
+        ids = [u.id for u in self.users]
+        with self.assertNumQueries(1):
+            users = client.get_many(ids)
+        self.assertEqual(len(users), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(ids[2])["first_name"], "U2")
+
+        users[str(ids[2])]["first_name"] = "changed by a caller"
+        client.get(ids[2])["display"] = "U2 (3)"
+        cached = client.get(ids[2])
+        self.assertEqual(cached["first_name"], "U2")
+        self.assertNotIn("display", cached)
+
+
+@override_settings(CORE_SERVICE_TOKEN="svc-token")
+class UserDirectoryHttpTests(LiveServerTestCase):
+    def test_client_sends_service_token(self):
+        import urllib.error
+        from core.user_client import UserDirectoryClient
+
+        user = User.objects.create_user(email="remote@test.com", password="pass1234", first_name="Remote")
+        client = UserDirectoryClient(base_url=self.live_server_url)
+        self.assertEqual(client.get(user.id)["first_name"], "Remote")
+
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            UserDirectoryClient(base_url=self.live_server_url, token="").get(user.id)
+        self.assertEqual(raised.exception.code, 401)
+
+
+class BulkImportUsersTests(TestCase):
+    def test_imports_rows_and_reports_duplicates(self):
+        import io
+        import tempfile
+        from django.core.management import call_command
+
+        User.objects.create_user(email="taken@test.com", password="pass1234")
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("email,password,first_name,last_name,age\n")
+            f.write("new1@test.com,pass1234,N,One,20\n")
+            f.write("NEW2@test.com,pass5678,N,Two,\n")
+            f.write("new1@test.com,other,N,Dup,21\n")
+            f.write("taken@test.com,pass1234,T,Aken,22\n")
+            f.write("not-an-email,pass1234,X,Y,23\n")
+        self.addCleanup(lambda: __import__("os").remove(f.name))
+
+        out = io.StringIO()
+        call_command("bulk_import_users", f.name, "--workers", "2", "--batch-size", "2", stdout=out, stderr=io.StringIO())
+        self.assertIn("created 2, duplicates 2, invalid 1", out.getvalue())
+        self.assertTrue(User.objects.get(email="new1@test.com").check_password("pass1234"))
+        self.assertEqual(User.objects.get(email="new2@test.com").last_name, "Two")
+
+
+class PasswordHashingPoolTests(TestCase):
+    def test_rejects_when_queue_is_full(self):
+        import threading
+        from core.hashing import HashingPool, PoolSaturated
+
+        pool = HashingPool(workers=1, queue_size=0, timeout=5, retry_after=3)
+        release = threading.Event()
+        future = pool.submit(release.wait)
+        with self.assertRaises(PoolSaturated) as ctx:
+            pool.submit(lambda: None)
+        self.assertEqual(ctx.exception.retry_after, 3)
+        self.assertEqual(pool.stats()["in_flight"], 1)
+
+        release.set()
+        future.result(timeout=5)
+        self.assertEqual(pool.run(lambda: 42), 42)
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+    def test_login_returns_503_when_saturated(self):
+        from unittest.mock import patch
+        from core.hashing import PoolSaturated
+
+        User.objects.create_user(email="busy@test.com", password="pass1234")
+        with patch("core.hashing.hash_pool.submit", side_effect=PoolSaturated(2)):
+            res = self.client.post(
+                "/api/auth/login/",
+                data='{"email":"busy@test.com","password":"pass1234"}',
+                content_type="application/json",
+            )
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "2")
+
+    def test_login_page_returns_503_when_saturated(self):
+        from unittest.mock import patch
+        from core.hashing import PoolSaturated
+
+        User.objects.create_user(email="busy@test.com", password="pass1234")
+        with patch("core.hashing.hash_pool.submit", side_effect=PoolSaturated(2)):
+            res = self.client.post("/auth/", data={"email": "busy@test.com", "password": "pass1234"})
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "2")
+
+    def test_signup_page_creates_user(self):
+        res = self.client.post("/auth/signup/", data={"email": "page@test.com", "password": "pass1234"})
+        self.assertEqual(res.status_code, 302)
+        self.assertIn("access_token", res.cookies)
+        self.assertTrue(User.objects.get(email="page@test.com").check_password("pass1234"))
+
+    def test_login_rejects_wrong_password(self):
+        User.objects.create_user(email="wrong@test.com", password="pass1234")
+        res = self.client.post(
+            "/api/auth/login/",
+            data='{"email":"wrong@test.com","password":"nope"}',
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 401)
+
+
+class TeamBulkheadTests(TestCase):
+    def test_rejects_past_limit_and_counts(self):
+        from core.bulkhead import Bulkhead
+
+        bulkhead = Bulkhead("team11", limit=1, queue_timeout=0.01)
+        self.assertTrue(bulkhead.acquire())
+        self.assertFalse(bulkhead.acquire())
+        bulkhead.release()
+        self.assertTrue(bulkhead.acquire())
+        bulkhead.release()
+        stats = bulkhead.stats()
+        self.assertEqual((stats["in_flight"], stats["accepted"], stats["rejected"]), (0, 2, 1))
+
+    def test_saturated_team_gets_503_while_core_is_unaffected(self):
+        from unittest.mock import patch
+        from core.bulkhead import Bulkhead
+
+        # A local bulkhead so the test does not depend on which TEAM_APPS are installed.
+        bulkhead = Bulkhead("team11", limit=1, queue_timeout=0.01)
+        with patch.dict("core.bulkhead.bulkheads", {"team11": bulkhead}):
+            self.assertTrue(bulkhead.acquire())
+            try:
+                res = self.client.get("/team11/")
+                self.assertEqual(res.status_code, 503)
+                self.assertIn("Retry-After", res)
+                self.assertEqual(self.client.get("/api/health/").status_code, 200)
+            finally:
+                bulkhead.release()
+
+    def test_api_request_takes_one_slot(self):
+        from unittest.mock import patch
+        from core.bulkhead import Bulkhead
+
+        bulkhead = Bulkhead("team11", limit=1, queue_timeout=0.01)
+        with patch.dict("core.bulkhead.bulkheads", {"team11": bulkhead}):
+            res = self.client.get("/team11/api/ping/")
+        self.assertNotEqual(res.status_code, 503)
+        self.assertEqual(bulkhead.stats()["rejected"], 0)
+        self.assertEqual(bulkhead.stats()["in_flight"], 0)
@@ -8,5 +8,8 @@ urlpatterns = [
     path("auth/logout/", views.logout_api),
     path("auth/me/", views.me),
     path("auth/verify/", views.verify),
+    path("auth/jwks/", views.jwks),
+    path("users/batch/", views.users_batch),
     path("health/", views.health),
+    path("metrics/", views.metrics),
 ]
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Client for core's batch user lookup, for team apps that only store user_id.
+
+    from core.user_client import user_directory
+
+    users = user_directory.get_many(submission_user_ids)
+    name = users.get(str(user_id), {}).get("first_name", "")
+
+Results are kept in a local TTL cache, so repeated hydration of the same ids
+(admin lists, leaderboards) costs no round trip at all. With CORE_BASE_URL
+set the lookup goes over HTTP to /api/users/batch/, authenticated with
+CORE_SERVICE_TOKEN; otherwise (core and the team app in one process) it
+queries the user table directly.
+"""
+import json
+import urllib.request
+
+from django.conf import settings
+
+from core.lru_cache import LRUCache
+from core.users import DEFAULT_BATCH_FIELDS, parse_user_ids, resolve_users
+
+_MISSING = {}
+
+
+class UserDirectoryClient:
+    def __init__(self, base_url=None, token=None, ttl_seconds=300, max_size=20000, timeout=5.0):
+        self.base_url = (settings.CORE_BASE_URL if base_url is None else base_url).rstrip("/")
+        self.token = settings.CORE_SERVICE_TOKEN if token is None else token
+        self.timeout = timeout
+        self.cache = LRUCache(max_size, ttl_seconds)
+
+    def get_many(self, user_ids, fields=DEFAULT_BATCH_FIELDS) -> dict:
+        """Return {user_id: {...}} for every id that exists; unknown ids are omitted."""
+        fields = tuple(fields)
+        ids = parse_user_ids(user_ids)
+
+        found, pending = {}, []
+        for user_id in ids:
+            cached = self.cache.get((user_id, fields))
+            if cached is None:
+                pending.append(user_id)
+            elif cached is not _MISSING:
+                # Copies, so a caller adding fields can't change the shared cache.
+                found[user_id] = dict(cached)
+
+        batch_size = settings.USERS_BATCH_MAX_IDS
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            users = self._fetch(chunk, fields)
+            for user_id in chunk:
+                user = users.get(user_id, _MISSING)
+                self.cache.set((user_id, fields), user)
+                if user is not _MISSING:
+                    found[user_id] = dict(user)
+        return found
+
+    def get(self, user_id, fields=DEFAULT_BATCH_FIELDS):
+        return self.get_many([user_id], fields).get(str(user_id))
+
+    def _fetch(self, ids, fields) -> dict:
+        if not self.base_url:
+            return resolve_users(ids, fields)
+
+        request = urllib.request.Request(
+            f"{self.base_url}/api/users/batch/",
+            data=json.dumps({"ids": ids, "fields": list(fields)}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        if self.token:
+            request.add_header("X-Service-Token", self.token)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8"))["users"]
+
+
+user_directory = UserDirectoryClient()
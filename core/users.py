@@ -0,0 +1,36 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+# Columns other services may read through /api/users/batch/.
+BATCH_FIELDS = ("id", "email", "first_name", "last_name", "age", "is_active")
+DEFAULT_BATCH_FIELDS = ("id", "email", "first_name", "last_name")
+
+
+def parse_user_ids(raw_ids) -> list:
+    """Normalize a list of ids to canonical UUID strings; raises ValueError on bad input."""
+    ids = []
+    seen = set()
+    for raw in raw_ids:
+        user_id = str(uuid.UUID(str(raw).strip()))
+        if user_id not in seen:
+            seen.add(user_id)
+            ids.append(user_id)
+    return ids
+
+
+def resolve_users(ids, fields=DEFAULT_BATCH_FIELDS) -> dict:
+    """Return {user_id: {field: value}} for the given ids in a single query."""
+    fields = tuple(dict.fromkeys(("id", *fields)))
+    unknown = set(fields) - set(BATCH_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+
+    rows = User.objects.filter(id__in=ids).values(*fields)
+    users = {}
+    for row in rows:
+        row["id"] = str(row["id"])
+        users[row["id"]] = row
+    return users
@@ -1,14 +1,25 @@
+import hashlib
 import json
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth import authenticate, get_user_model
+import time
+from django.http import HttpResponseNotModified, JsonResponse
+from django.contrib.auth import get_user_model
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
+from django.utils.cache import patch_vary_headers
 from django.contrib.auth.password_validation import validate_password
 
-from core.jwt_utils import create_access_token, create_refresh_token, decode_token
-from core.auth import api_login_required
+from core.jwt_utils import (
+    adecode_token, create_access_token, create_refresh_token, token_cache,
+    token_from_request, try_decode_token,
+)
+# Async-aware decorators: the auth views below are async so a login spike
+# waiting on the hashing pool or the DB doesn't pin ASGI threads.
+from core.auth import ais_authenticated, api_login_required, csrf_exempt, require_POST, staff_or_service_required
+from core.auth_cache import current_token_version, get_active_user, token_version_cache, user_cache
+from core.users import DEFAULT_BATCH_FIELDS, parse_user_ids, resolve_users
+from core.hashing import PoolSaturated, aauthenticate_credentials, ahash_password, hash_pool
+from core.jwt_keys import jwks as build_jwks
+from core.bulkhead import stats as bulkhead_stats
 
 User = get_user_model()
 
@@ -39,13 +50,40 @@ def _clear_auth_cookies(resp: JsonResponse, settings):
     resp.delete_cookie("refresh_token", path="/api/auth/")
 
 
+def _busy_response(exc: PoolSaturated) -> JsonResponse:
+    resp = JsonResponse({"error": "Server busy, please retry"}, status=503)
+    resp["Retry-After"] = str(exc.retry_after)
+    return resp
+
+
 def health(request):
     return JsonResponse({"status": "ok"})
 
 
+def jwks(request):
+    from django.conf import settings
+
+    resp = JsonResponse(build_jwks())
+    resp["Cache-Control"] = f"public, max-age={settings.JWT_JWKS_CACHE_SECONDS}"
+    return resp
+
+
+@api_login_required
+def metrics(request):
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff only"}, status=403)
+    return JsonResponse({
+        "auth_user_cache": user_cache.stats(),
+        "auth_token_version_cache": token_version_cache.stats(),
+        "jwt_decode_cache": token_cache.stats(),
+        "password_hashing": hash_pool.stats(),
+        "team_bulkheads": bulkhead_stats(),
+    })
+
+
 @csrf_exempt
 @require_POST
-def signup_api(request):
+async def signup_api(request):
     from django.conf import settings
 
     try:
@@ -84,16 +122,17 @@ def signup_api(request):
             return JsonResponse({"error": "age must be between 1 and 120"}, status=400)
 
     # ---- Uniqueness
-    if User.objects.filter(email=email).exists():
+    if await User.objects.filter(email=email).aexists():
         return JsonResponse({"error": "email already registered"}, status=409)
 
-    user = User.objects.create_user(
-        email=email,
-        password=password,
-        first_name=first_name,
-        last_name=last_name,
-        age=age,
-    )
+    try:
+        password_hash = await ahash_password(password)
+    except PoolSaturated as e:
+        return _busy_response(e)
+
+    user = User.objects.build_user(email, first_name=first_name, last_name=last_name, age=age)
+    user.password = password_hash
+    await user.asave()
 
     access = create_access_token(user)
     refresh = create_refresh_token(user)
@@ -113,7 +152,7 @@ def signup_api(request):
 
 @csrf_exempt
 @require_POST
-def login_api(request):
+async def login_api(request):
     from django.conf import settings
 
     try:
@@ -124,7 +163,10 @@ def login_api(request):
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
 
-    user = authenticate(request, username=email, password=password)
+    try:
+        user = await aauthenticate_credentials(email, password)
+    except PoolSaturated as e:
+        return _busy_response(e)
     if user is None:
         return JsonResponse({"error": "Invalid credentials"}, status=401)
     if not user.is_active:
@@ -140,7 +182,7 @@ def login_api(request):
 
 @csrf_exempt
 @require_POST
-def refresh_api(request):
+async def refresh_api(request):
     from django.conf import settings
 
     rt = request.COOKIES.get("refresh_token")
@@ -148,13 +190,13 @@ def refresh_api(request):
         return JsonResponse({"error": "Missing refresh token"}, status=401)
 
     try:
-        payload = decode_token(rt)
+        payload = await adecode_token(rt)
         if payload.get("type") != "refresh":
             return JsonResponse({"error": "Invalid token"}, status=401)
 
         user_id = payload.get("sub")
         tv = payload.get("tv")
-        user = User.objects.filter(id=user_id, is_active=True).first()
+        user = await User.objects.filter(id=user_id, is_active=True).afirst()
         if not user or user.token_version != tv:
             return JsonResponse({"error": "Invalid token"}, status=401)
 
@@ -170,13 +212,13 @@ def refresh_api(request):
 
 @csrf_exempt
 @require_POST
-def logout_api(request):
+async def logout_api(request):
     from django.conf import settings
 
-    user = getattr(request, "user", None)
-    if user and getattr(user, "is_authenticated", False):
+    if await ais_authenticated(request):
+        user = request.user
         user.token_version += 1
-        user.save(update_fields=["token_version"])
+        await user.asave(update_fields=["token_version"])
 
     resp = JsonResponse({"ok": True})
     _clear_auth_cookies(resp, settings)
@@ -189,13 +231,105 @@ def me(request):
     return JsonResponse({"ok": True, "user": {"email": u.email, "first_name": u.first_name, "last_name": u.last_name, "age": u.age}})
 
 
-@api_login_required
 def verify(request):
-    u = request.user
+    """
+    nginx auth_request target. Identity headers come straight from the signed
+    access token claims; the only lookup is the cached token_version used for
+    revocation. The short public max-age lets a gateway microcache the answer
+    keyed on the token (e.g. proxy_cache_key $cookie_access_token); nginx
+    does not store responses marked private. Vary keeps any other shared
+    cache from serving one user's answer to another.
+    """
+    from django.conf import settings
+
+    token = token_from_request(request)
+    payload = try_decode_token(token) if token else None
+    if payload is None or payload.get("type") != "access":
+        # Session-authenticated callers (admin / test client) keep working.
+        if getattr(request, "user", None) is None or not request.user.is_authenticated:
+            return JsonResponse({"detail": "Authentication required"}, status=401)
+        return _verified_response(request.user.id, {
+            "email": request.user.email,
+            "first_name": request.user.first_name,
+            "last_name": request.user.last_name,
+            "age": request.user.age,
+        }, max_age=0)
+
+    user_id = payload.get("sub")
+    if current_token_version(user_id) != payload.get("tv"):
+        return JsonResponse({"detail": "Authentication required"}, status=401)
+
+    claims = payload
+    if "first_name" not in payload:
+        # Tokens issued before profile claims were added.
+        user = get_active_user(user_id, payload.get("tv"))
+        if user is None:
+            return JsonResponse({"detail": "Authentication required"}, status=401)
+        claims = {"email": user.email, "first_name": user.first_name, "last_name": user.last_name, "age": user.age}
+
+    remaining = int(payload["exp"] - time.time())
+    return _verified_response(user_id, claims, max_age=max(0, min(settings.JWT_VERIFY_CACHE_SECONDS, remaining)))
+
+
+def _verified_response(user_id, claims: dict, max_age: int):
     resp = JsonResponse({"ok": True})
-    resp["X-User-Id"] = str(u.id)
-    resp["X-User-Email"] = u.email
-    resp["X-User-First-Name"] = u.first_name or ""
-    resp["X-User-Last-Name"] = u.last_name or ""
-    resp["X-User-Age"] = str(u.age or "")
+    resp["X-User-Id"] = str(user_id)
+    resp["X-User-Email"] = claims.get("email") or ""
+    resp["X-User-First-Name"] = claims.get("first_name") or ""
+    resp["X-User-Last-Name"] = claims.get("last_name") or ""
+    resp["X-User-Age"] = str(claims.get("age") or "")
+    if max_age:
+        resp["Cache-Control"] = f"public, max-age={max_age}"
+        patch_vary_headers(resp, ["Cookie", "Authorization"])
+    else:
+        resp["Cache-Control"] = "private, no-store"
+    return resp
+
+
+
+@csrf_exempt
+@staff_or_service_required
+def users_batch(request):
+    """
+    Resolve many user ids in one query: GET ?ids=a,b&fields=email,first_name
+    or POST {"ids": [...], "fields": [...]}. Unknown ids are listed in "missing".
+    Only staff and services holding CORE_SERVICE_TOKEN may call it.
+    """
+    from django.conf import settings
+
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except Exception:
+            return JsonResponse({"error": "Invalid JSON"}, status=400)
+        raw_ids = data.get("ids") or []
+        fields = data.get("fields") or DEFAULT_BATCH_FIELDS
+    elif request.method == "GET":
+        raw_ids = [i for i in request.GET.get("ids", "").split(",") if i]
+        fields = [f for f in request.GET.get("fields", "").split(",") if f] or DEFAULT_BATCH_FIELDS
+    else:
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    if not isinstance(raw_ids, list) or not isinstance(fields, (list, tuple)) \
+            or not all(isinstance(f, str) for f in fields):
+        return JsonResponse({"error": "ids and fields must be lists"}, status=400)
+    if len(raw_ids) > settings.USERS_BATCH_MAX_IDS:
+        return JsonResponse({"error": f"at most {settings.USERS_BATCH_MAX_IDS} ids per request"}, status=400)
+
+    try:
+        ids = parse_user_ids(raw_ids)
+        users = resolve_users(ids, fields)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    body = {"users": users, "missing": [i for i in ids if i not in users]}
+    etag = '"%s"' % hashlib.sha256(
+        json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:32]
+    if request.headers.get("If-None-Match") == etag:
+        resp = HttpResponseNotModified()
+    else:
+        resp = JsonResponse(body)
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "private, no-cache"
     return resp
@@ -1,23 +1,36 @@
 from django.shortcuts import render, redirect
-from django.views.decorators.http import require_http_methods
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.conf import settings
 
+from core.auth import require_http_methods
+from core.hashing import PoolSaturated, aauthenticate_credentials, ahash_password
 from core.jwt_utils import create_access_token, create_refresh_token
 from core.views import _set_auth_cookies  # reuse same cookie logic
 
 User = get_user_model()
 
 
+def _busy_page(request, template, exc):
+    resp = render(request, template, {"error": "سرور شلوغ است. لطفاً چند لحظه دیگر دوباره تلاش کنید."}, status=503)
+    resp["Retry-After"] = str(exc.retry_after)
+    return resp
+
+
+# login_page and signup_page are async like the JSON auth views: under ASGI a
+# sync view would hold the single thread-sensitive executor while it waits
+# for the hashing pool.
 @require_http_methods(["GET", "POST"])
-def login_page(request):
+async def login_page(request):
     error = None
 
     if request.method == "POST":
         email = (request.POST.get("email") or "").strip().lower()
         password = request.POST.get("password") or ""
 
-        user = authenticate(request, username=email, password=password)
+        try:
+            user = await aauthenticate_credentials(email, password)
+        except PoolSaturated as e:
+            return _busy_page(request, "auth/login.html", e)
         if user is None:
             error = "ایمیل یا رمز عبور اشتباه است."
         elif not user.is_active:
@@ -33,7 +46,7 @@ def login_page(request):
 
 
 @require_http_methods(["GET", "POST"])
-def signup_page(request):
+async def signup_page(request):
     error = None
 
     if request.method == "POST":
@@ -53,16 +66,16 @@ def signup_page(request):
         if not error:
             if not email or not password:
                 error = "ایمیل و رمز عبور الزامی است."
-            elif User.objects.filter(email=email).exists():
+            elif await User.objects.filter(email=email).aexists():
                 error = "این ایمیل قبلاً ثبت شده است."
             else:
-                user = User.objects.create_user(
-                    email=email,
-                    password=password,
-                    first_name=first_name,
-                    last_name=last_name,
-                    age=age,
-                )
+                try:
+                    password_hash = await ahash_password(password)
+                except PoolSaturated as e:
+                    return _busy_page(request, "auth/signup.html", e)
+                user = User.objects.build_user(email, first_name=first_name, last_name=last_name, age=age)
+                user.password = password_hash
+                await user.asave()
                 access = create_access_token(user)
                 refresh = create_refresh_token(user)
                 resp = redirect("home")
@@ -1,8 +1,10 @@
 from django.contrib import admin
 from .models import (
     Submission, WritingSubmission, ListeningSubmission, 
-    AssessmentResult, QuestionCategory, Question
+    AssessmentResult, QuestionCategory, Question, AssessmentJob,
+    AssessmentCacheEntry, TranscriptionCacheEntry, AudioUpload, UserScoreStats,
 )
+from . import score_stats
 
 
 @admin.register(Submission)
@@ -13,6 +15,11 @@ class SubmissionAdmin(admin.ModelAdmin):
     readonly_fields = ['submission_id', 'created_at']
     ordering = ['-created_at']
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and {'overall_score', 'status'} & set(form.changed_data):
+            score_stats.rescored(obj)
+
 
 @admin.register(WritingSubmission)
 class WritingSubmissionAdmin(admin.ModelAdmin):
@@ -35,6 +42,43 @@ class AssessmentResultAdmin(admin.ModelAdmin):
     search_fields = ['submission__submission_id']
 
 
+@admin.register(AssessmentJob)
+class AssessmentJobAdmin(admin.ModelAdmin):
+    list_display = ['job_id', 'submission', 'status', 'attempts', 'run_after', 'locked_by']
+    list_filter = ['status']
+    search_fields = ['submission__submission_id', 'locked_by']
+    readonly_fields = ['job_id', 'metrics', 'created_at', 'updated_at']
+
+
+@admin.register(AssessmentCacheEntry)
+class AssessmentCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['cache_key', 'submission_type', 'hit_count', 'last_used_at', 'expires_at']
+    list_filter = ['submission_type']
+    readonly_fields = ['cache_key', 'created_at']
+
+
+@admin.register(TranscriptionCacheEntry)
+class TranscriptionCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['audio_sha256', 'model', 'language', 'hit_count', 'last_used_at']
+    search_fields = ['audio_sha256']
+    readonly_fields = ['cache_key', 'created_at']
+
+
+@admin.register(AudioUpload)
+class AudioUploadAdmin(admin.ModelAdmin):
+    list_display = ['upload_id', 'user_id', 'received_bytes', 'total_size', 'completed', 'created_at']
+    list_filter = ['completed']
+    search_fields = ['upload_id', 'user_id']
+    readonly_fields = ['upload_id', 'created_at']
+
+
+@admin.register(UserScoreStats)
+class UserScoreStatsAdmin(admin.ModelAdmin):
+    list_display = ['user_id', 'completed_count', 'writing_count', 'speaking_count', 'updated_at']
+    search_fields = ['user_id']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(QuestionCategory)
 class QuestionCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'question_type', 'is_active']
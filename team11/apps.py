@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class Team11Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'team11'
+
+    def ready(self):
+        from team11 import signals  # noqa: F401
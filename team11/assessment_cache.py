@@ -0,0 +1,130 @@
+"""
+Content-addressed cache of AI assessments.
+
+Entries are keyed by a SHA-256 of the normalized task text together with the
+prompt version and the preferred provider's name and model, so resubmitting
+the same essay (or one that only differs in whitespace) reuses the stored
+result instead of paying for another provider call, while editing a prompt or
+switching models simply misses. Only answers from that provider are stored:
+a failover or hedged answer from another model, or a fake provider's, is not.
+Entries expire after TEAM11_ASSESSMENT_CACHE_TTL_SECONDS and the least
+recently used ones are evicted beyond TEAM11_ASSESSMENT_CACHE_MAX_ENTRIES.
+Hit/miss counters are per process; stored_hits in stats() covers all of them.
+"""
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import AssessmentCacheEntry, SubmissionType
+from .services import ai_service
+from .services.prompts import PROMPT_VERSION
+
+DB = 'team11'
+TTL_SECONDS = int(os.getenv("TEAM11_ASSESSMENT_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+MAX_ENTRIES = int(os.getenv("TEAM11_ASSESSMENT_CACHE_MAX_ENTRIES", "10000"))
+
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'stores': 0, 'skipped': 0, 'evictions': 0}
+
+
+def _count(name, n=1):
+    with _lock:
+        _counters[name] += n
+
+
+def _entries():
+    return AssessmentCacheEntry.objects.using(DB)
+
+
+def normalize(text):
+    return ' '.join(unicodedata.normalize('NFKC', text or '').split())
+
+
+def _key(*parts):
+    primary = ai_service.chat_pool.primary
+    raw = json.dumps([PROMPT_VERSION, primary.name, primary.model, *parts], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def writing_key(topic, text_body):
+    return _key(SubmissionType.WRITING, normalize(topic), normalize(text_body))
+
+
+def lookup(key):
+    """Return the cached assessment for key, or None."""
+    now = timezone.now()
+    result = _entries().filter(pk=key, expires_at__gt=now).values_list('result', flat=True).first()
+    if result is None:
+        _count('misses')
+        return None
+    _entries().filter(pk=key).update(hit_count=F('hit_count') + 1, last_used_at=now)
+    _count('hits')
+    return {**result, 'success': True}
+
+
+alookup = sync_to_async(lookup)
+
+
+def cacheable(result):
+    """Whether result was produced by the provider and model the keys are built from."""
+    primary = ai_service.chat_pool.primary
+    return primary.cacheable and (result.get('provider'), result.get('model')) == (primary.name, primary.model)
+
+
+def store(key, submission_type, result):
+    """Store result under key, unless another provider than the key's produced it."""
+    if not cacheable(result):
+        _count('skipped')
+        return
+    now = timezone.now()
+    result = {k: v for k, v in result.items() if k not in ('success', 'error', 'retryable')}
+    _entries().update_or_create(
+        cache_key=key,
+        defaults={
+            'submission_type': submission_type,
+            'result': result,
+            'created_at': now,
+            'last_used_at': now,
+            'expires_at': now + timedelta(seconds=TTL_SECONDS),
+        },
+    )
+    _count('stores')
+    _evict(now)
+
+
+def _evict(now):
+    evicted, _ = _entries().filter(expires_at__lte=now).delete()
+    overflow = _entries().count() - MAX_ENTRIES
+    if overflow > 0:
+        oldest = list(_entries().order_by('last_used_at').values_list('pk', flat=True)[:overflow])
+        evicted += _entries().filter(pk__in=oldest).delete()[0]
+    if evicted:
+        _count('evictions', evicted)
+
+
+def stats():
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    totals = _entries().aggregate(hits=Sum('hit_count'))
+    return {
+        **counters,
+        'hit_rate': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+        'entries': _entries().count(),
+        'max_entries': MAX_ENTRIES,
+        'ttl_seconds': TTL_SECONDS,
+        'stored_hits': totals['hits'] or 0,
+    }
+
+
+def reset_stats():
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
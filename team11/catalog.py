@@ -0,0 +1,70 @@
+"""
+Versioned cache of the question catalog shown on start_exam.
+
+The catalog (active categories per exam type with their active question
+counts by difficulty) is built with one aggregate query and cached under the
+current catalog version; start_exam.html also caches its rendered category
+lists under that version with {% cache %}. Saving or deleting a Question or
+QuestionCategory (including through the admin) bumps the version
+(team11.signals). Both live in Django's cache, so with a shared backend the
+bump reaches every worker at once; with the default per-process cache other
+workers catch up within TEAM11_CATALOG_CACHE_SECONDS.
+"""
+import os
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import QuestionCategory, SubmissionType
+
+DB = 'team11'
+CACHE_SECONDS = int(os.getenv("TEAM11_CATALOG_CACHE_SECONDS", "300"))
+VERSION_KEY = 'team11:catalog:version'
+DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+
+
+def version():
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        # Start from the clock so a lost counter never reuses an old version.
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        current = cache.get(VERSION_KEY)
+    return current
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Nothing cached yet, or the counter was evicted: version() starts a new one.
+        pass
+
+
+def build():
+    active = Q(questions__is_active=True)
+    counts = {
+        difficulty: Count('questions', filter=active & Q(questions__difficulty_level=difficulty))
+        for difficulty in DIFFICULTIES
+    }
+    rows = (
+        QuestionCategory.objects.using(DB)
+        .filter(is_active=True)
+        .annotate(question_count=Count('questions', filter=active), **counts)
+        .values('category_id', 'name', 'description', 'question_type', 'question_count', *DIFFICULTIES)
+        .order_by('name')
+    )
+    catalog = {SubmissionType.WRITING: [], SubmissionType.LISTENING: []}
+    for row in rows:
+        row['by_difficulty'] = {difficulty: row.pop(difficulty) for difficulty in DIFFICULTIES}
+        catalog.setdefault(row['question_type'], []).append(row)
+    return catalog
+
+
+def get(catalog_version=None):
+    key = f"team11:catalog:{catalog_version or version()}"
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = build()
+        cache.set(key, catalog, CACHE_SECONDS)
+    return catalog
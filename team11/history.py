@@ -0,0 +1,91 @@
+"""
+Keyset-paginated submission history.
+
+Pages are ordered newest first on (created_at, submission_id) and the cursor
+is the last row of the previous page, so every page is one index range scan
+however deep the user scrolls. Only the columns the list shows are loaded;
+essays, transcripts and feedback stay on the detail page.
+"""
+import base64
+import uuid
+from datetime import datetime
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+from django.utils.text import Truncator
+
+from .models import AnalysisStatus, Submission, SubmissionType
+
+DB = 'team11'
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+LIST_COLUMNS = [
+    'submission_id', 'user_id', 'submission_type', 'status', 'overall_score', 'created_at',
+    'writing_details__topic', 'writing_details__question', 'writing_details__question__question_text',
+    'listening_details__topic', 'listening_details__question', 'listening_details__question__question_text',
+]
+
+
+def encode_cursor(submission):
+    raw = f"{submission.created_at.isoformat()}|{submission.submission_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, submission_id) from a cursor; ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, submission_id = raw.split('|')
+        return datetime.fromisoformat(created_at), uuid.UUID(submission_id)
+    except (UnicodeDecodeError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def page(user_id, cursor=None, limit=PAGE_SIZE, status=None, submission_type=None):
+    """One page of the user's submissions and the cursor of the next (None on the last page)."""
+    submissions = (
+        Submission.objects.using(DB)
+        .filter(user_id=user_id)
+        .select_related('writing_details__question', 'listening_details__question')
+        .only(*LIST_COLUMNS)
+        .order_by('-created_at', '-submission_id')
+    )
+    if status:
+        submissions = submissions.filter(status=status)
+    if submission_type:
+        submissions = submissions.filter(submission_type=submission_type)
+    if cursor:
+        created_at, submission_id = decode_cursor(cursor)
+        submissions = submissions.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, submission_id__lt=submission_id)
+        )
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = list(submissions[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _title(submission):
+    try:
+        detail = (submission.writing_details if submission.submission_type == SubmissionType.WRITING
+                  else submission.listening_details)
+    except ObjectDoesNotExist:
+        return 'Topic: Unknown'
+    if detail.question_id:
+        return f"Question: {Truncator(detail.question.question_text).words(10)}"
+    return f"Topic: {Truncator(detail.topic or 'Unknown').words(10)}"
+
+
+def item(submission):
+    """List entry for a submission, as rendered by the dashboard and returned by the history API."""
+    return {
+        'submission_id': str(submission.submission_id),
+        'type': submission.submission_type,
+        'status': submission.status,
+        'score': submission.overall_score,
+        'created_at': submission.created_at,
+        'title': _title(submission),
+        'has_details': submission.status in (AnalysisStatus.COMPLETED, AnalysisStatus.FAILED),
+    }
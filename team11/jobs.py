@@ -0,0 +1,379 @@
+"""
+Durable queue for AI assessments.
+
+The submit views only insert an AssessmentJob row; `manage.py
+run_assessment_workers` claims and runs the jobs. A claim is a lease: the
+worker heartbeats while the job runs, and a job whose lease expired (the
+worker was killed or restarted) is put back in the queue by
+recover_orphans(). Errors the AI layer marks as retryable are retried with
+exponential backoff until max_attempts; everything else fails the submission.
+Rate-limited jobs are deferred until the provider has room again without
+using up an attempt. AssessmentJob.metrics['queue'] records how long each
+job waited, for capacity planning.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    AssessmentJob, AssessmentResult, AnalysisStatus, JobStatus,
+    ListeningSubmission, Submission, SubmissionType, WritingSubmission,
+)
+from . import assessment_cache, score_stats, transcription_cache
+from .services import assess_speaking, assess_writing, async_ai_service
+from .services import audio_preprocess
+from .services.ai_service import transcribe_segments
+
+logger = logging.getLogger(__name__)
+
+DB = 'team11'
+LEASE_SECONDS = int(os.getenv("TEAM11_JOB_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.getenv("TEAM11_JOB_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 300
+MAX_DEFERRALS = int(os.getenv("TEAM11_JOB_MAX_DEFERRALS", "20"))
+DEFER_JITTER = 0.5
+
+FAILED_MESSAGE = 'ارزیابی ناموفق بود. لطفاً دوباره تلاش کنید.'
+NO_SPEECH_MESSAGE = 'صدایی تشخیص داده نشد. لطفاً واضح‌تر صحبت کنید.'
+
+
+def _jobs():
+    return AssessmentJob.objects.using(DB)
+
+
+def enqueue(submission):
+    return _jobs().create(submission=submission, max_attempts=MAX_ATTEMPTS)
+
+
+async def aenqueue(submission):
+    return await _jobs().acreate(submission=submission, max_attempts=MAX_ATTEMPTS)
+
+
+def backoff_seconds(attempt):
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim(worker_id, lease_seconds=LEASE_SECONDS):
+    """
+    Lease the next due job to worker_id, or return None. The claim is a
+    conditional UPDATE, so concurrent workers on any node never get the same job.
+    """
+    now = timezone.now()
+    candidates = (
+        _jobs()
+        .filter(status=JobStatus.QUEUED, run_after__lte=now)
+        .order_by('run_after')
+        .values_list('pk', 'created_at', 'run_after', 'metrics')[:10]
+    )
+    for pk, created_at, run_after, metrics in candidates:
+        claimed = _jobs().filter(pk=pk, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING,
+            locked_by=worker_id,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+            metrics=_with_queue_wait(metrics, now - created_at, now - run_after),
+            updated_at=now,
+        )
+        if claimed:
+            return _jobs().select_related('submission').get(pk=pk)
+    return None
+
+
+def _ms(delta):
+    return int(delta.total_seconds() * 1000)
+
+
+def _with_queue_wait(metrics, since_submitted, since_due):
+    # wait_ms: submission to the start of this run, backoff and deferrals included;
+    # worker_wait_ms: how long the job was due before a worker was free.
+    metrics = metrics or {}
+    queue = {**metrics.get('queue', {}), 'wait_ms': _ms(since_submitted), 'worker_wait_ms': _ms(since_due)}
+    return {**metrics, 'queue': queue}
+
+
+def heartbeat(job_id, worker_id, lease_seconds=LEASE_SECONDS):
+    """Extend the lease; False means the job was taken over and the result must be dropped."""
+    now = timezone.now()
+    return bool(
+        _jobs()
+        .filter(pk=job_id, status=JobStatus.RUNNING, locked_by=worker_id)
+        .update(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now)
+    )
+
+
+def complete(job):
+    _jobs().filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=JobStatus.SUCCEEDED,
+        locked_by='',
+        lease_expires_at=None,
+        last_error='',
+        updated_at=timezone.now(),
+    )
+
+
+def fail(job, error, retryable, message=FAILED_MESSAGE):
+    """Re-queue the job with backoff, or fail it (and its submission) for good."""
+    now = timezone.now()
+    if retryable and job.attempts < job.max_attempts:
+        delay = backoff_seconds(job.attempts)
+        _jobs().filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=JobStatus.QUEUED,
+            run_after=now + timedelta(seconds=delay),
+            locked_by='',
+            lease_expires_at=None,
+            last_error=str(error)[:2000],
+            updated_at=now,
+        )
+        logger.warning(f"Assessment job {job.pk} attempt {job.attempts} failed, retrying in {delay:.0f}s: {error}")
+        return
+
+    # Scoped to our lease like complete(): a worker whose lease expired must not
+    # fail a job another worker has reclaimed since.
+    failed = _jobs().filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=JobStatus.FAILED,
+        locked_by='',
+        lease_expires_at=None,
+        last_error=str(error)[:2000],
+        updated_at=now,
+    )
+    if not failed:
+        logger.warning(f"Assessment job {job.pk} lost its lease, not failing it")
+        return
+    _fail_submission(job.submission_id, message)
+    logger.error(f"Assessment job {job.pk} failed after {job.attempts} attempt(s): {error}")
+
+
+def defer(job, retry_after, error):
+    """
+    Re-queue a rate-limited job once the provider has room (retry_after plus
+    jitter) without using up an attempt. After MAX_DEFERRALS it is retried
+    like any other error.
+    """
+    queue = dict((job.metrics or {}).get('queue', {}))
+    if queue.get('deferrals', 0) >= MAX_DEFERRALS:
+        fail(job, error, retryable=True)
+        return
+    delay = max(1.0, retry_after) * random.uniform(1.0, 1.0 + DEFER_JITTER)
+    queue['deferrals'] = queue.get('deferrals', 0) + 1
+    queue['deferred_ms'] = queue.get('deferred_ms', 0) + int(delay * 1000)
+    job.metrics = {**(job.metrics or {}), 'queue': queue}
+    now = timezone.now()
+    _jobs().filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=JobStatus.QUEUED,
+        run_after=now + timedelta(seconds=delay),
+        attempts=F('attempts') - 1,
+        locked_by='',
+        lease_expires_at=None,
+        last_error=str(error)[:2000],
+        metrics=job.metrics,
+        updated_at=now,
+    )
+    logger.info(f"Assessment job {job.pk} rate limited, deferred {delay:.0f}s")
+
+
+def recover_orphans():
+    """Requeue jobs whose worker stopped heartbeating; fail those out of attempts."""
+    now = timezone.now()
+    orphaned = _jobs().filter(status=JobStatus.RUNNING, lease_expires_at__lt=now)
+    exhausted = list(orphaned.filter(attempts__gte=F('max_attempts')))
+    for job in exhausted:
+        fail(job, 'worker lease expired', retryable=False)
+    requeued = orphaned.filter(attempts__lt=F('max_attempts')).update(
+        status=JobStatus.QUEUED,
+        run_after=now,
+        locked_by='',
+        lease_expires_at=None,
+        last_error='worker lease expired',
+        updated_at=now,
+    )
+    if requeued or exhausted:
+        logger.warning(f"Recovered orphaned assessment jobs: {requeued} requeued, {len(exhausted)} failed")
+    return requeued, len(exhausted)
+
+
+def run_job(job):
+    """Assess the job's submission and record the outcome on the job."""
+    try:
+        submission, detail = _load(job)
+        if submission.submission_type == SubmissionType.WRITING:
+            # An identical essay may have been scored since this one was queued.
+            cache_key = assessment_cache.writing_key(detail.topic, detail.text_body)
+            result = assessment_cache.lookup(cache_key)
+            if result is None:
+                result = assess_writing(detail.topic, detail.text_body, detail.word_count)
+                if result.get('success'):
+                    assessment_cache.store(cache_key, SubmissionType.WRITING, result)
+        else:
+            result = _assess_speaking(job, detail)
+    except Exception as e:
+        logger.error(f"Assessment job {job.pk} crashed: {e}", exc_info=True)
+        fail(job, e, retryable=True)
+        return
+    record_result(job, submission, detail, result)
+
+
+async def arun_job(job):
+    """run_job for the asyncio worker: provider calls stay on the event loop."""
+    try:
+        submission, detail = await sync_to_async(_load)(job)
+        if submission.submission_type == SubmissionType.WRITING:
+            cache_key = assessment_cache.writing_key(detail.topic, detail.text_body)
+            result = await assessment_cache.alookup(cache_key)
+            if result is None:
+                result = await async_ai_service.assess_writing(detail.topic, detail.text_body, detail.word_count)
+                if result.get('success'):
+                    await sync_to_async(assessment_cache.store)(cache_key, SubmissionType.WRITING, result)
+        else:
+            result = await _aassess_speaking(job, detail)
+    except Exception as e:
+        logger.error(f"Assessment job {job.pk} crashed: {e}", exc_info=True)
+        await sync_to_async(fail)(job, e, retryable=True)
+        return
+    await sync_to_async(record_result)(job, submission, detail, result)
+
+
+def _assess_speaking(job, detail):
+    path = audio_file_path(detail.audio_file_url)
+    transcription, audio_hash = _known_transcription(detail, path)
+    if transcription is None:
+        started = time.monotonic()
+        prepared = audio_preprocess.prepare(path)
+        if not prepared['speech']:
+            return audio_preprocess.no_speech_result()
+        try:
+            transcribed = transcribe_segments(prepared['segments'])
+        finally:
+            audio_preprocess.cleanup(prepared)
+        _record_transcription_metrics(job, prepared, transcribed, started)
+        if not transcribed['success']:
+            return transcribed
+        transcription = transcribed['transcription']
+        _remember_transcription(detail, audio_hash, transcription)
+    return assess_speaking(detail.topic, path, detail.duration_seconds, transcription=transcription)
+
+
+async def _aassess_speaking(job, detail):
+    path = audio_file_path(detail.audio_file_url)
+    transcription, audio_hash = await sync_to_async(_known_transcription)(detail, path)
+    if transcription is None:
+        started = time.monotonic()
+        prepared = await asyncio.to_thread(audio_preprocess.prepare, path)
+        if not prepared['speech']:
+            return audio_preprocess.no_speech_result()
+        try:
+            transcribed = await async_ai_service.transcribe_segments(prepared['segments'])
+        finally:
+            audio_preprocess.cleanup(prepared)
+        await sync_to_async(_record_transcription_metrics)(job, prepared, transcribed, started)
+        if not transcribed['success']:
+            return transcribed
+        transcription = transcribed['transcription']
+        await sync_to_async(_remember_transcription)(detail, audio_hash, transcription)
+    return await async_ai_service.assess_speaking(
+        detail.topic, path, detail.duration_seconds, transcription=transcription,
+    )
+
+
+def _record_transcription_metrics(job, prepared, transcribed, started):
+    segments = transcribed.get('segments', [])
+    for timing, seconds in zip(segments, prepared.get('segment_seconds', [])):
+        timing['audio_seconds'] = seconds
+    job.metrics = {
+        **(job.metrics or {}),
+        'transcription': {
+            'total_ms': int((time.monotonic() - started) * 1000),
+            'segments': segments,
+            'bytes_sent': prepared.get('bytes_out'),
+        },
+    }
+    _jobs().filter(pk=job.pk).update(metrics=job.metrics)
+
+
+def _known_transcription(detail, path):
+    """Transcript saved by an earlier attempt/score, else one cached for identical audio."""
+    if detail.transcription:
+        return detail.transcription, None
+    audio_hash = transcription_cache.file_sha256(path)
+    return transcription_cache.lookup(audio_hash), audio_hash
+
+
+def _remember_transcription(detail, audio_hash, transcription):
+    # Saved before scoring so a failed scoring attempt never re-runs Whisper.
+    detail.transcription = transcription
+    detail.save(using=DB, update_fields=['transcription'])
+    transcription_cache.store(audio_hash, transcription)
+
+
+def _load(job):
+    submission = job.submission
+    model = WritingSubmission if submission.submission_type == SubmissionType.WRITING else ListeningSubmission
+    return submission, model.objects.using(DB).get(submission=submission)
+
+
+def record_result(job, submission, detail, result):
+    if not result.get('success'):
+        raw_error = result.get('error', '')
+        if result.get('retry_after') is not None:
+            defer(job, result['retry_after'], raw_error)
+            return
+        message = NO_SPEECH_MESSAGE if 'no speech' in str(raw_error).lower() else FAILED_MESSAGE
+        fail(job, raw_error, retryable=result.get('retryable', False), message=message)
+        return
+
+    if not heartbeat(job.pk, job.locked_by):
+        logger.warning(f"Assessment job {job.pk} lost its lease, dropping result")
+        return
+    save_result(submission, detail, result)
+    complete(job)
+    logger.info(f"Assessment completed: {submission.submission_id}, score: {result['overall_score']}")
+
+
+def audio_file_path(audio_file_url):
+    if audio_file_url.startswith('http'):
+        return audio_file_url
+    media_root = getattr(settings, 'MEDIA_ROOT', None) or os.path.join(settings.BASE_DIR, 'media')
+    return os.path.join(media_root, audio_file_url)
+
+
+def save_result(submission, detail, result):
+    scores = {
+        'grammar_score': result['grammar_score'],
+        'vocabulary_score': result['vocabulary_score'],
+        'coherence_score': result['coherence_score'],
+        'fluency_score': result['fluency_score'],
+        'feedback_summary': result['feedback_summary'],
+        'suggestions': result['suggestions'],
+    }
+    if submission.submission_type == SubmissionType.LISTENING:
+        scores['pronunciation_score'] = result['pronunciation_score']
+        detail.transcription = result.get('transcription', '')
+        detail.save(using=DB)
+
+    newly_completed = submission.status != AnalysisStatus.COMPLETED
+    previous_score = submission.overall_score
+    submission.overall_score = result['overall_score']
+    submission.status = AnalysisStatus.COMPLETED
+    submission.save(using=DB)
+    AssessmentResult.objects.using(DB).update_or_create(submission=submission, defaults=scores)
+    if newly_completed:
+        score_stats.record(submission)
+    elif submission.overall_score != previous_score:
+        score_stats.rescored(submission)
+
+
+def _fail_submission(submission_id, message):
+    Submission.objects.using(DB).filter(submission_id=submission_id).update(status=AnalysisStatus.FAILED)
+    AssessmentResult.objects.using(DB).update_or_create(
+        submission_id=submission_id,
+        defaults={'feedback_summary': message, 'suggestions': []},
+    )
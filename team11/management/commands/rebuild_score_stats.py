@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from team11 import score_stats
+from team11.models import Submission, UserScoreStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialized dashboard statistics (UserScoreStats) from the "
+        "submissions, for every user or just the ones given with --user-id."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", action="append", dest="user_ids", default=[],
+                            help="Rebuild only this user (repeatable).")
+
+    def handle(self, *args, **options):
+        user_ids = options["user_ids"]
+        if not user_ids:
+            submitted = (
+                Submission.objects.using(score_stats.DB).order_by().values_list("user_id", flat=True).distinct()
+            )
+            existing = UserScoreStats.objects.using(score_stats.DB).values_list("user_id", flat=True)
+            user_ids = set(submitted) | set(existing)
+
+        for user_id in user_ids:
+            score_stats.rebuild(user_id)
+        self.stdout.write(f"Rebuilt score stats for {len(user_ids)} user(s)")
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from team11 import jobs, uploads
+
+logger = logging.getLogger(__name__)
+
+# Pause after an unexpected error (e.g. the database went away) before claiming again.
+ERROR_BACKOFF_SECONDS = 5
+
+
+class Command(BaseCommand):
+    help = (
+        "Run team11 AI assessment jobs from the AssessmentJob queue. Any number of "
+        "these processes (on any node) can share the queue. With --async, jobs run as "
+        "coroutines on one event loop (team11.services.async_ai_service), so --concurrency "
+        "can be in the hundreds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Jobs run in parallel by this process.")
+        parser.add_argument("--poll-interval", type=float, default=2.0)
+        parser.add_argument("--lease-seconds", type=int, default=jobs.LEASE_SECONDS)
+        parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is drained.")
+        parser.add_argument("--async", action="store_true", dest="use_async",
+                            help="Run jobs on an asyncio event loop instead of threads.")
+
+    def handle(self, *args, **options):
+        self.worker_id = options["worker_id"]
+        self.poll_interval = options["poll_interval"]
+        self.lease_seconds = options["lease_seconds"]
+        self.once = options["once"]
+        self.stop = threading.Event()
+        self.running = set()
+        self.lock = threading.Lock()
+
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, self._request_stop)
+
+        self._housekeeping()
+        heartbeat = threading.Thread(target=self._heartbeat, name="assessment-heartbeat", daemon=True)
+        heartbeat.start()
+        concurrency = max(1, options["concurrency"])
+        if options["use_async"]:
+            asyncio.run(self._run_async(concurrency))
+        else:
+            self._run_threads(concurrency)
+        self.stop.set()
+        self.stdout.write(f"{self.worker_id}: stopped")
+
+    def _run_threads(self, concurrency):
+        workers = [
+            threading.Thread(target=self._work, name=f"assessment-worker-{i}")
+            for i in range(concurrency)
+        ]
+        for thread in workers:
+            thread.start()
+        self.stdout.write(f"{self.worker_id}: {concurrency} assessment worker thread(s) started")
+
+        while any(t.is_alive() for t in workers):
+            if self.stop.wait(self._recover_interval()):
+                break
+            self._housekeeping()
+            close_old_connections()
+        for thread in workers:
+            thread.join()
+
+    async def _run_async(self, concurrency):
+        from team11.services import async_ai_service
+
+        self.stdout.write(f"{self.worker_id}: {concurrency} assessment coroutine(s) started")
+        workers = [asyncio.create_task(self._awork()) for _ in range(concurrency)]
+        try:
+            while not all(task.done() for task in workers):
+                await asyncio.wait(workers, timeout=self._recover_interval())
+                if self.stop.is_set():
+                    break
+                await sync_to_async(self._housekeeping)()
+            await asyncio.gather(*workers)
+        finally:
+            await async_ai_service.aclose()
+
+    def _housekeeping(self):
+        # Both are cheap (indexed) and idempotent, so every worker process does them.
+        jobs.recover_orphans()
+        uploads.cleanup_stale()
+
+    def _recover_interval(self):
+        return max(self.poll_interval, self.lease_seconds / 4)
+
+    def _request_stop(self, signum, frame):
+        self.stdout.write("Finishing running jobs, then exiting...")
+        self.stop.set()
+
+    def _work(self):
+        # A failing iteration is logged and retried; letting it escape would
+        # silently shrink the pool. An unfinished job is recovered once its lease expires.
+        try:
+            while not self.stop.is_set():
+                try:
+                    job = jobs.claim(self.worker_id, self.lease_seconds)
+                    if job is None:
+                        if self.once:
+                            return
+                        self.stop.wait(self.poll_interval)
+                        continue
+                    with self.lock:
+                        self.running.add(job.pk)
+                    try:
+                        jobs.run_job(job)
+                    finally:
+                        with self.lock:
+                            self.running.discard(job.pk)
+                except Exception as e:
+                    logger.error(f"{self.worker_id}: assessment worker error: {e}", exc_info=True)
+                    # Drop a connection the error may have broken.
+                    close_old_connections()
+                    self.stop.wait(ERROR_BACKOFF_SECONDS)
+        finally:
+            close_old_connections()
+
+    async def _awork(self):
+        claim = sync_to_async(jobs.claim)
+        while not self.stop.is_set():
+            try:
+                job = await claim(self.worker_id, self.lease_seconds)
+                if job is None:
+                    if self.once:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                with self.lock:
+                    self.running.add(job.pk)
+                try:
+                    await jobs.arun_job(job)
+                finally:
+                    with self.lock:
+                        self.running.discard(job.pk)
+            except Exception as e:
+                logger.error(f"{self.worker_id}: assessment worker error: {e}", exc_info=True)
+                await sync_to_async(close_old_connections)()
+                await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+
+    def _heartbeat(self):
+        while not self.stop.wait(self.lease_seconds / 3):
+            with self.lock:
+                running = list(self.running)
+            try:
+                for job_id in running:
+                    jobs.heartbeat(job_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"{self.worker_id}: heartbeat failed: {e}", exc_info=True)
+            close_old_connections()
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.27 on 2026-10-18 02:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team11', '0005_assessmentjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentCacheEntry',
+            fields=[
+                ('cache_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('submission_type', models.CharField(choices=[('writing', 'Writing'), ('listening', 'Listening')], max_length=20)),
+                ('result', models.JSONField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
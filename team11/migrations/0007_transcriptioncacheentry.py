@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-18 02:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team11', '0006_assessmentcacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptionCacheEntry',
+            fields=[
+                ('cache_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('audio_sha256', models.CharField(db_index=True, max_length=64)),
+                ('model', models.CharField(max_length=100)),
+                ('language', models.CharField(blank=True, max_length=20)),
+                ('transcription', models.TextField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
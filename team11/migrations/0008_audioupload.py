@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-18 02:56
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team11', '0007_transcriptioncacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioUpload',
+            fields=[
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_id', models.UUIDField(db_index=True)),
+                ('content_type', models.CharField(max_length=100)),
+                ('relative_path', models.CharField(max_length=500)),
+                ('total_size', models.PositiveBigIntegerField()),
+                ('received_bytes', models.PositiveBigIntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, help_text='Expected checksum of the whole file', max_length=64)),
+                ('completed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
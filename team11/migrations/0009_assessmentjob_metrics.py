@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team11', '0008_audioupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentjob',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
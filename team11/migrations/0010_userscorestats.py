@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-18 03:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team11', '0009_assessmentjob_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserScoreStats',
+            fields=[
+                ('user_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('writing_count', models.PositiveIntegerField(default=0)),
+                ('writing_score_sum', models.FloatField(default=0)),
+                ('speaking_count', models.PositiveIntegerField(default=0)),
+                ('speaking_score_sum', models.FloatField(default=0)),
+                ('writing_series', models.JSONField(blank=True, default=list)),
+                ('speaking_series', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
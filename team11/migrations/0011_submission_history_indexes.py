@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-18 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team11', '0010_userscorestats'),
+    ]
+
+    operations = [
+        # The paginated dashboard can no longer count the loaded submissions,
+        # so the total is kept with the other per-user stats.
+        migrations.AddField(
+            model_name='userscorestats',
+            name='submission_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user_id', '-created_at', '-submission_id'], name='team11_subm_user_id_159f12_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user_id', 'status', 'submission_type', 'created_at'], name='team11_subm_user_id_48fee1_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def enqueue_unfinished_submissions(apps, schema_editor):
+    # Submissions left pending by the old in-process assessment threads have
+    # no AssessmentJob, so recover_orphans() never sees them; queue them once.
+    Submission = apps.get_model('team11', 'Submission')
+    AssessmentJob = apps.get_model('team11', 'AssessmentJob')
+    db = schema_editor.connection.alias
+    stranded = (
+        Submission.objects.using(db)
+        .filter(status__in=['pending', 'in_progress'], assessment_job__isnull=True)
+        .values_list('pk', flat=True)
+    )
+    AssessmentJob.objects.using(db).bulk_create(
+        [AssessmentJob(submission_id=pk) for pk in stranded.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team11', '0011_submission_history_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(enqueue_unfinished_submissions, migrations.RunPython.noop),
+    ]
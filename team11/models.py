@@ -84,6 +84,10 @@ class Submission(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at', 'user_id']),
+            # History pages: keyset on (created_at, submission_id) per user,
+            # optionally narrowed by status and type.
+            models.Index(fields=['user_id', '-created_at', '-submission_id']),
+            models.Index(fields=['user_id', 'status', 'submission_type', 'created_at']),
         ]
 
     def __str__(self):
@@ -149,3 +153,111 @@ class AssessmentResult(models.Model):
 
     def __str__(self):
         return f"Assessment for {self.submission.submission_id}"
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    RUNNING = 'running', 'Running'
+    SUCCEEDED = 'succeeded', 'Succeeded'
+    FAILED = 'failed', 'Failed'
+
+
+class AssessmentJob(models.Model):
+    """Durable queue entry for a submission's AI assessment (see team11.jobs)"""
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    submission = models.OneToOneField(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='assessment_job'
+    )
+    status = models.CharField(max_length=20, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    # Lease held by the worker currently running the job; a job whose lease
+    # expired without a heartbeat is considered orphaned.
+    locked_by = models.CharField(max_length=200, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    last_error = models.TextField(blank=True)
+    # Latency breakdown of the last run, e.g. per-segment transcription timings.
+    metrics = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} ({self.status})"
+
+
+class AssessmentCacheEntry(models.Model):
+    """Stored AI assessment reused for identical submissions (see team11.assessment_cache)"""
+    cache_key = models.CharField(max_length=64, primary_key=True)
+    submission_type = models.CharField(max_length=20, choices=SubmissionType.choices)
+    result = models.JSONField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Cached {self.submission_type} assessment {self.cache_key[:12]}"
+
+
+class TranscriptionCacheEntry(models.Model):
+    """Whisper transcript keyed by audio content (see team11.transcription_cache)"""
+    cache_key = models.CharField(max_length=64, primary_key=True)
+    audio_sha256 = models.CharField(max_length=64, db_index=True)
+    model = models.CharField(max_length=100)
+    language = models.CharField(max_length=20, blank=True)
+    transcription = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Transcript {self.audio_sha256[:12]} ({self.model})"
+
+
+class AudioUpload(models.Model):
+    """Resumable audio upload written to media in chunks (see team11.uploads)"""
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.UUIDField(db_index=True)
+    content_type = models.CharField(max_length=100)
+    relative_path = models.CharField(max_length=500)
+    total_size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected checksum of the whole file")
+    completed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Upload {self.upload_id} ({self.received_bytes}/{self.total_size})"
+
+
+class UserScoreStats(models.Model):
+    """Per-user dashboard statistics kept up to date as assessments complete (see team11.score_stats)"""
+    user_id = models.UUIDField(primary_key=True)
+    # Total shown on the dashboard, which no longer loads every submission it
+    # could count since the history became paginated (team11.history).
+    submission_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    writing_count = models.PositiveIntegerField(default=0)
+    writing_score_sum = models.FloatField(default=0)
+    speaking_count = models.PositiveIntegerField(default=0)
+    speaking_score_sum = models.FloatField(default=0)
+    # Most recent scores, oldest first: [{"date": "YYYY/MM/DD", "score": 80.0}, ...]
+    writing_series = models.JSONField(default=list, blank=True)
+    speaking_series = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Stats for {self.user_id} ({self.completed_count} completed)"
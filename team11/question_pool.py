@@ -0,0 +1,89 @@
+"""
+Random question selection from cached pools of active question ids.
+
+Each (question_type, category) pool is a tuple of ids loaded with one
+values_list query and kept in a per-process LRUCache, so starting an exam
+costs a single primary-key fetch. Saving or deleting a Question or
+QuestionCategory clears this process's pools (team11.signals); other workers
+pick the change up within TEAM11_QUESTION_POOL_TTL_SECONDS.
+"""
+import os
+import random
+import uuid
+
+
+from core.lru_cache import LRUCache
+
+from .models import ListeningSubmission, Question, SubmissionType, WritingSubmission
+
+DB = 'team11'
+POOL_TTL_SECONDS = int(os.getenv("TEAM11_QUESTION_POOL_TTL_SECONDS", "300"))
+# Skip questions the user has already answered while unanswered ones remain.
+AVOID_ANSWERED = os.getenv("TEAM11_AVOID_ANSWERED_QUESTIONS", "0") == "1"
+
+pool_cache = LRUCache(256, POOL_TTL_SECONDS)
+
+_DETAIL_MODELS = {
+    SubmissionType.WRITING: WritingSubmission,
+    SubmissionType.LISTENING: ListeningSubmission,
+}
+
+
+def _category_key(category_id):
+    if not category_id:
+        return None
+    try:
+        return str(uuid.UUID(str(category_id)))
+    except ValueError:
+        return ''
+
+
+def pool(question_type, category_id=None):
+    """Ids of the active questions of question_type, optionally in one category."""
+    key = (question_type, _category_key(category_id))
+    ids = pool_cache.get(key)
+    if ids is None:
+        questions = Question.objects.using(DB).filter(category__question_type=question_type, is_active=True)
+        if key[1] == '':
+            ids = ()
+        else:
+            if key[1]:
+                questions = questions.filter(category_id=key[1])
+            ids = tuple(questions.order_by().values_list('question_id', flat=True))
+        pool_cache.set(key, ids)
+    return ids
+
+
+def answered_ids(user_id, question_type):
+    return set(
+        _DETAIL_MODELS[question_type].objects.using(DB)
+        .filter(submission__user_id=user_id, question__isnull=False)
+        .values_list('question_id', flat=True)
+    )
+
+
+def pick(question_type, category_id=None, user_id=None, avoid_answered=AVOID_ANSWERED):
+    """A random active question, or None when the pool is empty."""
+    ids = pool(question_type, category_id)
+    if avoid_answered and user_id is not None and ids:
+        answered = answered_ids(user_id, question_type)
+        ids = [i for i in ids if i not in answered] or ids
+
+    for _ in range(2):
+        if not ids:
+            return None
+        question = Question.objects.using(DB).filter(pk=random.choice(ids), is_active=True).first()
+        if question is not None:
+            return question
+        # Changed in another process since this one cached the pool.
+        clear()
+        ids = pool(question_type, category_id)
+    return None
+
+
+def clear():
+    pool_cache.clear()
+
+
+def stats():
+    return pool_cache.stats()
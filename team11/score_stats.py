@@ -0,0 +1,118 @@
+"""
+Materialized per-user score statistics for the dashboard.
+
+record() folds each newly completed assessment into the user's
+UserScoreStats row (counts, score sums and the last SERIES_LENGTH scores per
+task type), so rendering the dashboard reads one row no matter how long the
+history is. rebuild() recomputes a row from the submissions; it runs for
+users who have no row yet, when a completed submission's score changes
+(rescored()) and from `manage.py rebuild_score_stats`.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import AnalysisStatus, Submission, SubmissionType, UserScoreStats
+
+DB = 'team11'
+SERIES_LENGTH = 50
+
+
+def _point(submission):
+    return {'date': submission.created_at.strftime('%Y/%m/%d'), 'score': submission.overall_score}
+
+
+def record(submission):
+    """Add a just-completed (and already saved) submission to its user's stats."""
+    if submission.overall_score is None:
+        return
+    writing = submission.submission_type == SubmissionType.WRITING
+    with transaction.atomic(using=DB):
+        stats = UserScoreStats.objects.using(DB).select_for_update().filter(user_id=submission.user_id).first()
+        if stats is None:
+            # First completion since stats existed: the rebuild already includes this one.
+            rebuild(submission.user_id)
+            return
+        stats.completed_count += 1
+        if writing:
+            stats.writing_count += 1
+            stats.writing_score_sum += submission.overall_score
+            stats.writing_series = (stats.writing_series + [_point(submission)])[-SERIES_LENGTH:]
+        else:
+            stats.speaking_count += 1
+            stats.speaking_score_sum += submission.overall_score
+            stats.speaking_series = (stats.speaking_series + [_point(submission)])[-SERIES_LENGTH:]
+        stats.updated_at = timezone.now()
+        # submission_count is bumped separately by arecord_submission().
+        stats.save(using=DB, update_fields=[
+            'completed_count', 'writing_count', 'writing_score_sum', 'writing_series',
+            'speaking_count', 'speaking_score_sum', 'speaking_series', 'updated_at',
+        ])
+
+
+def rescored(submission):
+    """
+    A completed submission was re-scored or its score corrected. Its series
+    point can't be told apart from others, so the row is recomputed.
+    """
+    rebuild(submission.user_id)
+
+
+async def arecord_submission(user_id):
+    """Count a new submission; a user without a row is counted by the rebuild in get()."""
+    await UserScoreStats.objects.using(DB).filter(user_id=user_id).aupdate(
+        submission_count=F('submission_count') + 1,
+    )
+
+
+def _series(completed, submission_type):
+    recent = completed.filter(submission_type=submission_type).order_by('-created_at')[:SERIES_LENGTH]
+    return [_point(s) for s in reversed(list(recent))]
+
+
+def rebuild(user_id):
+    """Recompute the user's stats from their submissions."""
+    submissions = Submission.objects.using(DB).filter(user_id=user_id)
+    completed = submissions.filter(status=AnalysisStatus.COMPLETED, overall_score__isnull=False)
+    writing = Q(submission_type=SubmissionType.WRITING)
+    speaking = Q(submission_type=SubmissionType.LISTENING)
+    totals = completed.aggregate(
+        completed_count=Count('pk'),
+        writing_count=Count('pk', filter=writing),
+        writing_score_sum=Sum('overall_score', filter=writing),
+        speaking_count=Count('pk', filter=speaking),
+        speaking_score_sum=Sum('overall_score', filter=speaking),
+    )
+    stats, _ = UserScoreStats.objects.using(DB).update_or_create(
+        user_id=user_id,
+        defaults={
+            **totals,
+            'submission_count': submissions.count(),
+            'writing_score_sum': totals['writing_score_sum'] or 0,
+            'speaking_score_sum': totals['speaking_score_sum'] or 0,
+            'writing_series': _series(completed, SubmissionType.WRITING),
+            'speaking_series': _series(completed, SubmissionType.LISTENING),
+            'updated_at': timezone.now(),
+        },
+    )
+    return stats
+
+
+def get(user_id):
+    stats = UserScoreStats.objects.using(DB).filter(user_id=user_id).first()
+    return stats if stats is not None else rebuild(user_id)
+
+
+def _average(total, count):
+    return round(total / count, 2) if count else 0
+
+
+def dashboard_context(stats):
+    return {
+        'submission_count': stats.submission_count,
+        'completed_count': stats.completed_count,
+        'writing_avg': _average(stats.writing_score_sum, stats.writing_count),
+        'speaking_avg': _average(stats.speaking_score_sum, stats.speaking_count),
+        'writing_series': stats.writing_series,
+        'speaking_series': stats.speaking_series,
+    }
@@ -3,15 +3,22 @@ AI Assessment Service for TOEFL Writing and Speaking Tasks
 
 This module provides functions to assess writing and speaking submissions
 using AI APIs (Deepseek for text analysis, Whisper for audio transcription).
+Scoring calls go through a pool of chat providers (see providers.py).
+The prompt building, response parsing and error mapping helpers are shared
+with the asyncio variant in async_ai_service.
 """
 
 import json
 import logging
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 from openai import OpenAI, APIError, APIConnectionError, RateLimitError
 
+from .providers import Completion, NoProviderAvailable, ProviderError, load as load_providers
+from .rate_limit import RateLimited, RateLimiter, retry_after_seconds
 from .prompts import (
     WRITING_SYSTEM_PROMPT,
     WRITING_USER_PROMPT_TEMPLATE,
@@ -31,7 +38,182 @@ client = OpenAI(base_url=API_BASE_URL, api_key=API_KEY, timeout=300.0)
 
 # Model names
 DEEPSEEK_MODEL = "deepseek-chat"
+# Chat providers for scoring; TEAM11_AI_PROVIDERS adds fallbacks to this one.
+chat_pool = load_providers(API_BASE_URL, API_KEY, DEEPSEEK_MODEL)
 WHISPER_MODEL = "whisper-1"
+# Optional ISO-639-1 hint for Whisper (e.g. "en"); auto-detected when unset.
+WHISPER_LANGUAGE = os.getenv("TEAM11_WHISPER_LANGUAGE") or None
+# Whisper has its own request limit at most providers, separate from the chat models'.
+WHISPER_RPM = float(os.getenv("TEAM11_WHISPER_RPM", "0"))
+transcription_limiter = RateLimiter(rpm=WHISPER_RPM)
+
+# Segmented transcription: segments of one recording transcribed in parallel.
+TRANSCRIBE_PARALLELISM = int(os.getenv("TEAM11_TRANSCRIBE_PARALLELISM", "4"))
+SEGMENT_MAX_ATTEMPTS = int(os.getenv("TEAM11_TRANSCRIBE_SEGMENT_ATTEMPTS", "3"))
+SEGMENT_RETRY_DELAY_SECONDS = 1.0
+
+NO_SPEECH_ERROR = 'No speech detected in the audio file.'
+
+WRITING_SCORE_FIELDS = [
+    'overall_score', 'grammar_score', 'vocabulary_score',
+    'coherence_score', 'fluency_score',
+]
+SPEAKING_SCORE_FIELDS = [
+    'overall_score', 'pronunciation_score', 'fluency_score',
+    'vocabulary_score', 'grammar_score', 'coherence_score',
+]
+
+
+def _is_retryable(error: APIError) -> bool:
+    """Server-side and throttling errors are worth retrying; 4xx request errors are not."""
+    status_code = getattr(error, 'status_code', None)
+    return status_code is None or status_code in (408, 409, 429) or status_code >= 500
+
+
+def writing_messages(topic: str, text_body: str, word_count: int) -> list:
+    user_prompt = WRITING_USER_PROMPT_TEMPLATE.format(
+        topic=topic,
+        text_body=text_body,
+        word_count=word_count
+    )
+    return [
+        {"role": "system", "content": WRITING_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def speaking_messages(topic: str, transcription: str, duration_seconds: int) -> list:
+    user_prompt = SPEAKING_USER_PROMPT_TEMPLATE.format(
+        topic=topic,
+        transcription=transcription,
+        duration_seconds=duration_seconds
+    )
+    return [
+        {"role": "system", "content": SPEAKING_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def parse_assessment(content: str, score_fields: list) -> Dict[str, Any]:
+    """Extract the JSON assessment from a chat completion and normalize it."""
+    content = content.strip()
+    try:
+        # 1. Try direct parse
+        assessment = json.loads(content)
+    except json.JSONDecodeError:
+        # 2. Regex to find the first '{' and last '}' (greedy)
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        if match:
+            json_str = match.group(0)
+            try:
+                assessment = json.loads(json_str)
+            except json.JSONDecodeError:
+                # 3. Fallback: try markdown code blocks
+                if "```json" in content:
+                    json_start = content.find("```json") + 7
+                    json_end = content.find("```", json_start)
+                    assessment = json.loads(content[json_start:json_end].strip())
+                else:
+                    raise ValueError(f"Failed to parse JSON from AI response: {content[:100]}...")
+        else:
+            raise ValueError(f"No JSON object found in AI response: {content[:100]}...")
+
+    # Validate required fields
+    for field in score_fields + ['feedback_summary', 'suggestions']:
+        if field not in assessment:
+            raise ValueError(f"Missing required field: {field}")
+
+    # Ensure scores are floats
+    for score_field in score_fields:
+        assessment[score_field] = float(assessment[score_field])
+
+    # Ensure suggestions is a list
+    if not isinstance(assessment['suggestions'], list):
+        assessment['suggestions'] = [assessment['suggestions']]
+
+    assessment['success'] = True
+    return assessment
+
+
+def parse_completion(completion: Completion, score_fields: list) -> Dict[str, Any]:
+    """parse_assessment, plus the provider and model that answered (see team11.assessment_cache)."""
+    assessment = parse_assessment(completion.content, score_fields)
+    assessment['provider'] = completion.provider
+    assessment['model'] = completion.model
+    return assessment
+
+
+def _rate_limited(e: Exception) -> Dict[str, Any]:
+    """Failure result of a rate-limited call; 'retry_after' tells the queue to defer the job."""
+    logger.warning(f"Rate limited: {e}")
+    return {
+        'success': False,
+        'error': 'Too many requests. Please wait a moment and try again.',
+        'retryable': True,
+        'retry_after': retry_after_seconds(e),
+    }
+
+
+def assessment_error(e: Exception, context: str, **extra) -> Dict[str, Any]:
+    """Map an exception raised while assessing to the failure result callers expect."""
+    if isinstance(e, (RateLimitError, RateLimited)):
+        return {**_rate_limited(e), 'overall_score': None, **extra}
+    if isinstance(e, APIConnectionError):
+        logger.error(f"API Connection Error: {e}")
+        error, retryable = 'Failed to connect to AI service. Please try again later.', True
+    elif isinstance(e, (NoProviderAvailable, ProviderError)):
+        logger.error(f"AI provider error: {e}")
+        error, retryable = 'AI service is unavailable. Please try again later.', True
+    elif isinstance(e, APIError):
+        logger.error(f"API Error: {e}")
+        error, retryable = f'AI service error: {str(e)}', _is_retryable(e)
+    else:
+        logger.error(f"Unexpected error in {context}: {e}", exc_info=True)
+        error, retryable = f'Assessment failed: {str(e)}', False
+    return {'success': False, 'error': error, 'retryable': retryable, 'overall_score': None, **extra}
+
+
+def reserve_transcription():
+    """Take a Whisper request from transcription_limiter; raises RateLimited when there is none."""
+    wait_seconds = transcription_limiter.reserve(1)
+    if wait_seconds:
+        raise RateLimited(wait_seconds, 'Transcription rate limit reached')
+
+
+def transcription_error(e: Exception, audio_file_path: str) -> Dict[str, Any]:
+    if isinstance(e, RateLimitError):
+        # Hold back the other segments and jobs until the provider's Retry-After.
+        transcription_limiter.pause(retry_after_seconds(e))
+    if isinstance(e, FileNotFoundError):
+        logger.error(f"Audio file not found: {audio_file_path}")
+        error, retryable = 'Audio file not found.', False
+    elif isinstance(e, (RateLimitError, RateLimited)):
+        return {**_rate_limited(e), 'transcription': None}
+    elif isinstance(e, APIConnectionError):
+        logger.error(f"API Connection Error: {e}")
+        error, retryable = 'Failed to connect to transcription service.', True
+    elif isinstance(e, APIError):
+        logger.error(f"API Error: {e}")
+        error, retryable = f'Transcription service error: {str(e)}', _is_retryable(e)
+    else:
+        logger.error(f"Unexpected error in transcribe_audio: {e}", exc_info=True)
+        error, retryable = f'Transcription failed: {str(e)}', False
+    return {'success': False, 'error': error, 'retryable': retryable, 'transcription': None}
+
+
+def build_transcription_result(text: str) -> Dict[str, Any]:
+    transcription = text.strip()
+    if not transcription:
+        return {
+            'success': False,
+            'error': NO_SPEECH_ERROR,
+            'transcription': None
+        }
+    logger.info(f"Transcription completed: {len(transcription)} characters")
+    return {
+        'success': True,
+        'transcription': transcription
+    }
 
 
 def assess_writing(topic: str, text_body: str, word_count: int) -> Dict[str, Any]:
@@ -39,103 +221,19 @@ def assess_writing(topic: str, text_body: str, word_count: int) -> Dict[str, Any
     Assess a writing submission using Deepseek AI.
     """
     try:
-        # Prepare the user prompt with actual data
-        user_prompt = WRITING_USER_PROMPT_TEMPLATE.format(
-            topic=topic,
-            text_body=text_body,
-            word_count=word_count
-        )
-        
         logger.info(f"Assessing writing submission: {word_count} words")
-        
-        # Make API call with system and user prompts
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL,
-            messages=[
-                {"role": "system", "content": WRITING_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,  # Low temperature for consistent scoring
-            max_tokens=1000,
-        )
-        
-        # Extract the response content
-        content = response.choices[0].message.content.strip()
-        
-        # Parse JSON response (Improved)
-        try:
-            # 1. Try direct parse
-            assessment = json.loads(content)
-        except json.JSONDecodeError:
-            # 2. Regex to find the first '{' and last '}' (greedy)
-            match = re.search(r'\{.*\}', content, re.DOTALL)
-            if match:
-                json_str = match.group(0)
-                try:
-                    assessment = json.loads(json_str)
-                except json.JSONDecodeError:
-                    # 3. Fallback: try markdown code blocks
-                    if "```json" in content:
-                        json_start = content.find("```json") + 7
-                        json_end = content.find("```", json_start)
-                        assessment = json.loads(content[json_start:json_end].strip())
-                    else:
-                        raise ValueError(f"Failed to parse JSON from AI response: {content[:100]}...")
-            else:
-                raise ValueError(f"No JSON object found in AI response: {content[:100]}...")
-        
-        # Validate required fields
-        required_fields = [
-            'overall_score', 'grammar_score', 'vocabulary_score',
-            'coherence_score', 'fluency_score', 'feedback_summary', 'suggestions'
-        ]
-        
-        for field in required_fields:
-            if field not in assessment:
-                raise ValueError(f"Missing required field: {field}")
-        
-        # Ensure scores are floats
-        for score_field in ['overall_score', 'grammar_score', 'vocabulary_score', 
-                           'coherence_score', 'fluency_score']:
-            assessment[score_field] = float(assessment[score_field])
-        
-        # Ensure suggestions is a list
-        if not isinstance(assessment['suggestions'], list):
-            assessment['suggestions'] = [assessment['suggestions']]
-        
-        assessment['success'] = True
+
+        completion = chat_pool.chat(writing_messages(topic, text_body, word_count))
+        assessment = parse_completion(completion, WRITING_SCORE_FIELDS)
         logger.info(f"Writing assessment completed: overall_score={assessment['overall_score']}")
-        
         return assessment
-        
-    except APIConnectionError as e:
-        logger.error(f"API Connection Error: {e}")
-        return {
-            'success': False,
-            'error': 'Failed to connect to AI service. Please try again later.',
-            'overall_score': None
-        }
-    except RateLimitError as e:
-        logger.error(f"Rate Limit Error: {e}")
-        return {
-            'success': False,
-            'error': 'Too many requests. Please wait a moment and try again.',
-            'overall_score': None
-        }
-    except APIError as e:
-        logger.error(f"API Error: {e}")
-        return {
-            'success': False,
-            'error': f'AI service error: {str(e)}',
-            'overall_score': None
-        }
+
     except Exception as e:
-        logger.error(f"Unexpected error in assess_writing: {e}", exc_info=True)
-        return {
-            'success': False,
-            'error': f'Assessment failed: {str(e)}',
-            'overall_score': None
-        }
+        return assessment_error(e, 'assess_writing')
+
+
+def transcription_options() -> Dict[str, Any]:
+    return {'language': WHISPER_LANGUAGE} if WHISPER_LANGUAGE else {}
 
 
 def transcribe_audio(audio_file_path: str) -> Dict[str, Any]:
@@ -144,177 +242,102 @@ def transcribe_audio(audio_file_path: str) -> Dict[str, Any]:
     """
     try:
         logger.info(f"Transcribing audio file: {audio_file_path}")
-        
+        reserve_transcription()
+
         # Open and transcribe the audio file
         with open(audio_file_path, "rb") as audio_file:
             response = client.audio.transcriptions.create(
                 model=WHISPER_MODEL,
-                file=audio_file
+                file=audio_file,
+                **transcription_options()
             )
-        
-        transcription = response.text.strip()
-        
-        if not transcription:
-            return {
-                'success': False,
-                'error': 'No speech detected in the audio file.',
-                'transcription': None
-            }
-        
-        logger.info(f"Transcription completed: {len(transcription)} characters")
-        
-        return {
-            'success': True,
-            'transcription': transcription
-        }
-        
-    except FileNotFoundError:
-        logger.error(f"Audio file not found: {audio_file_path}")
-        return {
-            'success': False,
-            'error': 'Audio file not found.',
-            'transcription': None
-        }
-    except APIConnectionError as e:
-        logger.error(f"API Connection Error: {e}")
-        return {
-            'success': False,
-            'error': 'Failed to connect to transcription service.',
-            'transcription': None
-        }
-    except APIError as e:
-        logger.error(f"API Error: {e}")
-        return {
-            'success': False,
-            'error': f'Transcription service error: {str(e)}',
-            'transcription': None
-        }
+
+        return build_transcription_result(response.text)
+
     except Exception as e:
-        logger.error(f"Unexpected error in transcribe_audio: {e}", exc_info=True)
-        return {
-            'success': False,
-            'error': f'Transcription failed: {str(e)}',
-            'transcription': None
-        }
+        return transcription_error(e, audio_file_path)
+
+
+def segment_text(result: Dict[str, Any]) -> Optional[str]:
+    """Text of a segment's transcription; '' for a silent segment, None on failure."""
+    if result['success']:
+        return result['transcription']
+    return '' if result['error'] == NO_SPEECH_ERROR else None
+
+
+def stitch_segments(texts: list, timings: list) -> Dict[str, Any]:
+    """Join segment transcripts in order into one transcribe_audio-style result."""
+    result = build_transcription_result(' '.join(text for text in texts if text))
+    result['segments'] = timings
+    return result
+
+
+def _transcribe_segment(index: int, path: str):
+    started = time.monotonic()
+    for attempt in range(1, SEGMENT_MAX_ATTEMPTS + 1):
+        result = transcribe_audio(path)
+        text = segment_text(result)
+        # A rate-limited segment defers the whole job rather than retrying early.
+        if text is not None or not result.get('retryable') or result.get('retry_after') is not None \
+                or attempt == SEGMENT_MAX_ATTEMPTS:
+            break
+        time.sleep(SEGMENT_RETRY_DELAY_SECONDS * 2 ** (attempt - 1))
+    timing = {'index': index, 'attempts': attempt, 'latency_ms': int((time.monotonic() - started) * 1000)}
+    return result, text, timing
+
+
+def transcribe_segments(segment_paths: list) -> Dict[str, Any]:
+    """
+    Transcribe the segments of one recording concurrently (at most
+    TEAM11_TRANSCRIBE_PARALLELISM at a time), retrying each segment on its own,
+    and stitch the text back in order. The result carries a per-segment
+    latency breakdown under 'segments'.
+    """
+    workers = max(1, min(TRANSCRIBE_PARALLELISM, len(segment_paths)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='team11-whisper') as pool:
+        outcomes = list(pool.map(_transcribe_segment, range(len(segment_paths)), segment_paths))
+
+    for result, text, timing in outcomes:
+        if text is None:
+            logger.error(f"Segment {timing['index']} failed after {timing['attempts']} attempt(s)")
+            return {**result, 'segments': [timing for _, _, timing in outcomes]}
+    return stitch_segments([text for _, text, _ in outcomes], [timing for _, _, timing in outcomes])
 
 
-def assess_speaking(topic: str, audio_file_path: str, duration_seconds: int) -> Dict[str, Any]:
+def assess_speaking(topic: str, audio_file_path: str, duration_seconds: int,
+                    transcription: Optional[str] = None) -> Dict[str, Any]:
     """
     Assess a speaking submission using Whisper (transcription) + Deepseek (assessment).
+    Pass a known transcription (e.g. from a previous attempt) to skip Whisper.
     """
     try:
         # Step 1: Transcribe the audio
-        transcription_result = transcribe_audio(audio_file_path)
-        
-        if not transcription_result['success']:
-            return {
-                'success': False,
-                'error': transcription_result['error'],
-                'overall_score': None,
-                'transcription': None
-            }
-        
-        transcription = transcription_result['transcription']
-        
+        if transcription is None:
+            transcription_result = transcribe_audio(audio_file_path)
+
+            if not transcription_result['success']:
+                return {
+                    'success': False,
+                    'error': transcription_result['error'],
+                    'retryable': transcription_result.get('retryable', False),
+                    'retry_after': transcription_result.get('retry_after'),
+                    'overall_score': None,
+                    'transcription': None
+                }
+
+            transcription = transcription_result['transcription']
+
         # Step 2: Assess the transcription
-        user_prompt = SPEAKING_USER_PROMPT_TEMPLATE.format(
-            topic=topic,
-            transcription=transcription,
-            duration_seconds=duration_seconds
-        )
-        
         logger.info(f"Assessing speaking submission: {duration_seconds}s audio")
-        
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL,
-            messages=[
-                {"role": "system", "content": SPEAKING_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=1000,
-        )
-        
-        content = response.choices[0].message.content.strip()
-        
-        # Parse JSON response (Improved)
-        try:
-            # 1. Try direct parse
-            assessment = json.loads(content)
-        except json.JSONDecodeError:
-            # 2. Regex to find the first '{' and last '}'
-            match = re.search(r'\{.*\}', content, re.DOTALL)
-            if match:
-                json_str = match.group(0)
-                try:
-                    assessment = json.loads(json_str)
-                except json.JSONDecodeError:
-                    if "```json" in content:
-                        json_start = content.find("```json") + 7
-                        json_end = content.find("```", json_start)
-                        assessment = json.loads(content[json_start:json_end].strip())
-                    else:
-                        raise ValueError(f"Failed to parse JSON: {content[:100]}...")
-            else:
-                raise ValueError(f"No JSON object found: {content[:100]}...")
-        
-        # Validate required fields
-        required_fields = [
-            'overall_score', 'pronunciation_score', 'fluency_score',
-            'vocabulary_score', 'grammar_score', 'coherence_score',
-            'feedback_summary', 'suggestions'
-        ]
-        
-        for field in required_fields:
-            if field not in assessment:
-                raise ValueError(f"Missing required field: {field}")
-        
-        # Ensure scores are floats
-        for score_field in ['overall_score', 'pronunciation_score', 'fluency_score',
-                           'vocabulary_score', 'grammar_score', 'coherence_score']:
-            assessment[score_field] = float(assessment[score_field])
-        
-        # Ensure suggestions is a list
-        if not isinstance(assessment['suggestions'], list):
-            assessment['suggestions'] = [assessment['suggestions']]
-        
+
+        completion = chat_pool.chat(speaking_messages(topic, transcription, duration_seconds))
+        assessment = parse_completion(completion, SPEAKING_SCORE_FIELDS)
+
         # Add transcription to the result
         assessment['transcription'] = transcription
-        assessment['success'] = True
-        
+
         logger.info(f"Speaking assessment completed: overall_score={assessment['overall_score']}")
-        
         return assessment
-        
-    except APIConnectionError as e:
-        logger.error(f"API Connection Error: {e}")
-        return {
-            'success': False,
-            'error': 'Failed to connect to AI service. Please try again later.',
-            'overall_score': None,
-            'transcription': None
-        }
-    except RateLimitError as e:
-        logger.error(f"Rate Limit Error: {e}")
-        return {
-            'success': False,
-            'error': 'Too many requests. Please wait a moment and try again.',
-            'overall_score': None,
-            'transcription': None
-        }
-    except APIError as e:
-        logger.error(f"API Error: {e}")
-        return {
-            'success': False,
-            'error': f'AI service error: {str(e)}',
-            'overall_score': None,
-            'transcription': None
-        }
+
     except Exception as e:
-        logger.error(f"Unexpected error in assess_speaking: {e}", exc_info=True)
-        return {
-            'success': False,
-            'error': f'Assessment failed: {str(e)}',
-            'overall_score': None,
-            'transcription': None
-        }
+        return assessment_error(e, 'assess_speaking', transcription=None)
@@ -0,0 +1,150 @@
+"""
+Asyncio variant of ai_service for the assessment worker.
+
+One AsyncOpenAI client per event loop keeps a pooled set of keep-alive
+connections to the provider, and a semaphore caps how many provider calls
+are in flight at once, so a single worker process can run hundreds of
+assessments concurrently without a thread per call. Results have exactly the
+same shape as the ai_service functions. Scoring calls share ai_service's
+provider pool, so hedging and failover apply here too.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, Optional
+
+from openai import AsyncOpenAI
+
+from .ai_service import (
+    API_BASE_URL, API_KEY, WHISPER_MODEL,
+    SEGMENT_MAX_ATTEMPTS, SPEAKING_SCORE_FIELDS, TRANSCRIBE_PARALLELISM, WRITING_SCORE_FIELDS,
+    assessment_error, build_transcription_result, parse_completion, segment_text,
+    speaking_messages, stitch_segments, transcription_error, transcription_options, writing_messages,
+)
+from . import ai_service
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv("TEAM11_AI_MAX_CONCURRENCY", "100"))
+CHAT_TIMEOUT_SECONDS = float(os.getenv("TEAM11_AI_CHAT_TIMEOUT_SECONDS", "60"))
+TRANSCRIBE_TIMEOUT_SECONDS = float(os.getenv("TEAM11_AI_TRANSCRIBE_TIMEOUT_SECONDS", "120"))
+
+# Keyed by event loop: the client's connection pool and the semaphore are
+# both bound to the loop they were created on.
+_loop_state = {}
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = (
+            AsyncOpenAI(base_url=API_BASE_URL, api_key=API_KEY, timeout=CHAT_TIMEOUT_SECONDS),
+            asyncio.Semaphore(MAX_CONCURRENCY),
+        )
+        _loop_state[loop] = state
+    return state
+
+
+async def aclose():
+    """Close this loop's clients (their pooled connections); call before the loop exits."""
+    state = _loop_state.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state[0].close()
+    await ai_service.chat_pool.aclose()
+
+
+async def _chat(messages):
+    _, semaphore = _state()
+    async with semaphore:
+        return await ai_service.chat_pool.achat(messages)
+
+
+async def assess_writing(topic: str, text_body: str, word_count: int) -> Dict[str, Any]:
+    try:
+        logger.info(f"Assessing writing submission: {word_count} words")
+        completion = await _chat(writing_messages(topic, text_body, word_count))
+        assessment = parse_completion(completion, WRITING_SCORE_FIELDS)
+        logger.info(f"Writing assessment completed: overall_score={assessment['overall_score']}")
+        return assessment
+    except Exception as e:
+        return assessment_error(e, 'assess_writing')
+
+
+async def transcribe_audio(audio_file_path: str) -> Dict[str, Any]:
+    try:
+        logger.info(f"Transcribing audio file: {audio_file_path}")
+        ai_service.reserve_transcription()
+        audio_bytes = await asyncio.to_thread(_read_file, audio_file_path)
+        client, semaphore = _state()
+        async with semaphore:
+            response = await client.audio.transcriptions.create(
+                model=WHISPER_MODEL,
+                file=(os.path.basename(audio_file_path), audio_bytes),
+                timeout=TRANSCRIBE_TIMEOUT_SECONDS,
+                **transcription_options(),
+            )
+        return build_transcription_result(response.text)
+    except Exception as e:
+        return transcription_error(e, audio_file_path)
+
+
+async def _transcribe_segment(index, path, limit):
+    started = time.monotonic()
+    async with limit:
+        for attempt in range(1, SEGMENT_MAX_ATTEMPTS + 1):
+            result = await transcribe_audio(path)
+            text = segment_text(result)
+            # A rate-limited segment defers the whole job rather than retrying early.
+            if text is not None or not result.get('retryable') or result.get('retry_after') is not None \
+                    or attempt == SEGMENT_MAX_ATTEMPTS:
+                break
+            await asyncio.sleep(ai_service.SEGMENT_RETRY_DELAY_SECONDS * 2 ** (attempt - 1))
+    timing = {'index': index, 'attempts': attempt, 'latency_ms': int((time.monotonic() - started) * 1000)}
+    return result, text, timing
+
+
+async def transcribe_segments(segment_paths: list) -> Dict[str, Any]:
+    """ai_service.transcribe_segments on the event loop."""
+    limit = asyncio.Semaphore(max(1, TRANSCRIBE_PARALLELISM))
+    outcomes = await asyncio.gather(*(
+        _transcribe_segment(index, path, limit) for index, path in enumerate(segment_paths)
+    ))
+    for result, text, timing in outcomes:
+        if text is None:
+            logger.error(f"Segment {timing['index']} failed after {timing['attempts']} attempt(s)")
+            return {**result, 'segments': [timing for _, _, timing in outcomes]}
+    return stitch_segments([text for _, text, _ in outcomes], [timing for _, _, timing in outcomes])
+
+
+async def assess_speaking(topic: str, audio_file_path: str, duration_seconds: int,
+                          transcription: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        if transcription is None:
+            transcription_result = await transcribe_audio(audio_file_path)
+            if not transcription_result['success']:
+                return {
+                    'success': False,
+                    'error': transcription_result['error'],
+                    'retryable': transcription_result.get('retryable', False),
+                    'retry_after': transcription_result.get('retry_after'),
+                    'overall_score': None,
+                    'transcription': None
+                }
+            transcription = transcription_result['transcription']
+
+        logger.info(f"Assessing speaking submission: {duration_seconds}s audio")
+        completion = await _chat(speaking_messages(topic, transcription, duration_seconds))
+        assessment = parse_completion(completion, SPEAKING_SCORE_FIELDS)
+        assessment['transcription'] = transcription
+        logger.info(f"Speaking assessment completed: overall_score={assessment['overall_score']}")
+        return assessment
+    except Exception as e:
+        return assessment_error(e, 'assess_speaking', transcription=None)
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
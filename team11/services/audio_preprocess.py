@@ -0,0 +1,267 @@
+"""
+Local audio preprocessing before Whisper.
+
+Browser recordings are decoded to 16 kHz mono PCM and checked with a cheap
+energy-based voice-activity test, so a silent recording fails as "no speech"
+without any provider call. Leading and trailing silence is trimmed, the
+speech is capped at TEAM11_AUDIO_MAX_SECONDS, and the result is encoded as
+16 kHz mono Opus, which is a fraction of the size of the browser's webm/wav.
+Recordings longer than TEAM11_TRANSCRIBE_SEGMENT_MIN_SECONDS are also cut at
+pauses into segments of about TEAM11_TRANSCRIBE_SEGMENT_SECONDS, which
+ai_service.transcribe_segments transcribes in parallel.
+
+ffmpeg (installed by the team11 Dockerfile) does the decoding and encoding.
+Without it, WAV files are still checked and trimmed with the wave module and
+anything else is passed through untouched.
+"""
+
+import logging
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ai_service import NO_SPEECH_ERROR
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BIN = os.getenv("TEAM11_FFMPEG_BIN") or shutil.which("ffmpeg")
+ENABLED = os.getenv("TEAM11_AUDIO_PREPROCESS", "1") == "1"
+MAX_SECONDS = float(os.getenv("TEAM11_AUDIO_MAX_SECONDS", "180"))
+OPUS_BITRATE = os.getenv("TEAM11_AUDIO_OPUS_BITRATE", "24k")
+FFMPEG_TIMEOUT_SECONDS = 60
+SEGMENTED = os.getenv("TEAM11_SEGMENTED_TRANSCRIPTION", "1") == "1"
+SEGMENT_SECONDS = float(os.getenv("TEAM11_TRANSCRIBE_SEGMENT_SECONDS", "30"))
+SEGMENT_MIN_SECONDS = float(os.getenv("TEAM11_TRANSCRIBE_SEGMENT_MIN_SECONDS", "60"))
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+# Frames at or above this level count as speech for the "no speech" check.
+SPEECH_THRESHOLD_DBFS = float(os.getenv("TEAM11_VAD_THRESHOLD_DBFS", "-45"))
+MIN_SPEECH_SECONDS = float(os.getenv("TEAM11_VAD_MIN_SPEECH_SECONDS", "0.5"))
+# Trimming also ignores frames within this margin of the recording's noise floor.
+NOISE_MARGIN_DB = 12.0
+PADDING_SECONDS = 0.3
+SILENCE_DBFS = -120.0
+# Pauses are located on levels averaged over this many frames either side.
+PAUSE_WINDOW_FRAMES = 5
+
+_lock = threading.Lock()
+_counters = {
+    'processed': 0, 'passed_through': 0, 'no_speech': 0,
+    'bytes_in': 0, 'bytes_out': 0, 'seconds_in': 0.0, 'seconds_out': 0.0,
+}
+
+
+def _count(**amounts):
+    with _lock:
+        for name, amount in amounts.items():
+            _counters[name] += amount
+
+
+def frame_levels(samples: array, sample_rate: int) -> List[float]:
+    """RMS level in dBFS of each FRAME_MS frame of mono 16-bit samples."""
+    frame = max(1, sample_rate * FRAME_MS // 1000)
+    levels = []
+    for start in range(0, len(samples) - frame + 1, frame):
+        # Every other sample is plenty for a level estimate and halves the work.
+        chunk = samples[start:start + frame:2]
+        power = sum(x * x for x in chunk) / len(chunk)
+        levels.append(10 * math.log10(power / (32768.0 ** 2)) if power else SILENCE_DBFS)
+    return levels
+
+
+def has_speech(levels: List[float]) -> bool:
+    voiced = sum(1 for level in levels if level >= SPEECH_THRESHOLD_DBFS)
+    return voiced * FRAME_MS / 1000 >= MIN_SPEECH_SECONDS
+
+
+def speech_span(levels: List[float]) -> Optional[Tuple[int, int]]:
+    """First and last (exclusive) frame of speech, padded; None when there is none."""
+    if not levels:
+        return None
+    noise_floor = sorted(levels)[len(levels) // 10]
+    voiced = [i for i, level in enumerate(levels)
+              if level >= max(SPEECH_THRESHOLD_DBFS, noise_floor + NOISE_MARGIN_DB)]
+    if not voiced:
+        voiced = [i for i, level in enumerate(levels) if level >= SPEECH_THRESHOLD_DBFS]
+    if not voiced:
+        return None
+    padding = int(PADDING_SECONDS * 1000 / FRAME_MS)
+    return max(0, voiced[0] - padding), min(len(levels), voiced[-1] + 1 + padding)
+
+
+def segment_bounds(levels: List[float], target_frames: int) -> List[Tuple[int, int]]:
+    """
+    Split frames into consecutive (start, end) ranges of roughly target_frames,
+    each cut at the quietest pause within half a segment of the target.
+    """
+    count = len(levels)
+    if target_frames <= 0 or count <= target_frames * 3 // 2:
+        return [(0, count)]
+
+    smoothed = []
+    for i in range(count):
+        window = levels[max(0, i - PAUSE_WINDOW_FRAMES):i + PAUSE_WINDOW_FRAMES + 1]
+        smoothed.append(sum(window) / len(window))
+    bounds, start = [], 0
+    while count - start > target_frames * 3 // 2:
+        target = start + target_frames
+        cut = min(range(start + target_frames // 2, target + target_frames // 2),
+                  key=lambda i: (smoothed[i], abs(i - target)))
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, count))
+    return bounds
+
+
+def _decode_ffmpeg(path: str) -> Tuple[array, int]:
+    # Decode a bit more than the cap so leading silence does not eat into it.
+    completed = subprocess.run(
+        [FFMPEG_BIN, '-nostdin', '-v', 'error', '-i', path, '-t', str(MAX_SECONDS * 2),
+         '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1'],
+        capture_output=True, check=True, timeout=FFMPEG_TIMEOUT_SECONDS,
+    )
+    samples = array('h')
+    samples.frombytes(completed.stdout[:len(completed.stdout) // 2 * 2])
+    return samples, SAMPLE_RATE
+
+
+def _decode_wav(path: str) -> Tuple[array, int]:
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError('only 16-bit PCM WAV can be read without ffmpeg')
+        channels, sample_rate = wav.getnchannels(), wav.getframerate()
+        frames = wav.readframes(int(sample_rate * MAX_SECONDS * 2))
+    samples = array('h')
+    samples.frombytes(frames)
+    # Without ffmpeg the first channel is good enough for a level check.
+    return (samples[::channels] if channels > 1 else samples), sample_rate
+
+
+def _encode(samples: array, sample_rate: int, prefix: str = 'team11_') -> str:
+    if FFMPEG_BIN:
+        fd, out_path = tempfile.mkstemp(prefix=prefix, suffix='.ogg')
+        os.close(fd)
+        try:
+            subprocess.run(
+                [FFMPEG_BIN, '-nostdin', '-v', 'error', '-y',
+                 '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+                 '-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip', out_path],
+                input=samples.tobytes(), capture_output=True, check=True, timeout=FFMPEG_TIMEOUT_SECONDS,
+            )
+        except Exception:
+            os.remove(out_path)
+            raise
+        return out_path
+
+    fd, out_path = tempfile.mkstemp(prefix=prefix, suffix='.wav')
+    with os.fdopen(fd, 'wb') as f, wave.open(f, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return out_path
+
+
+def _passthrough(path: str) -> Dict[str, Any]:
+    _count(passed_through=1)
+    return {'path': path, 'segments': [path], 'speech': True, 'processed': False}
+
+
+def prepare(path: str) -> Dict[str, Any]:
+    """
+    Preprocess the recording at path for transcription.
+
+    Returns {'path', 'segments', 'speech', 'processed', ...}: segments are the
+    files to send to Whisper in order (just path unless the recording was
+    split; temporary files when processed is True, release them with
+    cleanup()), and speech is False when the recording is silent. Anything
+    that cannot be decoded is passed through for Whisper to judge.
+    """
+    if not ENABLED or path.startswith('http') or not os.path.isfile(path):
+        return _passthrough(path)
+    try:
+        if FFMPEG_BIN:
+            samples, sample_rate = _decode_ffmpeg(path)
+        elif path.lower().endswith('.wav'):
+            samples, sample_rate = _decode_wav(path)
+        else:
+            return _passthrough(path)
+    except Exception as e:
+        logger.warning(f"Audio preprocessing could not decode {path}: {e}")
+        return _passthrough(path)
+
+    bytes_in = os.path.getsize(path)
+    seconds_in = len(samples) / sample_rate
+    levels = frame_levels(samples, sample_rate)
+    span = speech_span(levels)
+    if span is None or not has_speech(levels):
+        _count(no_speech=1, bytes_in=bytes_in, seconds_in=seconds_in)
+        logger.info(f"No speech detected locally in {path} ({seconds_in:.1f}s)")
+        return {'path': path, 'segments': [path], 'speech': False, 'processed': False,
+                'duration_seconds': seconds_in}
+
+    frame = sample_rate * FRAME_MS // 1000
+    first, last = span[0], min(span[1], span[0] + int(MAX_SECONDS * 1000 / FRAME_MS))
+    bounds = [(0, last - first)]
+    if SEGMENTED and (last - first) * FRAME_MS / 1000 > SEGMENT_MIN_SECONDS:
+        bounds = segment_bounds(levels[first:last], int(SEGMENT_SECONDS * 1000 / FRAME_MS))
+
+    segments = []
+    try:
+        for index, (start, end) in enumerate(bounds):
+            chunk = samples[(first + start) * frame:(first + end) * frame]
+            segments.append(_encode(chunk, sample_rate, prefix=f'team11_{index:03d}_'))
+    except Exception as e:
+        logger.warning(f"Audio preprocessing could not encode {path}: {e}")
+        _remove(segments)
+        return _passthrough(path)
+
+    bytes_out = sum(os.path.getsize(segment) for segment in segments)
+    seconds_out = (last - first) * frame / sample_rate
+    _count(processed=1, bytes_in=bytes_in, bytes_out=bytes_out, seconds_in=seconds_in, seconds_out=seconds_out)
+    logger.info(f"Preprocessed {path}: {seconds_in:.1f}s/{bytes_in}B -> "
+                f"{seconds_out:.1f}s/{bytes_out}B in {len(segments)} segment(s)")
+    return {
+        'path': segments[0],
+        'segments': segments,
+        'segment_seconds': [round((end - start) * FRAME_MS / 1000, 2) for start, end in bounds],
+        'speech': True,
+        'processed': True,
+        'duration_seconds': seconds_in,
+        'speech_seconds': seconds_out,
+        'bytes_in': bytes_in,
+        'bytes_out': bytes_out,
+    }
+
+
+def _remove(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def cleanup(prepared: Dict[str, Any]) -> None:
+    if prepared.get('processed'):
+        _remove(prepared['segments'])
+
+
+def no_speech_result() -> Dict[str, Any]:
+    return {'success': False, 'error': NO_SPEECH_ERROR, 'retryable': False, 'transcription': None}
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        counters = dict(_counters)
+    counters['seconds_in'] = round(counters['seconds_in'], 1)
+    counters['seconds_out'] = round(counters['seconds_out'], 1)
+    counters['ffmpeg'] = bool(FFMPEG_BIN)
+    return counters
@@ -2,6 +2,10 @@
 AI Prompts for TOEFL Writing and Speaking Assessment
 """
 
+# Bump whenever a prompt below changes: cached assessments are keyed on it
+# (team11.assessment_cache), so results from older prompts stop being reused.
+PROMPT_VERSION = "1"
+
 WRITING_SYSTEM_PROMPT = """You are an expert TOEFL iBT writing assessor with over 10 years of experience evaluating essays for ETS. You follow the official TOEFL iBT Independent Writing Task rubric strictly.
 
 OFFICIAL TOEFL iBT SCORING CRITERIA (0-100 scale normalized from 0-5):
@@ -0,0 +1,482 @@
+"""
+Pool of OpenAI-compatible chat providers used for scoring.
+
+Every provider keeps an EWMA of its response time, a window of recent
+latencies and a circuit breaker. Calls go to the fastest provider whose
+breaker is closed. If it has not answered within its p95 latency, a hedged
+request goes to the next one and the first answer wins. A provider that
+errors (connection, timeout, 5xx) is failed over immediately. After
+BREAKER_FAILURES consecutive errors it is skipped for BREAKER_OPEN_SECONDS,
+then a single trial call decides whether it comes back. Providers over their
+rate limits are skipped too (see rate_limit.py); when every provider is, the
+call raises RateLimited.
+
+TEAM11_AI_PROVIDERS is a JSON list of providers, in order of preference
+until latencies are known:
+
+    [{"name": "gapgpt", "base_url": "https://api.gapgpt.app/v1",
+      "api_key_env": "TEAM11_AI_API_KEY", "model": "deepseek-chat", "rpm": 60, "tpm": 100000},
+     {"name": "backup", "base_url": "https://api.example.com/v1",
+      "api_key_env": "TEAM11_AI_BACKUP_API_KEY", "model": "deepseek-chat"}]
+
+Without it the pool holds the single provider configured in ai_service.
+Entries of "type": "fake" are only honoured with DEBUG on, since their canned
+assessment would otherwise be saved as a student's real result.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from openai import APIStatusError, AsyncOpenAI, OpenAI
+
+from .rate_limit import RateLimited, RateLimiter, estimate_tokens, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+CHAT_TIMEOUT_SECONDS = float(os.getenv("TEAM11_AI_CHAT_TIMEOUT_SECONDS", "60"))
+MAX_TOKENS = 1000
+# Limits of the provider used when TEAM11_AI_PROVIDERS is unset; 0 is unlimited.
+DEFAULT_RPM = float(os.getenv("TEAM11_AI_RPM", "0"))
+DEFAULT_TPM = float(os.getenv("TEAM11_AI_TPM", "0"))
+# Hedge delay until a provider has LATENCY_MIN_SAMPLES latencies recorded.
+HEDGE_AFTER_SECONDS = float(os.getenv("TEAM11_AI_HEDGE_AFTER_SECONDS", "20"))
+HEDGE_MIN_SECONDS = 0.5
+MAX_HEDGES = int(os.getenv("TEAM11_AI_MAX_HEDGES", "1"))
+BREAKER_FAILURES = int(os.getenv("TEAM11_AI_BREAKER_FAILURES", "3"))
+BREAKER_OPEN_SECONDS = float(os.getenv("TEAM11_AI_BREAKER_OPEN_SECONDS", "30"))
+EWMA_ALPHA = 0.3
+LATENCY_WINDOW = 100
+LATENCY_MIN_SAMPLES = 10
+
+FAKE_ASSESSMENT = {
+    'overall_score': 70.0, 'grammar_score': 70.0, 'vocabulary_score': 70.0,
+    'coherence_score': 70.0, 'fluency_score': 70.0, 'pronunciation_score': 70.0,
+    'feedback_summary': 'Assessment produced by the local fake provider.',
+    'suggestions': ['Configure a real provider in TEAM11_AI_PROVIDERS.'],
+}
+
+
+class Completion(NamedTuple):
+    """A chat answer and the provider and model that produced it."""
+    content: str
+    provider: str
+    model: str
+
+
+class ProviderError(Exception):
+    """A provider failed to answer; the pool fails over to the next one."""
+
+
+class NoProviderAvailable(Exception):
+    """Every provider's circuit breaker is open."""
+
+
+def counts_against_provider(error: Exception) -> bool:
+    """
+    Whether an error counts towards opening the provider's breaker. Rate
+    limits pause the provider's limiter instead, and other 4xx request errors
+    are the caller's fault and would fail on any provider.
+    """
+    if retry_after_seconds(error) is not None:
+        return False
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return True
+
+
+class ProviderHealth:
+    """Latency statistics and circuit breaker of one provider."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ewma = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.open_until = None
+        self.probing = False
+        self.counters = {
+            'calls': 0, 'successes': 0, 'failures': 0, 'hedges': 0, 'wins': 0,
+            'throttled': 0, 'rate_limited': 0,
+        }
+
+    def _observe(self, seconds):
+        self.ewma = seconds if self.ewma is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+
+    def state(self, now=None) -> str:
+        if self.open_until is None:
+            return 'closed'
+        if (now or time.monotonic()) < self.open_until or self.probing:
+            return 'open'
+        return 'half_open'
+
+    def begin(self, hedge=False):
+        with self._lock:
+            self.counters['calls'] += 1
+            self.counters['hedges'] += hedge
+            if self.state() == 'half_open':
+                self.probing = True
+
+    def success(self, seconds):
+        with self._lock:
+            self._observe(seconds)
+            self.latencies.append(seconds)
+            self.consecutive_failures = 0
+            self.open_until = None
+            self.probing = False
+            self.counters['successes'] += 1
+
+    def failure(self, seconds):
+        with self._lock:
+            # A provider that times out should also rank as slow.
+            self._observe(seconds)
+            self.consecutive_failures += 1
+            self.counters['failures'] += 1
+            if self.probing or self.consecutive_failures >= BREAKER_FAILURES:
+                if self.open_until is None or self.probing:
+                    logger.warning(f"Opening AI provider circuit after {self.consecutive_failures} failure(s)")
+                self.open_until = time.monotonic() + BREAKER_OPEN_SECONDS
+                self.probing = False
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def released(self):
+        # A call that lost a hedge race or was throttled says nothing about the provider's health.
+        with self._lock:
+            self.probing = False
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < LATENCY_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class Provider:
+    """An OpenAI-compatible chat completions endpoint."""
+
+    # Whether its answers may be stored in team11.assessment_cache.
+    cacheable = True
+
+    def __init__(self, name: str, base_url: str, api_key: str, model: str,
+                 timeout: float = CHAT_TIMEOUT_SECONDS, rpm: float = 0, tpm: float = 0):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.health = ProviderHealth()
+        self.limiter = RateLimiter(rpm, tpm)
+        self._client = None
+        # Keyed by event loop, like async_ai_service's clients.
+        self._async_clients = {}
+
+    def _request(self, messages):
+        return {
+            'model': self.model,
+            'messages': messages,
+            'temperature': 0.2,  # Low temperature for consistent scoring
+            'max_tokens': MAX_TOKENS,
+            'timeout': self.timeout,
+        }
+
+    def chat(self, messages: list) -> str:
+        if self._client is None:
+            self._client = OpenAI(base_url=self.base_url, api_key=self.api_key, timeout=self.timeout)
+        response = self._client.chat.completions.create(**self._request(messages))
+        return response.choices[0].message.content
+
+    async def achat(self, messages: list) -> Completion:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncOpenAI(
+                base_url=self.base_url, api_key=self.api_key, timeout=self.timeout,
+            )
+        response = await client.chat.completions.create(**self._request(messages))
+        return response.choices[0].message.content
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+
+class FakeProvider(Provider):
+    """
+    Offline provider: answers with a fixed assessment after `latency` seconds,
+    fails, or (with throttle_seconds) answers like a 429 with that Retry-After.
+    """
+
+    cacheable = False
+
+    def __init__(self, name: str = 'fake', latency: float = 0.0, fail: bool = False,
+                 content: Optional[str] = None, timeout: float = CHAT_TIMEOUT_SECONDS,
+                 throttle_seconds: Optional[float] = None, rpm: float = 0, tpm: float = 0):
+        super().__init__(name, base_url='', api_key='', model='fake', timeout=timeout, rpm=rpm, tpm=tpm)
+        self.latency = latency
+        self.fail = fail
+        self.throttle_seconds = throttle_seconds
+        self.content = content if content is not None else json.dumps(FAKE_ASSESSMENT)
+        self.calls = 0
+
+    def _answer(self):
+        self.calls += 1
+        if self.throttle_seconds is not None:
+            raise RateLimited(self.throttle_seconds, f"Fake provider {self.name} throttled")
+        if self.fail:
+            raise ProviderError(f"Fake provider {self.name} failed")
+        return self.content
+
+    def chat(self, messages: list) -> str:
+        time.sleep(self.latency)
+        return self._answer()
+
+    async def achat(self, messages: list) -> Completion:
+        await asyncio.sleep(self.latency)
+        return self._answer()
+
+    async def aclose(self):
+        pass
+
+
+class _Attempt:
+    """Providers left to try for one pooled call, and why the others were skipped."""
+
+    def __init__(self, providers, tokens):
+        self.candidates = iter(providers)
+        self.tokens = tokens
+        self.waits = []
+        self.last_error = None
+
+    def next_provider(self):
+        for provider in self.candidates:
+            wait_seconds = provider.limiter.reserve(self.tokens)
+            if not wait_seconds:
+                return provider
+            provider.health.count('rate_limited')
+            self.waits.append(wait_seconds)
+        return None
+
+    def failed(self, provider, error):
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            provider.limiter.pause(retry_after)
+            provider.health.count('throttled')
+            self.waits.append(retry_after)
+            logger.warning(f"AI provider {provider.name} is rate limited for {retry_after:.1f}s, failing over")
+            return
+        if not counts_against_provider(error):
+            raise error
+        logger.warning(f"AI provider {provider.name} failed, failing over: {error}")
+        self.last_error = error
+
+    def error(self):
+        # Rate limits win: they say when to try again, so the job is deferred rather than failed.
+        if self.waits:
+            return RateLimited(min(self.waits))
+        return self.last_error or NoProviderAvailable('All AI providers are unavailable.')
+
+
+class ProviderPool:
+    """Routes chat calls across providers; see the module docstring."""
+
+    def __init__(self, providers: List[Provider], max_hedges: int = MAX_HEDGES):
+        self.providers = list(providers)
+        self.max_hedges = max_hedges
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def ranked(self) -> List[Provider]:
+        """Providers whose breaker lets a call through, fastest first (untried ones first)."""
+        now = time.monotonic()
+        available = [(index, p) for index, p in enumerate(self.providers) if p.health.state(now) != 'open']
+        available.sort(key=lambda item: (item[1].health.ewma or 0.0, item[0]))
+        return [p for _, p in available]
+
+    def hedge_delay(self, provider: Provider) -> float:
+        p95 = provider.health.p95()
+        delay = HEDGE_AFTER_SECONDS if p95 is None else max(HEDGE_MIN_SECONDS, p95)
+        return min(delay, provider.timeout)
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(4, len(self.providers) * 8), thread_name_prefix='team11-llm',
+                )
+            return self._executor
+
+    def _call(self, provider, messages, hedge):
+        provider.health.begin(hedge)
+        started = time.monotonic()
+        try:
+            content = provider.chat(messages)
+        except Exception as e:
+            self._record_error(provider, e, started)
+            raise
+        provider.health.success(time.monotonic() - started)
+        return Completion(content, provider.name, provider.model)
+
+    async def _acall(self, provider, messages, hedge):
+        provider.health.begin(hedge)
+        started = time.monotonic()
+        try:
+            content = await provider.achat(messages)
+        except asyncio.CancelledError:
+            provider.health.released()
+            raise
+        except Exception as e:
+            self._record_error(provider, e, started)
+            raise
+        provider.health.success(time.monotonic() - started)
+        return Completion(content, provider.name, provider.model)
+
+    def _record_error(self, provider, error, started):
+        if counts_against_provider(error):
+            provider.health.failure(time.monotonic() - started)
+        else:
+            provider.health.released()
+
+    @property
+    def primary(self) -> Provider:
+        """The preferred provider; assessment cache keys are built from it."""
+        return self.providers[0]
+
+    def chat(self, messages: list) -> Completion:
+        """
+        The first successful completion. Raises RateLimited when providers
+        are over their limits, else the last provider error.
+        """
+        attempt = _Attempt(self.ranked(), estimate_tokens(messages, MAX_TOKENS))
+        pending = {}
+        hedges = 0
+
+        def launch(hedge=False):
+            provider = attempt.next_provider()
+            if provider is not None:
+                pending[self._pool().submit(self._call, provider, messages, hedge)] = provider
+            return provider
+
+        primary = launch()
+        if primary is None:
+            raise attempt.error()
+        while pending:
+            timeout = self.hedge_delay(primary) if hedges < self.max_hedges else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedges += 1
+                launch(hedge=True)
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    completion = future.result()
+                except Exception as e:
+                    attempt.failed(provider, e)
+                    launch()
+                    continue
+                provider.health.count('wins')
+                # Slower calls still running finish in the background and update their stats.
+                return completion
+        raise attempt.error()
+
+    async def achat(self, messages: list) -> Completion:
+        """chat() on the event loop; calls that lose the race are cancelled."""
+        attempt = _Attempt(self.ranked(), estimate_tokens(messages, MAX_TOKENS))
+        pending = {}
+        hedges = 0
+
+        def launch(hedge=False):
+            provider = attempt.next_provider()
+            if provider is not None:
+                pending[asyncio.ensure_future(self._acall(provider, messages, hedge))] = provider
+            return provider
+
+        primary = launch()
+        if primary is None:
+            raise attempt.error()
+        try:
+            while pending:
+                timeout = self.hedge_delay(primary) if hedges < self.max_hedges else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedges += 1
+                    launch(hedge=True)
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        completion = task.result()
+                    except Exception as e:
+                        attempt.failed(provider, e)
+                        launch()
+                        continue
+                    provider.health.count('wins')
+                    return completion
+            raise attempt.error()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        for provider in self.providers:
+            await provider.aclose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        stats = []
+        for provider in self.providers:
+            health = provider.health
+            p95 = health.p95()
+            stats.append({
+                'name': provider.name,
+                'state': health.state(now),
+                'ewma_ms': None if health.ewma is None else int(health.ewma * 1000),
+                'p95_ms': None if p95 is None else int(p95 * 1000),
+                **health.counters,
+                'limiter': provider.limiter.stats(),
+            })
+        return stats
+
+
+def from_config(entries: list, default_api_key: str = '') -> List[Provider]:
+    providers = []
+    for index, entry in enumerate(entries):
+        name = entry.get('name') or f'provider{index}'
+        timeout = float(entry.get('timeout', CHAT_TIMEOUT_SECONDS))
+        limits = {'rpm': float(entry.get('rpm', 0)), 'tpm': float(entry.get('tpm', 0))}
+        if entry.get('type') == 'fake':
+            if not settings.DEBUG:
+                logger.error(f"Ignoring fake AI provider {name}: fake providers need DEBUG")
+                continue
+            providers.append(FakeProvider(name, latency=float(entry.get('latency', 0)),
+                                          fail=bool(entry.get('fail', False)), timeout=timeout, **limits))
+            continue
+        api_key = entry.get('api_key') or os.getenv(entry.get('api_key_env', ''), '') or default_api_key
+        providers.append(Provider(name, entry['base_url'], api_key, entry['model'], timeout=timeout, **limits))
+    return providers
+
+
+def load(base_url: str, api_key: str, model: str) -> ProviderPool:
+    """Pool from TEAM11_AI_PROVIDERS, or the single given provider when it is unset."""
+    raw = os.getenv("TEAM11_AI_PROVIDERS")
+    if raw:
+        try:
+            providers = from_config(json.loads(raw), default_api_key=api_key)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Ignoring invalid TEAM11_AI_PROVIDERS: {e}")
+        else:
+            if providers:
+                return ProviderPool(providers)
+    return ProviderPool([Provider('default', base_url, api_key, model, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM)])
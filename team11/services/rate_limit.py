@@ -0,0 +1,122 @@
+"""
+Client-side rate limiting of AI provider calls.
+
+Each provider has a RateLimiter with a requests-per-minute and a
+tokens-per-minute token bucket, shared by every thread and coroutine of the
+worker process. A call that does not fit is not made: the pool tries the next
+provider, and if none has room the assessment fails with RateLimited so the
+job is deferred (team11.jobs.defer) instead of failed. A 429 from a provider
+pauses its limiter for the Retry-After the provider sent.
+
+Buckets are per process, so divide a provider's limits by the number of
+worker processes when configuring `rpm`/`tpm` in TEAM11_AI_PROVIDERS.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from openai import RateLimitError
+
+# Used when a 429 carries no usable Retry-After header.
+DEFAULT_RETRY_AFTER_SECONDS = 10.0
+
+
+class RateLimited(Exception):
+    """No provider can take the call for retry_after seconds."""
+
+    def __init__(self, retry_after: float, message: str = 'AI provider rate limit reached'):
+        super().__init__(f"{message}, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """`per_minute` tokens a minute, refilled continuously, holding at most a minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A request larger than the bucket waits for a full bucket rather than forever.
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """RPM and TPM limits of one provider; 0 means unlimited."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """Take capacity for one call of `tokens` tokens; else the seconds until it would fit."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.paused_until - now,
+                self.requests.wait_time(1, now) if self.requests else 0.0,
+                self.tokens.wait_time(tokens, now) if self.tokens else 0.0,
+            )
+            if wait > 0:
+                return wait
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            return 0.0
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'paused_for_s': round(max(0.0, self.paused_until - time.monotonic()), 1),
+                'requests_available': None if self.requests is None else int(self.requests.tokens),
+                'tokens_available': None if self.tokens is None else int(self.tokens.tokens),
+            }
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """Rough prompt size (about 4 characters a token) plus the completion budget."""
+    return sum(len(message.get('content') or '') for message in messages) // 4 + max_tokens
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """How long a rate-limited provider asked us to wait; None if the error is not a rate limit."""
+    if isinstance(error, RateLimited):
+        return error.retry_after
+    if not isinstance(error, RateLimitError):
+        return None
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                retry_at = parsedate_to_datetime(value)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        pass
+    return DEFAULT_RETRY_AFTER_SECONDS
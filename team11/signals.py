@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from team11 import catalog, question_pool
+from team11.models import Question, QuestionCategory
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=QuestionCategory)
+@receiver(post_delete, sender=QuestionCategory)
+def drop_question_caches(sender, instance, **kwargs):
+    # Activation, category moves and deletions all change which ids a pool holds
+    # and what the start_exam catalog shows.
+    question_pool.clear()
+    catalog.invalidate()
@@ -0,0 +1,146 @@
+"""
+Server-Sent Events stream of submission status changes for the dashboard.
+
+Each open dashboard holds one connection to views.submission_events instead
+of polling every pending submission. Connections do not query the database
+themselves: one watcher task per event loop looks up every watched
+submission in a single query each TEAM11_STATUS_POLL_SECONDS and hands the
+finished ones to the streams waiting on them. Assessments finish in the
+worker process, so the database is the only signal shared between the two.
+"""
+import asyncio
+import json
+import logging
+import os
+import weakref
+
+from django.core.handlers.asgi import ASGIRequest
+
+from .models import AnalysisStatus, Submission
+
+logger = logging.getLogger(__name__)
+
+DB = 'team11'
+POLL_SECONDS = float(os.getenv("TEAM11_STATUS_POLL_SECONDS", "1.0"))
+KEEPALIVE_SECONDS = 15
+# Django 4.2 keeps iterating a stream after the client has gone, so streams
+# end on their own; EventSource reconnects after RETRY_MS.
+STREAM_MAX_SECONDS = int(os.getenv("TEAM11_STATUS_STREAM_MAX_SECONDS", "300"))
+RETRY_MS = 3000
+
+PENDING_STATUSES = (AnalysisStatus.PENDING, AnalysisStatus.IN_PROGRESS)
+COMPLETED_MESSAGE = 'ارزیابی با موفقیت انجام شد.'
+FAILED_MESSAGE = 'ارزیابی ناموفق بود. لطفاً دوباره تلاش کنید.'
+
+
+def status_payload(submission):
+    """Status of a submission as returned by the status API and the stream."""
+    payload = {'submission_id': str(submission.submission_id)}
+    if submission.status in PENDING_STATUSES:
+        return {**payload, 'status': 'in_progress'}
+    if submission.status == AnalysisStatus.COMPLETED:
+        return {**payload, 'status': 'completed', 'score': submission.overall_score, 'message': COMPLETED_MESSAGE}
+
+    error_message = None
+    if hasattr(submission, 'assessment_result') and submission.assessment_result:
+        error_message = submission.assessment_result.feedback_summary
+    return {**payload, 'status': 'failed', 'message': error_message or FAILED_MESSAGE}
+
+
+class _Watcher:
+    """Polls for finished submissions on behalf of every stream on one event loop."""
+
+    def __init__(self):
+        self.queues = {}
+        self.task = None
+
+    def subscribe(self, submission_ids):
+        queue = asyncio.Queue()
+        for submission_id in submission_ids:
+            self.queues.setdefault(submission_id, set()).add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue, submission_ids):
+        for submission_id in submission_ids:
+            queues = self.queues.get(submission_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self.queues[submission_id]
+
+    async def _run(self):
+        while self.queues:
+            try:
+                finished = (
+                    Submission.objects.using(DB)
+                    .filter(pk__in=list(self.queues))
+                    .exclude(status__in=PENDING_STATUSES)
+                    .select_related('assessment_result')
+                )
+                async for submission in finished:
+                    payload = status_payload(submission)
+                    for queue in self.queues.pop(payload['submission_id'], ()):
+                        queue.put_nowait(payload)
+            except Exception as e:
+                logger.warning(f"Submission status watcher query failed: {e}")
+            await asyncio.sleep(POLL_SECONDS)
+
+
+_watchers = weakref.WeakKeyDictionary()
+
+
+def _watcher():
+    loop = asyncio.get_running_loop()
+    watcher = _watchers.get(loop)
+    if watcher is None:
+        watcher = _watchers[loop] = _Watcher()
+    return watcher
+
+
+def streaming_supported(request):
+    """
+    Only the ASGI handler sends an async stream as it is produced. Under WSGI
+    Django buffers the whole stream, which ties up a worker until it ends.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream(user_id):
+    """Yield SSE messages for the user's pending submissions until all have finished."""
+    pending = [
+        str(pk) async for pk in
+        Submission.objects.using(DB)
+        .filter(user_id=user_id, status__in=PENDING_STATUSES)
+        .values_list('submission_id', flat=True)
+    ]
+    if not pending:
+        yield f"retry: {RETRY_MS}\n\n" + _event('done', {})
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_MAX_SECONDS
+    remaining = set(pending)
+    watcher = _watcher()
+    queue = watcher.subscribe(pending)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while remaining and loop.time() < deadline:
+            try:
+                payload = await asyncio.wait_for(
+                    queue.get(), min(KEEPALIVE_SECONDS, max(0, deadline - loop.time())),
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            remaining.discard(payload['submission_id'])
+            yield _event('status', payload)
+        if not remaining:
+            yield _event('done', {})
+    finally:
+        watcher.unsubscribe(queue, pending)
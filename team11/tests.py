@@ -1,13 +1,24 @@
+from io import StringIO
 from pathlib import Path
 import json
+from datetime import timedelta
+from unittest import skipUnless
 from unittest.mock import patch
 
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from openai import OpenAI, APIError, APIConnectionError, RateLimitError
 
-from .models import Submission, WritingSubmission, AssessmentResult, SubmissionType, AnalysisStatus
-from .services import assess_writing, assess_speaking
+from . import assessment_cache, catalog, history, jobs, question_pool, views
+from .models import (
+    Submission, WritingSubmission, ListeningSubmission, AssessmentResult, SubmissionType, AnalysisStatus,
+    AssessmentJob, JobStatus, AssessmentCacheEntry, TranscriptionCacheEntry, UserScoreStats,
+    Question, QuestionCategory,
+)
+from .services import ai_service, assess_writing, assess_speaking, audio_preprocess, providers
 from .services.ai_service import API_BASE_URL, API_KEY, DEEPSEEK_MODEL
 
 
@@ -147,8 +158,7 @@ class Team11SubmissionApiTests(TestCase):
         )
         self.assertEqual(Submission.objects.using("team11").count(), 0)
 
-    @patch("team11.views.threading.Thread")
-    def test_submit_writing_creates_submission_and_returns_202(self, thread_mock):
+    def test_submit_writing_creates_submission_and_returns_202(self):
         response = self.client.post(
             "/team11/api/submit-writing/",
             data=json.dumps(
@@ -172,8 +182,28 @@ class Team11SubmissionApiTests(TestCase):
         self.assertTrue(
             WritingSubmission.objects.using("team11").filter(submission=submission).exists()
         )
-        thread_mock.assert_called_once()
-        thread_mock.return_value.start.assert_called_once()
+        job = AssessmentJob.objects.using("team11").get(submission=submission)
+        self.assertEqual(job.status, JobStatus.QUEUED)
+
+    def test_submit_writing_cache_hit_completes_without_job(self):
+        assessment_cache.store(assessment_cache.writing_key("Test topic", "Same essay body here."), SubmissionType.WRITING, {
+            "success": True, "overall_score": 75.0, "grammar_score": 70.0, "vocabulary_score": 72.0,
+            "coherence_score": 78.0, "fluency_score": 74.0, "feedback_summary": "Cached", "suggestions": [],
+            "provider": ai_service.chat_pool.primary.name, "model": ai_service.chat_pool.primary.model,
+        })
+        response = self.client.post(
+            "/team11/api/submit-writing/",
+            data=json.dumps({"topic": "Test topic", "text_body": "  Same essay\n body here. "}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json().get("status"), "completed")
+        submission = Submission.objects.using("team11").get(submission_id=response.json()["submission_id"])
+        self.assertEqual(submission.status, AnalysisStatus.COMPLETED)
+        self.assertEqual(submission.assessment_result.feedback_summary, "Cached")
+        self.assertFalse(AssessmentJob.objects.using("team11").exists())
+        self.assertEqual(AssessmentCacheEntry.objects.using("team11").get().hit_count, 1)
 
     def test_submit_writing_rejects_persian_text(self):
         response = self.client.post(
@@ -210,3 +240,707 @@ class Team11SubmissionApiTests(TestCase):
             response.json().get("message"),
             "Custom failure from assessment",
         )
+
+
+    def test_batched_submission_status_with_etag(self):
+        other_user = get_user_model().objects.create_user(email="other@example.com", password="x")
+        done, pending, foreign = (
+            Submission.objects.using("team11").create(
+                user_id=user_id, submission_type=SubmissionType.WRITING, status=status, overall_score=score,
+            )
+            for user_id, status, score in [
+                (self.user.id, AnalysisStatus.COMPLETED, 75.0),
+                (self.user.id, AnalysisStatus.IN_PROGRESS, None),
+                (other_user.id, AnalysisStatus.COMPLETED, 90.0),
+            ]
+        )
+        url = f"/team11/api/submission-status/?ids={done.pk},{pending.pk}&ids={foreign.pk}"
+
+        with self.assertNumQueries(1, using="team11"):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"submissions": {
+            str(done.pk): {"status": "completed", "score": 75.0},
+            str(pending.pk): {"status": "in_progress"},
+        }})
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        Submission.objects.using("team11").filter(pk=pending.pk).update(status=AnalysisStatus.COMPLETED)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["submissions"][str(pending.pk)]["status"], "completed")
+
+        self.assertEqual(self.client.get("/team11/api/submission-status/?ids=nope").status_code, 400)
+
+
+    @patch("team11.jobs.assess_writing")
+    def test_dashboard_stats_are_updated_incrementally(self, assess_mock):
+        def writing(score):
+            submission = Submission.objects.using("team11").create(
+                user_id=self.user.id, submission_type=SubmissionType.WRITING, status=AnalysisStatus.IN_PROGRESS,
+            )
+            WritingSubmission.objects.using("team11").create(
+                submission=submission, topic="Topic", text_body=f"Essay scored {score}", word_count=3,
+            )
+            return submission
+
+        # History from before the stats table existed is picked up by the first rebuild.
+        old = writing(60)
+        Submission.objects.using("team11").filter(pk=old.pk).update(status=AnalysisStatus.COMPLETED, overall_score=60)
+        for score in (70, 90):
+            assess_mock.return_value = {
+                "success": True, "overall_score": score, "grammar_score": score, "vocabulary_score": score,
+                "coherence_score": score, "fluency_score": score, "feedback_summary": "ok", "suggestions": [],
+            }
+            jobs.enqueue(writing(score))
+            jobs.run_job(jobs.claim("worker-a"))
+
+        stats = UserScoreStats.objects.using("team11").get(user_id=self.user.id)
+        self.assertEqual((stats.completed_count, stats.writing_count, stats.writing_score_sum), (3, 3, 220))
+        self.assertEqual([point["score"] for point in stats.writing_series], [60, 70, 90])
+
+        # The stats row and the submission listing.
+        with self.assertNumQueries(2, using="team11"):
+            response = self.client.get("/team11/dashboard/")
+        self.assertEqual(response.context["writing_avg"], 73.33)
+        self.assertEqual(response.context["completed_count"], 3)
+
+        # Re-scoring a completed submission replaces its score in the stats.
+        assess_mock.return_value = {**assess_mock.return_value, "overall_score": 30}
+        rescored = Submission.objects.using("team11").filter(overall_score=90).get()
+        jobs.save_result(rescored, rescored.writing_details, assess_mock.return_value)
+        stats.refresh_from_db(using="team11")
+        self.assertEqual((stats.completed_count, stats.writing_score_sum), (3, 160))
+        self.assertEqual([point["score"] for point in stats.writing_series], [60, 70, 30])
+
+        UserScoreStats.objects.using("team11").all().delete()
+        call_command("rebuild_score_stats", stdout=StringIO())
+        rebuilt = UserScoreStats.objects.using("team11").get(user_id=self.user.id)
+        self.assertEqual((rebuilt.writing_count, rebuilt.writing_score_sum), (3, 160))
+        self.assertEqual(rebuilt.writing_series, stats.writing_series)
+
+
+    def test_history_is_keyset_paginated_without_heavy_columns(self):
+        start = timezone.now()
+        created = []
+        for i in range(5):
+            submission = Submission.objects.using("team11").create(
+                user_id=self.user.id, submission_type=SubmissionType.WRITING, status=AnalysisStatus.COMPLETED,
+                overall_score=50 + i,
+                # Two rows share a timestamp so the submission_id tie-break is exercised.
+                created_at=start - timedelta(minutes=min(i, 3)),
+            )
+            WritingSubmission.objects.using("team11").create(
+                submission=submission, topic=f"Topic {i}", text_body="long essay " * 500, word_count=1000,
+            )
+            created.append(submission)
+
+        seen, cursor = [], None
+        while True:
+            url = "/team11/api/history/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+            with self.assertNumQueries(1, using="team11"):
+                body = self.client.get(url).json()
+            seen += [item["submission_id"] for item in body["items"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        expected = sorted(created, key=lambda s: (s.created_at, s.submission_id), reverse=True)
+        self.assertEqual(seen, [str(s.pk) for s in expected])
+
+        rows, _ = history.page(self.user.id)
+        self.assertIn("text_body", rows[0].writing_details.get_deferred_fields())
+        self.assertEqual(history.item(rows[0])["title"], f"Topic: {rows[0].writing_details.topic}")
+        self.assertEqual(self.client.get("/team11/api/history/?cursor=garbage").status_code, 400)
+        html = self.client.get("/team11/api/history/?format=html&limit=2").json()["html"]
+        self.assertEqual(html.count('class="submission-card"'), 2)
+
+
+    def test_question_pool_picks_with_one_query_and_is_invalidated(self):
+        category = QuestionCategory.objects.using("team11").create(
+            name="Pool", question_type=SubmissionType.WRITING,
+        )
+        first, second = (
+            Question.objects.using("team11").create(category=category, question_text=f"Question {i}")
+            for i in range(2)
+        )
+        question_pool.pick(SubmissionType.WRITING, category.pk)
+
+        with self.assertNumQueries(1, using="team11"):
+            question = question_pool.pick(SubmissionType.WRITING, category.pk)
+        self.assertIn(question, (first, second))
+
+        # Deactivating a question drops the cached pools.
+        second.is_active = False
+        second.save(using="team11")
+        self.assertEqual(question_pool.pool(SubmissionType.WRITING, category.pk), (first.pk,))
+
+        # With avoid_answered, questions the user has written on come last.
+        third = Question.objects.using("team11").create(category=category, question_text="Question 3")
+        submission = Submission.objects.using("team11").create(
+            user_id=self.user.id, submission_type=SubmissionType.WRITING, status=AnalysisStatus.COMPLETED,
+        )
+        WritingSubmission.objects.using("team11").create(
+            submission=submission, question=first, topic="t", text_body="x", word_count=1,
+        )
+        for _ in range(5):
+            picked = question_pool.pick(SubmissionType.WRITING, category.pk, user_id=self.user.id, avoid_answered=True)
+            self.assertEqual(picked, third)
+
+        self.assertIsNone(question_pool.pick(SubmissionType.WRITING, "not-a-uuid"))
+
+
+    def test_start_exam_catalog_is_cached_until_questions_change(self):
+        category = QuestionCategory.objects.using("team11").create(
+            name="Catalog category", question_type=SubmissionType.LISTENING,
+        )
+        Question.objects.using("team11").create(category=category, question_text="Q", difficulty_level="advanced")
+        self.client.get("/team11/start-exam/")
+
+        with self.assertNumQueries(0, using="team11"):
+            response = self.client.get("/team11/start-exam/")
+        self.assertContains(response, "Catalog category")
+
+        listening = catalog.get()[SubmissionType.LISTENING]
+        entry = next(c for c in listening if c["name"] == "Catalog category")
+        self.assertEqual((entry["question_count"], entry["by_difficulty"]["advanced"]), (1, 1))
+
+        category.name = "Renamed category"
+        category.save(using="team11")
+        response = self.client.get("/team11/start-exam/")
+        self.assertContains(response, "Renamed category")
+        self.assertNotContains(response, "Catalog category")
+
+
+class Team11SubmissionEventsTests(TestCase):
+    databases = {"default", "team11"}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="events_user@example.com", password="x")
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def _submission(self, status):
+        return Submission.objects.using("team11").create(
+            user_id=self.user.id, submission_type=SubmissionType.WRITING, status=status,
+        )
+
+    async def _events(self, response):
+        async for chunk in response.streaming_content:
+            for message in chunk.decode().split("\n\n"):
+                if message.startswith("event: "):
+                    name, data = message.split("\n")
+                    yield name[len("event: "):], json.loads(data[len("data: "):])
+
+    async def test_nothing_pending_ends_stream_immediately(self):
+        response = await self.async_client.get("/team11/api/submission-events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = [event async for event in self._events(response)]
+        self.assertEqual(events, [("done", {})])
+
+    def test_wsgi_gets_no_stream_and_dashboard_polls(self):
+        self._submission(AnalysisStatus.IN_PROGRESS)
+        self.assertEqual(self.client.get("/team11/api/submission-events/").status_code, 204)
+        dashboard = self.client.get("/team11/dashboard/")
+        self.assertFalse(dashboard.context["live_events"])
+        # The poller splits the pending ids into batches the status endpoint accepts.
+        self.assertContains(dashboard, f"const STATUS_BATCH_SIZE = {views.MAX_STATUS_IDS};")
+
+    @patch("team11.status_events.POLL_SECONDS", 0.01)
+    async def test_pushes_each_submission_as_it_finishes(self):
+        first = await sync_to_async(self._submission)(AnalysisStatus.IN_PROGRESS)
+        second = await sync_to_async(self._submission)(AnalysisStatus.PENDING)
+
+        response = await self.async_client.get("/team11/api/submission-events/")
+        # The retry preamble is sent once the stream is watching both submissions.
+        self.assertTrue((await anext(response.streaming_content)).startswith(b"retry:"))
+        events = self._events(response)
+
+        await Submission.objects.using("team11").filter(pk=first.pk).aupdate(
+            status=AnalysisStatus.COMPLETED, overall_score=80,
+        )
+        name, data = await anext(events)
+        self.assertEqual((name, data["submission_id"], data["status"], data["score"]),
+                         ("status", str(first.pk), "completed", 80))
+
+        await Submission.objects.using("team11").filter(pk=second.pk).aupdate(status=AnalysisStatus.FAILED)
+        name, data = await anext(events)
+        self.assertEqual((name, data["submission_id"], data["status"]), ("status", str(second.pk), "failed"))
+        self.assertEqual(await anext(events), ("done", {}))
+
+
+class Team11AssessmentJobTests(TestCase):
+    databases = {"default", "team11"}
+
+    def setUp(self):
+        self.submission = Submission.objects.using("team11").create(
+            user_id=get_user_model().objects.create_user(email="job@example.com", password="x").id,
+            submission_type=SubmissionType.WRITING,
+            status=AnalysisStatus.IN_PROGRESS,
+        )
+        WritingSubmission.objects.using("team11").create(
+            submission=self.submission, topic="Topic", text_body="Some text here", word_count=3,
+        )
+        self.job = jobs.enqueue(self.submission)
+
+    def _reload(self):
+        self.submission.refresh_from_db(using="team11")
+        self.job.refresh_from_db(using="team11")
+
+    @patch("team11.jobs.assess_writing")
+    def test_worker_claims_and_completes_job(self, assess_mock):
+        assess_mock.return_value = {
+            "success": True, "overall_score": 80.0, "grammar_score": 80.0, "vocabulary_score": 80.0,
+            "coherence_score": 80.0, "fluency_score": 80.0, "feedback_summary": "Good", "suggestions": [],
+            "provider": "default", "model": DEEPSEEK_MODEL,
+        }
+        job = jobs.claim("worker-a")
+        self.assertEqual(job.pk, self.job.pk)
+        self.assertIsNone(jobs.claim("worker-b"))
+
+        jobs.run_job(job)
+        self._reload()
+        self.assertEqual(self.job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertEqual(self.submission.status, AnalysisStatus.COMPLETED)
+        self.assertEqual(self.submission.overall_score, 80.0)
+        self.assertEqual(AssessmentCacheEntry.objects.using("team11").count(), 1)
+
+    @patch("team11.services.async_ai_service._chat")
+    def test_async_worker_runs_job_on_event_loop(self, chat_mock):
+        from asgiref.sync import async_to_sync
+
+        chat_mock.return_value = providers.Completion(json.dumps({
+            "overall_score": 70, "grammar_score": 70, "vocabulary_score": 70, "coherence_score": 70,
+            "fluency_score": 70, "feedback_summary": "OK", "suggestions": "Read more",
+        }), "default", DEEPSEEK_MODEL)
+        async_to_sync(jobs.arun_job)(jobs.claim("worker-a"))
+        self._reload()
+        self.assertEqual(self.job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(self.submission.overall_score, 70.0)
+        self.assertEqual(self.submission.assessment_result.suggestions, ["Read more"])
+
+    @patch("team11.jobs.assess_writing")
+    def test_retryable_error_requeues_with_backoff_until_attempts_run_out(self, assess_mock):
+        assess_mock.return_value = {"success": False, "error": "Too many requests", "retryable": True}
+        jobs.run_job(jobs.claim("worker-a"))
+        self._reload()
+        self.assertEqual(self.job.status, JobStatus.QUEUED)
+        self.assertGreater(self.job.run_after, timezone.now())
+        self.assertEqual(self.submission.status, AnalysisStatus.IN_PROGRESS)
+
+        AssessmentJob.objects.using("team11").filter(pk=self.job.pk).update(
+            run_after=timezone.now(), attempts=self.job.max_attempts - 1,
+        )
+        jobs.run_job(jobs.claim("worker-a"))
+        self._reload()
+        self.assertEqual(self.job.status, JobStatus.FAILED)
+        self.assertEqual(self.submission.status, AnalysisStatus.FAILED)
+        self.assertEqual(self.submission.assessment_result.feedback_summary, jobs.FAILED_MESSAGE)
+
+    def test_stale_worker_cannot_fail_a_reclaimed_job(self):
+        stale = jobs.claim("worker-a")
+        AssessmentJob.objects.using("team11").filter(pk=stale.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        jobs.recover_orphans()
+        self.assertEqual(jobs.claim("worker-b").pk, stale.pk)
+
+        jobs.fail(stale, "late error", retryable=False)
+        self._reload()
+        self.assertEqual((self.job.status, self.job.locked_by), (JobStatus.RUNNING, "worker-b"))
+        self.assertEqual(self.submission.status, AnalysisStatus.IN_PROGRESS)
+
+    @patch("team11.management.commands.run_assessment_workers.ERROR_BACKOFF_SECONDS", 0)
+    @patch("team11.management.commands.run_assessment_workers.signal.signal")
+    @patch("team11.jobs.claim")
+    def test_worker_thread_survives_errors(self, claim_mock, _signal):
+        from django.db import DatabaseError
+
+        claim_mock.side_effect = [DatabaseError("connection lost"), None]
+        with self.assertLogs("team11.management.commands.run_assessment_workers", "ERROR"):
+            call_command(
+                "run_assessment_workers", "--once", "--concurrency", "1", "--poll-interval", "0.1",
+                "--lease-seconds", "1", stdout=StringIO(),
+            )
+        self.assertEqual(claim_mock.call_count, 2)
+
+    def test_fallback_provider_answers_are_not_cached(self):
+        primary = providers.Provider("default", API_BASE_URL, API_KEY, DEEPSEEK_MODEL)
+        primary.health.open_until = float("inf")
+        backup = providers.Provider("backup", API_BASE_URL, API_KEY, "other-model")
+        backup.chat = lambda messages: json.dumps({
+            "overall_score": 60, "grammar_score": 60, "vocabulary_score": 60, "coherence_score": 60,
+            "fluency_score": 60, "feedback_summary": "Backup", "suggestions": [],
+        })
+        with patch("team11.services.ai_service.chat_pool", providers.ProviderPool([primary, backup])):
+            jobs.run_job(jobs.claim("worker-a"))
+        self._reload()
+        self.assertEqual(self.submission.overall_score, 60.0)
+        self.assertFalse(AssessmentCacheEntry.objects.using("team11").exists())
+
+    def test_rate_limited_job_is_deferred_without_using_an_attempt(self):
+        pool = providers.ProviderPool([providers.FakeProvider("busy", throttle_seconds=5)])
+        with patch("team11.services.ai_service.chat_pool", pool):
+            jobs.run_job(jobs.claim("worker-a"))
+        self._reload()
+        self.assertEqual(self.job.status, JobStatus.QUEUED)
+        self.assertEqual(self.job.attempts, 0)
+        self.assertGreaterEqual(self.job.run_after, timezone.now() + timedelta(seconds=4))
+        self.assertEqual(self.submission.status, AnalysisStatus.IN_PROGRESS)
+        self.assertEqual(self.job.metrics["queue"]["deferrals"], 1)
+        self.assertIn("wait_ms", self.job.metrics["queue"])
+
+    def test_migration_queues_submissions_left_without_a_job(self):
+        from importlib import import_module
+        from types import SimpleNamespace
+        from django.apps import apps
+        from django.db import connections
+
+        migration = import_module("team11.migrations.0012_enqueue_unfinished_submissions")
+        stranded = Submission.objects.using("team11").create(
+            user_id=self.submission.user_id, submission_type=SubmissionType.WRITING,
+            status=AnalysisStatus.IN_PROGRESS,
+        )
+        Submission.objects.using("team11").create(
+            user_id=self.submission.user_id, submission_type=SubmissionType.WRITING,
+            status=AnalysisStatus.COMPLETED,
+        )
+        migration.enqueue_unfinished_submissions(apps, SimpleNamespace(connection=connections["team11"]))
+        self.assertEqual(
+            set(AssessmentJob.objects.using("team11").values_list("submission_id", flat=True)),
+            {self.submission.pk, stranded.pk},
+        )
+
+    def test_expired_lease_is_recovered(self):
+        job = jobs.claim("worker-a")
+        AssessmentJob.objects.using("team11").filter(pk=job.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertFalse(jobs.heartbeat(job.pk, "worker-b"))
+        self.assertEqual(jobs.recover_orphans(), (1, 0))
+
+        self.assertEqual(jobs.claim("worker-b").pk, job.pk)
+        self._reload()
+        self.assertEqual(self.job.attempts, 2)
+
+
+class Team11ProviderPoolTests(TestCase):
+    def test_routes_to_fastest_provider(self):
+        slow = providers.FakeProvider("slow", latency=0.03)
+        fast = providers.FakeProvider("fast")
+        pool = providers.ProviderPool([slow, fast], max_hedges=0)
+        for _ in range(3):
+            pool.chat([])
+        self.assertEqual((slow.calls, fast.calls), (1, 2))
+
+    def test_failing_provider_fails_over_and_opens_its_breaker(self):
+        import time
+
+        broken = providers.FakeProvider("broken", fail=True)
+        backup = providers.FakeProvider("backup", latency=0.01)
+        pool = providers.ProviderPool([broken, backup], max_hedges=0)
+        for _ in range(providers.BREAKER_FAILURES + 1):
+            self.assertEqual(json.loads(pool.chat([]).content)["overall_score"], 70.0)
+        self.assertEqual(broken.calls, providers.BREAKER_FAILURES)
+        self.assertEqual(broken.health.state(), "open")
+
+        # After the open period a single trial call closes the breaker again.
+        broken.fail = False
+        broken.health.open_until = time.monotonic() - 1
+        pool.chat([])
+        self.assertEqual(broken.calls, providers.BREAKER_FAILURES + 1)
+        self.assertEqual(broken.health.state(), "closed")
+
+    def test_rate_limits_skip_providers(self):
+        throttled = providers.FakeProvider("throttled", throttle_seconds=30)
+        backup = providers.FakeProvider("backup", latency=0.01, rpm=1)
+        pool = providers.ProviderPool([throttled, backup], max_hedges=0)
+        pool.chat([])
+        # The 429 paused "throttled" without counting against its breaker.
+        self.assertEqual(throttled.health.state(), "closed")
+        self.assertEqual(throttled.health.counters["throttled"], 1)
+
+        with self.assertRaises(providers.RateLimited) as raised:
+            pool.chat([])
+        self.assertEqual(throttled.calls, 1)
+        self.assertGreater(raised.exception.retry_after, 25)
+
+    @patch("team11.services.providers.HEDGE_AFTER_SECONDS", 0.02)
+    def test_slow_provider_is_hedged(self):
+        from asgiref.sync import async_to_sync
+
+        stuck = providers.FakeProvider("stuck", latency=0.5)
+        quick = providers.FakeProvider("quick")
+        pool = providers.ProviderPool([stuck, quick])
+        async_to_sync(pool.achat)([])
+        self.assertEqual(quick.health.counters["hedges"], 1)
+        self.assertEqual(quick.health.counters["wins"], 1)
+        # The losing call was cancelled rather than left running.
+        self.assertEqual(stuck.calls, 0)
+        self.assertEqual(stuck.health.state(), "closed")
+
+    def test_fake_providers_need_debug(self):
+        config = json.dumps([{"name": "local", "type": "fake"}])
+        with patch.dict("os.environ", {"TEAM11_AI_PROVIDERS": config}):
+            with self.settings(DEBUG=False), self.assertLogs("team11.services.providers", "ERROR"):
+                pool = providers.load(API_BASE_URL, API_KEY, DEEPSEEK_MODEL)
+                self.assertEqual([type(p) for p in pool.providers], [providers.Provider])
+            with self.settings(DEBUG=True):
+                pool = providers.load(API_BASE_URL, API_KEY, DEEPSEEK_MODEL)
+                self.assertIsInstance(pool.providers[0], providers.FakeProvider)
+
+
+class ListeningJobMixin:
+    databases = {"default", "team11"}
+
+    def setUp(self):
+        import tempfile
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = self.settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _listening_job(self, filename, audio=b"RIFF-same-audio-bytes"):
+        Path(self.media.name, filename).write_bytes(audio)
+        submission = Submission.objects.using("team11").create(
+            user_id=get_user_model().objects.create_user(email=f"{filename}@example.com", password="x").id,
+            submission_type=SubmissionType.LISTENING,
+            status=AnalysisStatus.IN_PROGRESS,
+        )
+        ListeningSubmission.objects.using("team11").create(
+            submission=submission, topic="Topic", audio_file_url=filename, duration_seconds=30,
+        )
+        jobs.enqueue(submission)
+        return submission
+
+
+class Team11TranscriptionCacheTests(ListeningJobMixin, TestCase):
+    @patch("team11.jobs.assess_speaking")
+    @patch("team11.services.ai_service.transcribe_audio")
+    def test_whisper_runs_once_per_recording(self, transcribe_mock, assess_mock):
+        transcribe_mock.return_value = {"success": True, "transcription": "hello world"}
+        assess_mock.return_value = {"success": False, "error": "Too many requests", "retryable": True}
+
+        first = self._listening_job("a.webm")
+        jobs.run_job(jobs.claim("worker-a"))
+        detail = ListeningSubmission.objects.using("team11").get(submission=first)
+        self.assertEqual(detail.transcription, "hello world")
+        self.assertEqual(TranscriptionCacheEntry.objects.using("team11").count(), 1)
+
+        # Retry of the same submission reuses the saved transcript.
+        AssessmentJob.objects.using("team11").filter(submission=first).update(run_after=timezone.now())
+        jobs.run_job(jobs.claim("worker-a"))
+        # A different submission with identical audio hits the cache.
+        self._listening_job("b.webm")
+        jobs.run_job(jobs.claim("worker-a"))
+
+        self.assertEqual(transcribe_mock.call_count, 1)
+        self.assertEqual(assess_mock.call_count, 3)
+        for call in assess_mock.call_args_list:
+            self.assertEqual(call.kwargs["transcription"], "hello world")
+
+
+def _wav_bytes(*parts, sample_rate=16000):
+    """16-bit mono WAV from (seconds, amplitude) parts of a 440 Hz tone; amplitude 0 is silence."""
+    import io
+    import math
+    import wave
+    from array import array
+    samples = array("h")
+    for seconds, amplitude in parts:
+        samples.extend(
+            int(amplitude * math.sin(2 * math.pi * 440 * i / sample_rate))
+            for i in range(int(seconds * sample_rate))
+        )
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+class Team11AudioPreprocessTests(ListeningJobMixin, TestCase):
+    def test_speech_is_trimmed(self):
+        path = Path(self.media.name, "speech.wav")
+        path.write_bytes(_wav_bytes((2, 0), (1, 8000), (2, 0)))
+        prepared = audio_preprocess.prepare(str(path))
+        self.addCleanup(audio_preprocess.cleanup, prepared)
+
+        self.assertTrue(prepared["speech"])
+        self.assertTrue(prepared["processed"])
+        self.assertAlmostEqual(prepared["duration_seconds"], 5, places=1)
+        self.assertLess(prepared["speech_seconds"], 2)
+        self.assertLess(prepared["bytes_out"], prepared["bytes_in"])
+        audio_preprocess.cleanup(prepared)
+        self.assertFalse(Path(prepared["path"]).exists())
+
+    @patch("team11.services.ai_service.transcribe_audio")
+    def test_silent_recording_fails_without_calling_whisper(self, transcribe_mock):
+        submission = self._listening_job("silence.wav", audio=_wav_bytes((3, 0), (0.2, 20)))
+        jobs.run_job(jobs.claim("worker-a"))
+
+        transcribe_mock.assert_not_called()
+        submission.refresh_from_db(using="team11")
+        self.assertEqual(submission.status, AnalysisStatus.FAILED)
+        result = AssessmentResult.objects.using("team11").get(submission=submission)
+        self.assertEqual(result.feedback_summary, jobs.NO_SPEECH_MESSAGE)
+
+    def test_transcription_rate_limit_defers_the_job(self):
+        from unittest.mock import MagicMock
+        from .services import ai_service
+        from .services.rate_limit import RateLimiter
+
+        limiter = RateLimiter(rpm=1)
+        limiter.reserve(1)
+        submission = self._listening_job("busy.wav", audio=_wav_bytes((1, 8000)))
+        with patch("team11.services.ai_service.transcription_limiter", limiter), \
+                patch.object(ai_service.client.audio.transcriptions, "create") as create_mock:
+            jobs.run_job(jobs.claim("worker-a"))
+            create_mock.assert_not_called()
+
+            # A 429 from Whisper pauses the limiter for its Retry-After.
+            throttled = MagicMock(spec=RateLimitError)
+            throttled.response = MagicMock(headers={"retry-after": "90"})
+            result = ai_service.transcription_error(throttled, "busy.wav")
+            self.assertEqual(result["retry_after"], 90)
+            self.assertGreater(limiter.reserve(1), 80)
+
+        job = AssessmentJob.objects.using("team11").get(submission=submission)
+        self.assertEqual((job.status, job.attempts), (JobStatus.QUEUED, 0))
+        self.assertEqual(job.metrics["queue"]["deferrals"], 1)
+
+    @patch("team11.services.ai_service.SEGMENT_RETRY_DELAY_SECONDS", 0)
+    @patch.multiple("team11.services.audio_preprocess", SEGMENT_SECONDS=2, SEGMENT_MIN_SECONDS=3)
+    @patch("team11.jobs.assess_speaking")
+    @patch("team11.services.ai_service.transcribe_audio")
+    def test_long_recording_is_transcribed_in_segments(self, transcribe_mock, assess_mock):
+        calls = {}
+
+        def transcribe(path):
+            # Segment files are named by index; segment 1 fails once.
+            index = int(Path(path).name.split("_")[1])
+            calls[index] = calls.get(index, 0) + 1
+            if index == 1 and calls[index] == 1:
+                return {"success": False, "error": "Too many requests", "retryable": True, "transcription": None}
+            return {"success": True, "transcription": f"part{index}"}
+
+        transcribe_mock.side_effect = transcribe
+        assess_mock.return_value = {"success": False, "error": "bad request", "retryable": False}
+        submission = self._listening_job(
+            "long.wav", audio=_wav_bytes((1.8, 8000), (0.6, 0), (1.8, 8000), (0.6, 0), (1.8, 8000)),
+        )
+        jobs.run_job(jobs.claim("worker-a"))
+
+        self.assertEqual(calls, {0: 1, 1: 2, 2: 1})
+        self.assertEqual(assess_mock.call_args.kwargs["transcription"], "part0 part1 part2")
+        metrics = AssessmentJob.objects.using("team11").get(submission=submission).metrics["transcription"]
+        self.assertEqual([s["index"] for s in metrics["segments"]], [0, 1, 2])
+        self.assertEqual([s["attempts"] for s in metrics["segments"]], [1, 2, 1])
+        for segment in metrics["segments"]:
+            self.assertTrue(1.5 < segment["audio_seconds"] < 3)
+
+    @skipUnless(audio_preprocess.FFMPEG_BIN, "ffmpeg is not installed")
+    def test_sample_answer_is_transcoded_to_opus(self):
+        sample = Path(__file__).parent / "static" / "team11" / "public" / "audio" / "sample_answer.mp3"
+        prepared = audio_preprocess.prepare(str(sample))
+        self.addCleanup(audio_preprocess.cleanup, prepared)
+
+        self.assertTrue(prepared["speech"])
+        self.assertTrue(prepared["path"].endswith(".ogg"))
+        self.assertLess(prepared["bytes_out"], prepared["bytes_in"])
+
+
+class Team11AudioUploadTests(TestCase):
+    databases = {"default", "team11"}
+
+    def setUp(self):
+        import tempfile
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = self.settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email="upload@example.com", password="x")
+        self.client.force_login(self.user)
+
+    def _put(self, url, chunk, offset):
+        import hashlib
+        return self.client.put(
+            url, data=chunk, content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=f"sha256 {hashlib.sha256(chunk).hexdigest()}",
+        )
+
+    def test_resumable_upload_then_submit(self):
+        import hashlib
+        audio = b"0123456789" * 100
+        res = self.client.post(
+            "/team11/api/uploads/",
+            data=json.dumps({"size": len(audio), "content_type": "audio/webm", "sha256": hashlib.sha256(audio).hexdigest()}),
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 201)
+        url = f"/team11/api/uploads/{res.json()['upload_id']}/"
+
+        self.assertEqual(self._put(url, audio[:600], 0).json()["offset"], 600)
+        # A retried chunk at a stale offset is rejected with the server's offset.
+        stale = self._put(url, audio[:600], 0)
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale["Upload-Offset"], "600")
+        self.assertEqual(self.client.get(url).json()["offset"], 600)
+
+        done = self._put(url, audio[600:], 600)
+        self.assertTrue(done.json()["completed"])
+
+        res = self.client.post(
+            "/team11/api/submit-listening/",
+            data=json.dumps({"topic": "Topic", "upload_id": done.json()["upload_id"], "duration_seconds": 12}),
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 202)
+        detail = ListeningSubmission.objects.using("team11").get(submission_id=res.json()["submission_id"])
+        self.assertEqual(Path(jobs.audio_file_path(detail.audio_file_url)).read_bytes(), audio)
+        self.assertTrue(AssessmentJob.objects.using("team11").filter(submission_id=detail.pk).exists())
+
+    def test_corrupted_chunk_is_rejected(self):
+        res = self.client.post(
+            "/team11/api/uploads/",
+            data=json.dumps({"size": 4, "content_type": "audio/webm"}),
+            content_type="application/json",
+        )
+        url = f"/team11/api/uploads/{res.json()['upload_id']}/"
+        bad = self.client.put(
+            url, data=b"abcd", content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET="0", HTTP_UPLOAD_CHECKSUM="sha256 " + "0" * 64,
+        )
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(bad.json()["offset"], 0)
+
+    def test_submit_listening_accepts_multipart(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        res = self.client.post("/team11/api/submit-listening/", data={
+            "topic": "Topic",
+            "duration_seconds": "9",
+            "audio": SimpleUploadedFile("answer.webm", b"webm-bytes", content_type="audio/webm"),
+        })
+        self.assertEqual(res.status_code, 202)
+        detail = ListeningSubmission.objects.using("team11").get(submission_id=res.json()["submission_id"])
+        self.assertEqual(detail.duration_seconds, 9)
+        self.assertEqual(Path(jobs.audio_file_path(detail.audio_file_url)).read_bytes(), b"webm-bytes")
+
+    @patch("team11.uploads.MAX_AUDIO_BYTES", 4)
+    def test_submit_listening_rejects_oversized_multipart(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        res = self.client.post("/team11/api/submit-listening/", data={
+            "topic": "Topic",
+            "audio": SimpleUploadedFile("answer.webm", b"webm-bytes", content_type="audio/webm"),
+        })
+        self.assertEqual(res.status_code, 413)
+        self.assertFalse(ListeningSubmission.objects.using("team11").exists())
@@ -0,0 +1,87 @@
+"""
+Whisper transcripts cached by the SHA-256 of the audio bytes.
+
+The key also covers the Whisper model and language hint, so changing either
+transcribes again. Together with ListeningSubmission.transcription (saved as
+soon as Whisper answers) this means retries, re-scores and prompt-version
+backfills never upload the same recording twice.
+"""
+import hashlib
+import os
+import threading
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TranscriptionCacheEntry
+from .services.ai_service import WHISPER_LANGUAGE, WHISPER_MODEL
+
+DB = 'team11'
+
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'stores': 0}
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def _entries():
+    return TranscriptionCacheEntry.objects.using(DB)
+
+
+def file_sha256(path):
+    """Hash of a local audio file, or None for remote or missing files."""
+    if path.startswith('http') or not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _key(audio_sha256):
+    raw = f"{audio_sha256}:{WHISPER_MODEL}:{WHISPER_LANGUAGE or ''}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def lookup(audio_sha256):
+    if not audio_sha256:
+        return None
+    key = _key(audio_sha256)
+    transcription = _entries().filter(pk=key).values_list('transcription', flat=True).first()
+    if transcription is None:
+        _count('misses')
+        return None
+    _entries().filter(pk=key).update(hit_count=F('hit_count') + 1, last_used_at=timezone.now())
+    _count('hits')
+    return transcription
+
+
+def store(audio_sha256, transcription):
+    if not audio_sha256 or not transcription:
+        return
+    _entries().update_or_create(
+        cache_key=_key(audio_sha256),
+        defaults={
+            'audio_sha256': audio_sha256,
+            'model': WHISPER_MODEL,
+            'language': WHISPER_LANGUAGE or '',
+            'transcription': transcription,
+            'last_used_at': timezone.now(),
+        },
+    )
+    _count('stores')
+
+
+def stats():
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    return {
+        **counters,
+        'hit_rate': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+        'entries': _entries().count(),
+    }
@@ -0,0 +1,195 @@
+"""
+Resumable, chunked audio uploads for speaking submissions.
+
+The client creates an upload with the total size (and optionally the SHA-256
+of the whole file), then PUTs raw chunks with an Upload-Offset header. Each
+chunk is streamed straight into a .part file, so memory stays bounded by the
+read buffer however large the recording is. After a dropped connection the
+client GETs the upload to learn the offset the server has and continues from
+there; a chunk sent at any other offset gets a 409 carrying that offset. The
+finished file is checked against the declared checksum and then referenced by
+upload_id in submit_listening.
+"""
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .jobs import audio_file_path
+from .models import AudioUpload
+
+DB = 'team11'
+MAX_AUDIO_BYTES = int(os.getenv("TEAM11_MAX_AUDIO_BYTES", 25 * 1024 * 1024))
+CHUNK_BYTES = int(os.getenv("TEAM11_UPLOAD_CHUNK_BYTES", 512 * 1024))
+MAX_CHUNK_BYTES = int(os.getenv("TEAM11_UPLOAD_MAX_CHUNK_BYTES", 8 * 1024 * 1024))
+STALE_UPLOAD_SECONDS = int(os.getenv("TEAM11_STALE_UPLOAD_SECONDS", 24 * 3600))
+READ_BUFFER_BYTES = 64 * 1024
+# Room for the other form fields next to the audio in a multipart submit.
+FORM_OVERHEAD_BYTES = 64 * 1024
+TOO_LARGE_MESSAGE = 'حجم فایل صوتی بیش از حد مجاز است.'
+
+AUDIO_EXTENSIONS = {
+    'audio/webm': '.webm',
+    'audio/ogg': '.ogg',
+    'audio/wav': '.wav',
+    'audio/wave': '.wav',
+    'audio/x-wav': '.wav',
+    'audio/mpeg': '.mp3',
+    'audio/mp4': '.m4a',
+    'audio/x-m4a': '.m4a',
+}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.offset = offset
+
+
+def audio_extension(content_type):
+    return AUDIO_EXTENSIONS.get((content_type or '').split(';')[0].strip().lower())
+
+
+def new_relative_path(user_id, ext):
+    timestamp = int(timezone.now().timestamp())
+    return os.path.join('team11', 'audio', f"{user_id}_{timestamp}_{uuid.uuid4().hex[:8]}{ext}")
+
+
+def _part_path(upload):
+    return audio_file_path(upload.relative_path) + '.part'
+
+
+def _uploads():
+    return AudioUpload.objects.using(DB)
+
+
+def create(user_id, content_type, total_size, sha256=''):
+    ext = audio_extension(content_type)
+    if ext is None:
+        raise UploadError('نوع فایل صوتی پشتیبانی نمی‌شود.', status=415)
+    if total_size <= 0 or total_size > MAX_AUDIO_BYTES:
+        raise UploadError(TOO_LARGE_MESSAGE, status=413)
+
+    upload = _uploads().create(
+        user_id=user_id,
+        content_type=content_type,
+        relative_path=new_relative_path(user_id, ext),
+        total_size=total_size,
+        sha256=(sha256 or '').lower(),
+    )
+    part = _part_path(upload)
+    os.makedirs(os.path.dirname(part), exist_ok=True)
+    open(part, 'wb').close()
+    return upload
+
+
+def get_for_user(upload_id, user_id):
+    upload = _uploads().filter(upload_id=upload_id, user_id=user_id).first()
+    if upload is None:
+        raise UploadError('آپلود یافت نشد.', status=404)
+    return upload
+
+
+async def aget_completed(upload_id, user_id):
+    return await _uploads().filter(upload_id=upload_id, user_id=user_id, completed=True).afirst()
+
+
+def write_chunk(upload, offset, stream, length, checksum=''):
+    """Append length bytes read from stream at offset; returns the updated upload."""
+    if upload.completed or offset != upload.received_bytes:
+        raise UploadError('آفست نامعتبر است.', status=409, offset=upload.received_bytes)
+    if length <= 0 or length > MAX_CHUNK_BYTES or offset + length > upload.total_size:
+        raise UploadError('اندازه بخش ارسالی نامعتبر است.', status=413, offset=upload.received_bytes)
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(_part_path(upload), 'r+b') as f:
+        f.seek(offset)
+        while written < length:
+            buf = stream.read(min(READ_BUFFER_BYTES, length - written))
+            if not buf:
+                break
+            f.write(buf)
+            digest.update(buf)
+            written += len(buf)
+        # Anything past the acknowledged offset is rewritten by the next attempt.
+        f.truncate(offset + written)
+
+    if written != length:
+        raise UploadError('بخش ارسالی ناقص است.', offset=upload.received_bytes)
+    if checksum and checksum.lower() != digest.hexdigest():
+        raise UploadError('چک‌سام بخش ارسالی مطابقت ندارد.', offset=upload.received_bytes)
+
+    advanced = _uploads().filter(pk=upload.pk, received_bytes=offset, completed=False).update(
+        received_bytes=offset + written,
+        updated_at=timezone.now(),
+    )
+    if not advanced:
+        upload.refresh_from_db(using=DB)
+        raise UploadError('آفست نامعتبر است.', status=409, offset=upload.received_bytes)
+
+    upload.received_bytes = offset + written
+    if upload.received_bytes == upload.total_size:
+        _finish(upload)
+    return upload
+
+
+def _finish(upload):
+    part = _part_path(upload)
+    if upload.sha256 and _file_sha256(part) != upload.sha256:
+        # Corrupted somewhere along the way: start over rather than assess garbage.
+        open(part, 'wb').close()
+        _uploads().filter(pk=upload.pk).update(received_bytes=0, updated_at=timezone.now())
+        upload.received_bytes = 0
+        raise UploadError('چک‌سام فایل صوتی مطابقت ندارد.', offset=0)
+
+    os.replace(part, audio_file_path(upload.relative_path))
+    upload.completed = True
+    upload.updated_at = timezone.now()
+    upload.save(using=DB, update_fields=['completed', 'updated_at'])
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_BUFFER_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_uploaded_file(uploaded_file, relative_path):
+    """Write a multipart UploadedFile to media chunk by chunk."""
+    full_path = audio_file_path(relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'wb') as f:
+        for chunk in uploaded_file.chunks(READ_BUFFER_BYTES):
+            f.write(chunk)
+    return full_path
+
+
+def cleanup_stale():
+    """Drop uploads that were abandoned before completing, and their .part files."""
+    cutoff = timezone.now() - timedelta(seconds=STALE_UPLOAD_SECONDS)
+    stale = list(_uploads().filter(completed=False, updated_at__lt=cutoff))
+    for upload in stale:
+        try:
+            os.remove(_part_path(upload))
+        except FileNotFoundError:
+            pass
+    if stale:
+        _uploads().filter(pk__in=[u.pk for u in stale]).delete()
+    return len(stale)
+
+
+def state(upload):
+    return {
+        'upload_id': str(upload.upload_id),
+        'offset': upload.received_bytes,
+        'size': upload.total_size,
+        'completed': upload.completed,
+        'chunk_size': CHUNK_BYTES,
+    }
@@ -10,6 +10,12 @@ urlpatterns = [
     path("listening-exam/", views.listening_exam, name="team11_listening_exam"),
     path("api/submit-writing/", views.submit_writing, name="team11_submit_writing"),
     path("api/submit-listening/", views.submit_listening, name="team11_submit_listening"),
+    path("api/uploads/", views.create_upload, name="team11_create_upload"),
+    path("api/uploads/<uuid:upload_id>/", views.upload_chunk, name="team11_upload_chunk"),
+    path("api/history/", views.submission_history, name="team11_submission_history"),
+    path("api/metrics/", views.metrics, name="team11_metrics"),
+    path("api/submission-status/", views.submission_statuses, name="team11_submission_statuses"),
     path("api/submission-status/<uuid:submission_id>/", views.submission_status, name="team11_submission_status"),
+    path("api/submission-events/", views.submission_events, name="team11_submission_events"),
     path("submission/<uuid:submission_id>/", views.submission_detail, name="team11_submission_detail"),
 ]
\ No newline at end of file
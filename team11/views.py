@@ -1,27 +1,26 @@
+import hashlib
 import json
 import os
 import logging
-import random
-import threading
 import base64
 import re
 import uuid
-from django.db import close_old_connections
-from django.db.models import Avg
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.views.decorators.http import require_POST, require_http_methods
-from django.views.decorators.csrf import csrf_exempt
+from django.template.loader import render_to_string
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from django.utils import timezone
-from core.auth import api_login_required
+from django.utils.http import parse_etags, quote_etag
+from core.auth import api_login_required, csrf_exempt, require_http_methods, require_POST
 from .models import (
     Submission, WritingSubmission, ListeningSubmission, 
-    AssessmentResult, SubmissionType, AnalysisStatus,
-    QuestionCategory, Question
+    SubmissionType, AnalysisStatus,
+    Question
 )
-from .services import assess_writing, assess_speaking
+from . import assessment_cache, catalog, history, jobs, question_pool, score_stats, status_events, transcription_cache, uploads
+from .services import ai_service, audio_preprocess
 
 logger = logging.getLogger(__name__)
 
@@ -29,109 +28,17 @@ TEAM_NAME = "team11"
 PERSIAN_ARABIC_PATTERN = re.compile(r"[\u0600-\u06FF]")
 
 
-def _process_writing_assessment(submission_id, topic, text_body, word_count):
-    try:
-        close_old_connections()
-        logger.info(f"Writing background task started: {submission_id}")
-        assessment_result = assess_writing(topic, text_body, word_count)
-        submission = Submission.objects.using('team11').get(submission_id=submission_id)
-
-        if assessment_result.get('success'):
-            submission.overall_score = assessment_result['overall_score']
-            submission.status = AnalysisStatus.COMPLETED
-            submission.save()
-
-            AssessmentResult.objects.using('team11').update_or_create(
-                submission=submission,
-                defaults={
-                    'grammar_score': assessment_result['grammar_score'],
-                    'vocabulary_score': assessment_result['vocabulary_score'],
-                    'coherence_score': assessment_result['coherence_score'],
-                    'fluency_score': assessment_result['fluency_score'],
-                    'feedback_summary': assessment_result['feedback_summary'],
-                    'suggestions': assessment_result['suggestions'],
-                }
-            )
-            logger.info(f"Writing assessment completed: {submission.submission_id}, score: {submission.overall_score}")
-            return
-
-        error_msg = 'ارزیابی ناموفق بود. لطفاً دوباره تلاش کنید.'
-        submission.status = AnalysisStatus.FAILED
-        submission.save()
-        AssessmentResult.objects.using('team11').update_or_create(
-            submission=submission,
-            defaults={
-                'feedback_summary': error_msg,
-                'suggestions': [],
-            }
-        )
-        logger.error(f"Writing assessment failed: {submission.submission_id}, error: {assessment_result.get('error')}")
-    except Exception as e:
-        logger.error(f"Background writing assessment error: {e}", exc_info=True)
-        try:
-            close_old_connections()
-            submission = Submission.objects.using('team11').get(submission_id=submission_id)
-            submission.status = AnalysisStatus.FAILED
-            submission.save()
-        except Exception:
-            pass
+def _multipart_payload(request):
+    # Spool the audio to a temporary file rather than keeping up to
+    # FILE_UPLOAD_MAX_MEMORY_SIZE of it in memory per request.
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    return request.POST, request.FILES.get('audio')
 
 
-def _process_listening_assessment(submission_id, listening_detail_pk, audio_file_path, topic, duration, temp_file_path=None):
-    try:
-        close_old_connections()
-        logger.info(f"Speaking background task started: {submission_id}")
-        assessment_result = assess_speaking(topic, audio_file_path, duration)
-        submission = Submission.objects.using('team11').get(submission_id=submission_id)
-        listening_detail = ListeningSubmission.objects.using('team11').get(pk=listening_detail_pk)
-
-        if assessment_result.get('success'):
-            listening_detail.transcription = assessment_result.get('transcription', '')
-            listening_detail.save()
-
-            submission.overall_score = assessment_result['overall_score']
-            submission.status = AnalysisStatus.COMPLETED
-            submission.save()
-
-            AssessmentResult.objects.using('team11').update_or_create(
-                submission=submission,
-                defaults={
-                    'pronunciation_score': assessment_result['pronunciation_score'],
-                    'fluency_score': assessment_result['fluency_score'],
-                    'vocabulary_score': assessment_result['vocabulary_score'],
-                    'grammar_score': assessment_result['grammar_score'],
-                    'coherence_score': assessment_result['coherence_score'],
-                    'feedback_summary': assessment_result['feedback_summary'],
-                    'suggestions': assessment_result['suggestions'],
-                }
-            )
-            logger.info(f"Speaking assessment completed: {submission.submission_id}, score: {submission.overall_score}")
-            return
-
-        raw_error = assessment_result.get('error', '')
-        error_msg = 'ارزیابی ناموفق بود. لطفاً دوباره تلاش کنید.'
-        if 'no speech' in str(raw_error).lower():
-            error_msg = 'صدایی تشخیص داده نشد. لطفاً واضح‌تر صحبت کنید.'
-
-        submission.status = AnalysisStatus.FAILED
-        submission.save()
-        AssessmentResult.objects.using('team11').update_or_create(
-            submission=submission,
-            defaults={
-                'feedback_summary': error_msg,
-                'suggestions': [],
-            }
-        )
-        logger.error(f"Speaking assessment failed: {submission.submission_id}, error: {raw_error}")
-    except Exception as e:
-        logger.error(f"Background listening assessment error: {e}", exc_info=True)
-        try:
-            close_old_connections()
-            submission = Submission.objects.using('team11').get(submission_id=submission_id)
-            submission.status = AnalysisStatus.FAILED
-            submission.save()
-        except Exception:
-            pass
+def _write_audio_file(full_path, audio_bytes):
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'wb') as f:
+        f.write(audio_bytes)
 
 
 @api_login_required
@@ -139,6 +46,19 @@ def ping(request):
     return JsonResponse({"team": TEAM_NAME, "ok": True})
 
 
+@api_login_required
+def metrics(request):
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff only"}, status=403)
+    return JsonResponse({
+        "assessment_cache": assessment_cache.stats(),
+        "transcription_cache": transcription_cache.stats(),
+        "audio_preprocess": audio_preprocess.stats(),
+        "question_pool": question_pool.stats(),
+        "ai_providers": ai_service.chat_pool.stats(),
+    })
+
+
 def base(request):
     """Landing page for Team 11 microservice"""
     return render(request, f"{TEAM_NAME}/index.html")
@@ -149,64 +69,53 @@ def dashboard(request):
     """Dashboard showing user's submission history"""
     user_id = request.user.id
     
-    # Get all submissions for the user with related data
-    submissions = Submission.objects.using('team11').filter(user_id=user_id).select_related(
-        'assessment_result',
-        'writing_details',
-        'listening_details'
-    ).order_by('-created_at')
-    
-    completed_submissions = submissions.filter(status=AnalysisStatus.COMPLETED, overall_score__isnull=False)
-    completed_count = completed_submissions.count()
-
-    writing_completed = completed_submissions.filter(submission_type=SubmissionType.WRITING).order_by('created_at')
-    speaking_completed = completed_submissions.filter(submission_type=SubmissionType.LISTENING).order_by('created_at')
-
-    writing_avg = writing_completed.aggregate(avg=Avg('overall_score'))['avg']
-    speaking_avg = speaking_completed.aggregate(avg=Avg('overall_score'))['avg']
-
-    writing_series = [
-        {
-            'date': s.created_at.strftime('%Y/%m/%d'),
-            'score': s.overall_score,
-        }
-        for s in writing_completed
-    ]
-    speaking_series = [
-        {
-            'date': s.created_at.strftime('%Y/%m/%d'),
-            'score': s.overall_score,
-        }
-        for s in speaking_completed
-    ]
-
+    rows, next_cursor = history.page(user_id)
     context = {
-        'submissions': submissions,
-        'completed_count': completed_count,
-        'writing_avg': round(writing_avg, 2) if writing_avg is not None else 0,
-        'speaking_avg': round(speaking_avg, 2) if speaking_avg is not None else 0,
-        'writing_series': writing_series,
-        'speaking_series': speaking_series,
+        'history_items': [history.item(s) for s in rows],
+        'next_cursor': next_cursor,
+        'live_events': status_events.streaming_supported(request),
+        'status_batch_size': MAX_STATUS_IDS,
+        **score_stats.dashboard_context(score_stats.get(user_id)),
     }
     return render(request, f"{TEAM_NAME}/dashboard.html", context)
 
 
+@api_login_required
+@require_http_methods(["GET"])
+def submission_history(request):
+    """
+    Keyset-paginated submission list: ?cursor=<next_cursor>&limit=&status=&type=.
+    With format=html the page comes back as rendered dashboard cards.
+    """
+    try:
+        limit = int(request.GET.get('limit', history.PAGE_SIZE))
+        rows, next_cursor = history.page(
+            request.user.id,
+            cursor=request.GET.get('cursor'),
+            limit=limit,
+            status=request.GET.get('status'),
+            submission_type=request.GET.get('type'),
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor or limit.'}, status=400)
+
+    items = [history.item(s) for s in rows]
+    if request.GET.get('format') == 'html':
+        html = ''.join(render_to_string(f"{TEAM_NAME}/_submission_card.html", {'item': item}) for item in items)
+        return JsonResponse({'html': html, 'next_cursor': next_cursor})
+    return JsonResponse({'items': items, 'next_cursor': next_cursor})
+
+
 @api_login_required
 def start_exam(request):
     """Page to select exam type and category"""
-    writing_categories = QuestionCategory.objects.using('team11').filter(
-        question_type=SubmissionType.WRITING,
-        is_active=True
-    ).prefetch_related('questions')
-    
-    listening_categories = QuestionCategory.objects.using('team11').filter(
-        question_type=SubmissionType.LISTENING,
-        is_active=True
-    ).prefetch_related('questions')
-    
+    catalog_version = catalog.version()
+    # Callables, so the catalog is only looked up when the cached fragment has expired.
     context = {
-        'writing_categories': writing_categories,
-        'listening_categories': listening_categories,
+        'catalog_version': catalog_version,
+        'catalog_cache_seconds': catalog.CACHE_SECONDS,
+        'writing_categories': lambda: catalog.get(catalog_version)[SubmissionType.WRITING],
+        'listening_categories': lambda: catalog.get(catalog_version)[SubmissionType.LISTENING],
     }
     return render(request, f"{TEAM_NAME}/start_exam.html", context)
 
@@ -216,19 +125,7 @@ def writing_exam(request):
     """Page for writing exam - random question from selected category"""
     category_id = request.GET.get('category')
     
-    if category_id:
-        questions = Question.objects.using('team11').filter(
-            category_id=category_id,
-            category__question_type=SubmissionType.WRITING,
-            is_active=True
-        )
-    else:
-        questions = Question.objects.using('team11').filter(
-            category__question_type=SubmissionType.WRITING,
-            is_active=True
-        )
-    
-    question = random.choice(list(questions)) if questions.exists() else None
+    question = question_pool.pick(SubmissionType.WRITING, category_id, user_id=request.user.id)
     
     context = {
         'question': question,
@@ -242,19 +139,7 @@ def listening_exam(request):
     """Page for listening exam - random question from selected category"""
     category_id = request.GET.get('category')
     
-    if category_id:
-        questions = Question.objects.using('team11').filter(
-            category_id=category_id,
-            category__question_type=SubmissionType.LISTENING,
-            is_active=True
-        )
-    else:
-        questions = Question.objects.using('team11').filter(
-            category__question_type=SubmissionType.LISTENING,
-            is_active=True
-        )
-    
-    question = random.choice(list(questions)) if questions.exists() else None
+    question = question_pool.pick(SubmissionType.LISTENING, category_id, user_id=request.user.id)
     
     context = {
         'question': question,
@@ -267,7 +152,7 @@ def listening_exam(request):
 @csrf_exempt
 @require_POST
 @api_login_required
-def submit_writing(request):
+async def submit_writing(request):
     """API endpoint to submit writing task"""
     try:
         data = json.loads(request.body)
@@ -288,7 +173,7 @@ def submit_writing(request):
         question = None
         if question_id:
             try:
-                question = Question.objects.using('team11').get(question_id=question_id)
+                question = await Question.objects.using('team11').aget(question_id=question_id)
                 
                 # VALIDATION: Check min word count
                 if question.min_word_count and word_count < question.min_word_count:
@@ -301,29 +186,37 @@ def submit_writing(request):
                 pass
         
         # Create submission with pending status
-        submission = Submission.objects.using('team11').create(
+        submission = await Submission.objects.using('team11').acreate(
             user_id=request.user.id,
             submission_type=SubmissionType.WRITING,
             status=AnalysisStatus.IN_PROGRESS
         )
-        
+        await score_stats.arecord_submission(request.user.id)
+
         # Create writing details
-        WritingSubmission.objects.using('team11').create(
+        writing_detail = await WritingSubmission.objects.using('team11').acreate(
             submission=submission,
             question=question,
             topic=topic,
             text_body=text_body,
             word_count=word_count
         )
-        
-        logger.info(f"Queueing writing submission {submission.submission_id} for user {request.user.id}")
 
-        thread = threading.Thread(
-            target=_process_writing_assessment,
-            args=(submission.submission_id, topic, text_body, word_count),
-            daemon=True
-        )
-        thread.start()
+        # Identical essays are scored from the cache without a provider call
+        cached = await assessment_cache.alookup(assessment_cache.writing_key(topic, text_body))
+        if cached is not None:
+            await sync_to_async(jobs.save_result)(submission, writing_detail, cached)
+            logger.info(f"Writing submission {submission.submission_id} scored from cache")
+            return JsonResponse({
+                'success': True,
+                'submission_id': str(submission.submission_id),
+                'status': 'completed',
+                'score': submission.overall_score,
+                'message': 'ارزیابی با موفقیت انجام شد.'
+            }, status=201)
+
+        logger.info(f"Queueing writing submission {submission.submission_id} for user {request.user.id}")
+        await jobs.aenqueue(submission)
 
         return JsonResponse({
             'success': True,
@@ -340,7 +233,7 @@ def submit_writing(request):
 @csrf_exempt
 @require_POST
 @api_login_required
-def submit_listening(request):
+async def submit_listening(request):
     """API endpoint to submit listening (audio) task"""
     logger.info("=" * 80)
     logger.info("SUBMIT LISTENING ENDPOINT HIT!")
@@ -352,14 +245,27 @@ def submit_listening(request):
     logger.info("=" * 80)
     
     try:
-        data = json.loads(request.body)
+        audio_file = None
+        if request.content_type == 'multipart/form-data':
+            # Same cap as the chunked upload API, checked before anything is parsed
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+            if content_length > uploads.MAX_AUDIO_BYTES + uploads.FORM_OVERHEAD_BYTES:
+                return JsonResponse({'error': uploads.TOO_LARGE_MESSAGE}, status=413)
+            # Parsing spools the file to disk, so do it off the event loop
+            data, audio_file = await sync_to_async(_multipart_payload, thread_sensitive=False)(request)
+        else:
+            data = json.loads(request.body)
         question_id = data.get('question_id', '')
         topic = data.get('topic', '')
+        upload_id = data.get('upload_id', '')
         audio_data = data.get('audio_data', '')
         audio_url = data.get('audio_url', audio_data)
-        duration = data.get('duration_seconds', 0)
+        try:
+            duration = int(data.get('duration_seconds') or 0)
+        except (TypeError, ValueError):
+            duration = 0
         
-        if not audio_url and not audio_data:
+        if not audio_url and not audio_data and not upload_id and audio_file is None:
             return JsonResponse({'error': 'فایل صوتی ارسال نشده است.'}, status=400)
         
         user_id = request.user.id
@@ -368,7 +274,7 @@ def submit_listening(request):
         question = None
         if question_id:
             try:
-                question = Question.objects.using('team11').get(question_id=question_id)
+                question = await Question.objects.using('team11').aget(question_id=question_id)
             except Question.DoesNotExist:
                 pass
         
@@ -377,7 +283,27 @@ def submit_listening(request):
         saved_db_path = "" # What we store in the DB (max 500 chars)
 
         try:
-            if audio_url.startswith('data:audio'):
+            if audio_file is not None:
+                # Multipart upload: streamed to disk chunk by chunk
+                if audio_file.size > uploads.MAX_AUDIO_BYTES:
+                    return JsonResponse({'error': uploads.TOO_LARGE_MESSAGE}, status=413)
+                ext = uploads.audio_extension(audio_file.content_type)
+                if ext is None:
+                    return JsonResponse({'error': 'نوع فایل صوتی پشتیبانی نمی‌شود.'}, status=415)
+                saved_db_path = uploads.new_relative_path(user_id, ext)
+                audio_file_path = await sync_to_async(uploads.save_uploaded_file, thread_sensitive=False)(
+                    audio_file, saved_db_path
+                )
+
+            elif upload_id:
+                # Finished resumable upload (api/uploads/)
+                upload = await uploads.aget_completed(upload_id, user_id)
+                if upload is None:
+                    return JsonResponse({'error': 'آپلود فایل صوتی کامل نشده است.'}, status=400)
+                saved_db_path = upload.relative_path
+                audio_file_path = jobs.audio_file_path(saved_db_path)
+
+            elif audio_url.startswith('data:audio'):
                 # Handle Base64
                 header, encoded = audio_url.split(',', 1)
                 audio_bytes = base64.b64decode(encoded)
@@ -400,12 +326,8 @@ def submit_listening(request):
                 
                 full_path = os.path.join(media_root, relative_path)
                 
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                
-                # Save file persistently
-                with open(full_path, 'wb') as f:
-                    f.write(audio_bytes)
+                # Save file persistently (off the event loop)
+                await sync_to_async(_write_audio_file, thread_sensitive=False)(full_path, audio_bytes)
                 
                 audio_file_path = full_path
                 saved_db_path = relative_path # Store relative path in DB
@@ -429,14 +351,15 @@ def submit_listening(request):
             return JsonResponse({'error': 'خطا در ذخیره فایل صوتی'}, status=500)
 
         # 2. Create DB Records
-        submission = Submission.objects.using('team11').create(
+        submission = await Submission.objects.using('team11').acreate(
             user_id=user_id,
             submission_type=SubmissionType.LISTENING,
             status=AnalysisStatus.IN_PROGRESS
         )
-        
+        await score_stats.arecord_submission(user_id)
+
         # Create listening details
-        listening_detail = ListeningSubmission.objects.using('team11').create(
+        await ListeningSubmission.objects.using('team11').acreate(
             submission=submission,
             question=question,
             topic=topic,
@@ -446,16 +369,10 @@ def submit_listening(request):
         
         logger.info(f"Processing listening submission {submission.submission_id}")
 
-        # 3. Start Background Process
-        if audio_file_path and os.path.exists(audio_file_path):
-            thread = threading.Thread(
-                target=_process_listening_assessment,
-                args=(submission.submission_id, listening_detail.pk, audio_file_path, topic, duration, None),
-                daemon=True
-            )
-            thread.start()
-        else:
-             logger.warning(f"Audio file path invalid, skipping AI: {audio_file_path}")
+        # 3. Queue the assessment for run_assessment_workers
+        if not (audio_file_path and os.path.exists(audio_file_path)):
+            logger.warning(f"Audio file path not found locally, the worker may fail it: {audio_file_path}")
+        await jobs.aenqueue(submission)
 
         return JsonResponse({
             'success': True,
@@ -469,6 +386,68 @@ def submit_listening(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _upload_response(upload, status=200):
+    response = JsonResponse(uploads.state(upload), status=status)
+    response['Upload-Offset'] = str(upload.received_bytes)
+    return response
+
+
+def _upload_error(error):
+    body = {'error': error.message}
+    if error.offset is not None:
+        body['offset'] = error.offset
+    response = JsonResponse(body, status=error.status)
+    if error.offset is not None:
+        response['Upload-Offset'] = str(error.offset)
+    return response
+
+
+@csrf_exempt
+@require_POST
+@api_login_required
+def create_upload(request):
+    """Start a resumable audio upload; chunks are then PUT to upload_chunk"""
+    try:
+        data = json.loads(request.body)
+        total_size = int(data.get('size') or 0)
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    try:
+        upload = uploads.create(
+            request.user.id,
+            data.get('content_type', ''),
+            total_size,
+            sha256=data.get('sha256', ''),
+        )
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return _upload_response(upload, status=201)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "HEAD", "PUT"])
+@api_login_required
+def upload_chunk(request, upload_id):
+    """GET/HEAD: current offset to resume from. PUT: raw chunk at Upload-Offset"""
+    try:
+        upload = uploads.get_for_user(upload_id, request.user.id)
+        if request.method != 'PUT':
+            return _upload_response(upload)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return _upload_error(uploads.UploadError('Upload-Offset header is required.', offset=upload.received_bytes))
+        checksum = request.headers.get('Upload-Checksum', '').split(' ')[-1]
+
+        upload = uploads.write_chunk(upload, offset, request, length, checksum)
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return _upload_response(upload)
+
+
 @api_login_required
 def submission_detail(request, submission_id):
     """View detailed results for a specific submission"""
@@ -508,30 +487,73 @@ def submission_detail(request, submission_id):
     return render(request, f"{TEAM_NAME}/submission_detail.html", context)
 
 
+# Ids per status request (they go in the URL); the dashboard splits larger sets.
+MAX_STATUS_IDS = 100
+
+
 @api_login_required
 @require_http_methods(["GET"])
-def submission_status(request, submission_id):
-    submission = get_object_or_404(
-        Submission.objects.using('team11').select_related('assessment_result'),
-        submission_id=submission_id,
-        user_id=request.user.id
-    )
+async def submission_statuses(request):
+    """
+    Status of several of the caller's submissions in one query:
+    ?ids=<uuid>,<uuid>,... Unknown ids are left out. The response carries an
+    ETag, and a matching If-None-Match gets an empty 304.
+    """
+    raw_ids = [i for value in request.GET.getlist('ids') for i in value.split(',') if i.strip()]
+    if len(raw_ids) > MAX_STATUS_IDS:
+        return JsonResponse({'error': f'At most {MAX_STATUS_IDS} ids per request.'}, status=400)
+    try:
+        ids = {uuid.UUID(i.strip()) for i in raw_ids}
+    except ValueError:
+        return JsonResponse({'error': 'Invalid submission id.'}, status=400)
+
+    statuses = {}
+    if ids:
+        submissions = Submission.objects.using('team11').filter(
+            user_id=request.user.id, submission_id__in=ids,
+        ).select_related('assessment_result')
+        async for submission in submissions:
+            payload = status_events.status_payload(submission)
+            del payload['submission_id']
+            if payload['status'] != 'failed':
+                # Only the failure message varies; the others are fixed strings.
+                payload.pop('message', None)
+            statuses[str(submission.submission_id)] = payload
+
+    body = json.dumps({'submissions': statuses}, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    etag = quote_etag(hashlib.sha256(body.encode('utf-8')).hexdigest()[:32])
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
-    if submission.status == AnalysisStatus.IN_PROGRESS:
-        return JsonResponse({'status': 'in_progress'})
 
-    if submission.status == AnalysisStatus.COMPLETED:
-        return JsonResponse({
-            'status': 'completed',
-            'score': submission.overall_score,
-            'message': 'ارزیابی با موفقیت انجام شد.'
-        })
+@api_login_required
+@require_http_methods(["GET"])
+async def submission_status(request, submission_id):
+    try:
+        submission = await Submission.objects.using('team11').select_related('assessment_result').aget(
+            submission_id=submission_id,
+            user_id=request.user.id
+        )
+    except Submission.DoesNotExist:
+        raise Http404("Submission not found")
 
-    error_message = None
-    if hasattr(submission, 'assessment_result') and submission.assessment_result:
-        error_message = submission.assessment_result.feedback_summary
+    return JsonResponse(status_events.status_payload(submission))
 
-    return JsonResponse({
-        'status': 'failed',
-        'message': error_message or 'ارزیابی ناموفق بود. لطفاً دوباره تلاش کنید.'
-    })
+
+@api_login_required
+@require_http_methods(["GET"])
+async def submission_events(request):
+    """Server-Sent Events stream of the user's pending submissions (see status_events)."""
+    if not status_events.streaming_supported(request):
+        # 204 tells EventSource not to reconnect; the dashboard polls instead.
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(status_events.stream(request.user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response